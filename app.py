@@ -1,10 +1,29 @@
 import os
+import json
+import hmac
+import time
+import random
+import hashlib
 import logging
-import joblib
-import pandas as pd
+import functools
+import threading
+from contextlib import contextmanager
 import numpy as np
-from flask import Flask, render_template, request, jsonify
-import sqlite3
+from flask import Flask, render_template, request, jsonify, g, has_request_context, send_from_directory
+from player_directory import PlayerDirectory
+from prediction_table import load_prediction_table, fingerprint_files, BALLS_GRID
+from outcome_tensor import load_outcome_tensor
+from prepared_responses import prepare_json, serve_prepared
+from prediction_cache import PredictionCache
+from micro_batcher import MicroBatcher, BatcherClosed
+from tree_engine import compile_model
+from model_registry import ModelRegistry, ModelBundleError
+from metrics import MetricsRegistry, register_process_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from profiling import RequestProfiler
+from feature_store import load_feature_store, STORE_DIR as FEATURE_STORE_DIR
+from matchup_graph import MatchupGraph
+from venue_stats import match_files, read_deliveries, build_venue_stats
+import innings_simulator
 
 # ---------------------------------------------------
 # Flask App Config
@@ -12,12 +31,25 @@ import sqlite3
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your_super_secret_key_change_this'
 logging.basicConfig(level=logging.INFO)
+app.config['PREDICTION_CACHE_SIZE'] = int(os.environ.get("PREDICTION_CACHE_SIZE", 4096))
+app.config['PREDICTION_CACHE_TTL'] = float(os.environ.get("PREDICTION_CACHE_TTL", 0))  # seconds, 0 = no expiry
+app.config['REFERENCE_DATA_MAX_AGE'] = int(os.environ.get("REFERENCE_DATA_MAX_AGE", 300))  # Cache-Control max-age, seconds
+VERSIONED_MAX_AGE = 365 * 24 * 3600  # for URLs that carry the data version (?v=...), which never change
+app.config['MICRO_BATCHING'] = os.environ.get("MICRO_BATCHING", "0") == "1"
+app.config['MICRO_BATCH_MAX_SIZE'] = int(os.environ.get("MICRO_BATCH_MAX_SIZE", 64))
+app.config['MICRO_BATCH_MAX_WAIT_MS'] = float(os.environ.get("MICRO_BATCH_MAX_WAIT_MS", 2))
+# Live inference engine: "reference" (the loaded XGBoost/sklearn models) or "native"
+# (tree_engine.py), for every model type or per type, e.g. "runs=native,dismissals=native".
+app.config['INFERENCE_ENGINE'] = os.environ.get("INFERENCE_ENGINE", "reference")
+# Load the data stage from the memory-mapped feature store when it is up to date ("0" = always read the CSVs).
+app.config['FEATURE_STORE'] = os.environ.get("FEATURE_STORE", "1") == "1"
 
 # ---------------------------------------------------
 # Define File Paths
 # ---------------------------------------------------
 DB_FILE = "players.db"
 DATA_PATH = "training/final_dataset.csv"
+MATCHES_DIR = os.path.join("data_cleaning", "ipl last 5 season")  # ball-by-ball match files (venue stats)
 MAPS_DIR = "maps"
 MODELS_DIR = "models"
 BATSMAN_MAP_PATH = os.path.join(MAPS_DIR, "batsman_encoding_map.csv")
@@ -25,10 +57,189 @@ BOWLER_MAP_PATH = os.path.join(MAPS_DIR, "bowler_encoding_map.csv")
 VENUE_MAP_PATH = os.path.join(MAPS_DIR, "venue_encoding_map.csv")
 BATTING_HAND_MAP_PATH = os.path.join(MAPS_DIR, "batting_hand_encoding_map.csv")
 BOWLING_STYLE_MAP_PATH = os.path.join(MAPS_DIR, "bowling_style_encoding_map.csv")
+# Inputs of the compiled feature store (see feature_store.py); it is ignored once any of them changes.
+FEATURE_STORE_SOURCES = [DATA_PATH, BATSMAN_MAP_PATH, BOWLER_MAP_PATH, VENUE_MAP_PATH, BATTING_HAND_MAP_PATH,
+                         BOWLING_STYLE_MAP_PATH, DB_FILE] + match_files(MATCHES_DIR)
 
 
 # ---------------------------------------------------
-# Load Data & Create Mappings at Startup
+# Startup Phases & Lazy Loading
+# ---------------------------------------------------
+# By default everything is loaded at import time. With LAZY_LOADING=1 only the
+# player directory is loaded up front; the dataset/maps ("data") and the models
+# ("models") are loaded by a background warm-up thread (BACKGROUND_WARMUP=1, the
+# default) or on first use by a route that needs them. pandas, joblib and the
+# model libraries (xgboost/sklearn, imported by joblib.load) are only imported then.
+app.config['LAZY_LOADING'] = os.environ.get("LAZY_LOADING", "0") == "1"
+app.config['BACKGROUND_WARMUP'] = os.environ.get("BACKGROUND_WARMUP", "1") == "1"
+
+startup_timings = {}  # {phase: seconds}
+loaded_stages = set()
+load_lock = threading.RLock()
+
+
+@contextmanager
+def startup_phase(name):
+    """Times one startup phase into `startup_timings`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = round(time.perf_counter() - start, 4)
+
+
+def log_startup_report():
+    total = sum(startup_timings.values())
+    lines = [f"    {phase:<24}{seconds:>9.3f}s" for phase, seconds in startup_timings.items()]
+    logging.info("⏱️ Startup timing breakdown:\n" + "\n".join(lines) + f"\n    {'total':<24}{total:>9.3f}s")
+
+
+def ensure_loaded(*stages):
+    """
+    Runs the given load stages ('data', 'models') once; later calls return immediately.
+    The startup report is logged when the last stage has loaded, however it was triggered.
+    """
+    for stage in stages:
+        if stage in loaded_stages:
+            continue
+        with load_lock:
+            if stage not in loaded_stages:
+                LOAD_STAGES[stage]()
+                loaded_stages.add(stage)
+                if loaded_stages.issuperset(LOAD_STAGES):
+                    log_startup_report()
+
+
+def requires(*stages):
+    """Route decorator: makes sure the given load stages have run before the view."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            ensure_loaded(*stages)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------
+# Metrics (Prometheus text format at /metrics, see metrics.py)
+# ---------------------------------------------------
+metrics_registry = MetricsRegistry()
+REQUEST_SECONDS = metrics_registry.histogram(
+    "http_request_duration_seconds", "Request latency by route.", ["route", "method"])
+REQUESTS = metrics_registry.counter(
+    "http_requests_total", "Requests by route, method and status code.", ["route", "method", "status"])
+PREDICT_STAGE_SECONDS = metrics_registry.histogram(
+    "predict_stage_duration_seconds", "Time spent in each stage of the predict endpoints.", ["endpoint", "stage"],
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5))
+PREDICTION_SOURCE = metrics_registry.counter(
+    "prediction_source_total", "Predictions served from the cache, the prediction table or a model call.", ["kind", "source"])
+INFERENCE_CALLS = metrics_registry.counter(
+    "model_inference_calls_total", "Model calls by model type, algorithm and engine.", ["model_type", "algo", "engine"])
+INFERENCE_ROWS = metrics_registry.counter(
+    "model_inference_rows_total", "Feature rows scored by model type, algorithm and engine.", ["model_type", "algo", "engine"])
+PREDICTION_ERRORS = metrics_registry.counter(
+    "prediction_errors_total", "Rejected or failed predictions by endpoint and cause.", ["endpoint", "cause"])
+register_process_metrics(metrics_registry)
+metrics_registry.gauge("prediction_cache_entries", "Entries in the prediction cache.", lambda: prediction_cache.stats()["size"])
+metrics_registry.gauge("model_bundle_info", "The active model version.",
+                       lambda: [((model_registry.active.version,), 1)] if model_registry.active else None, ["version"])
+
+
+def predict_stage(stage):
+    """Times one stage of a predict endpoint into predict_stage_duration_seconds."""
+    return PREDICT_STAGE_SECONDS.labels(request.endpoint if has_request_context() else "none", stage).time()
+
+
+def count_prediction_error(cause):
+    PREDICTION_ERRORS.labels(request.endpoint if has_request_context() else "none", cause).inc()
+
+
+def prediction_error(cause, message, status):
+    """Error response of a predict endpoint, counted by cause in prediction_errors_total."""
+    count_prediction_error(cause)
+    return jsonify({"error": message}), status
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        REQUEST_SECONDS.labels(route, request.method).observe(time.perf_counter() - started)
+        REQUESTS.labels(route, request.method, str(response.status_code)).inc()
+    return response
+
+
+# ---------------------------------------------------
+# Request Profiling (opt-in, see profiling.py)
+# ---------------------------------------------------
+# A request is profiled when it sends the profiling token in an X-Profile-Token
+# header, or at random with probability PROFILE_SAMPLE_RATE. Profiles are written
+# to PROFILE_DIR (newest PROFILE_KEEP kept) and listed at GET /admin/profiles.
+app.config['PROFILE_TOKEN'] = os.environ.get("PROFILE_TOKEN") or os.environ.get("ADMIN_TOKEN")
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))  # 0-1, 0 = only on request
+app.config['PROFILE_DIR'] = os.environ.get("PROFILE_DIR", "request_profiles")
+app.config['PROFILE_KEEP'] = int(os.environ.get("PROFILE_KEEP", 100))
+
+request_profiler = RequestProfiler(app.config['PROFILE_DIR'], keep=app.config['PROFILE_KEEP'])
+
+
+def should_profile():
+    token = app.config['PROFILE_TOKEN']
+    header = request.headers.get("X-Profile-Token")
+    if token and header is not None and hmac.compare_digest(header, token):
+        return True
+    rate = app.config['PROFILE_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+
+@app.before_request
+def start_request_profile():
+    if not should_profile():
+        return
+    view_args = request.view_args or {}
+    form = request.form.to_dict() if request.mimetype != "application/json" else {}
+    args = request.args.to_dict()
+    label = "-".join([request.endpoint or "unmatched", *map(str, view_args.values()), *args.values(), *form.values()])
+    session = request_profiler.start(label, {
+        "route": request.url_rule.rule if request.url_rule else None,
+        "endpoint": request.endpoint,
+        "method": request.method,
+        "path": request.path,
+        "view_args": view_args,
+        "args": args,
+        "form": form,
+        "content_length": request.content_length
+    })
+    if session is not None:
+        g.profile_session = session
+
+
+@app.after_request
+def add_profile_header(response):
+    session = g.get('profile_session')
+    if session is not None:
+        response.headers['X-Profile-Id'] = session.name
+        g.profile_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def finish_request_profile(exc):
+    session = g.pop('profile_session', None)
+    if session is not None:
+        request_profiler.finish(session, status=g.get('profile_status', 500),
+                                error=f"{type(exc).__name__}: {exc}" if exc else None)
+
+
+# ---------------------------------------------------
+# Load Data & Create Mappings
 # ---------------------------------------------------
 matchups = {}
 batsman_list = []
@@ -37,32 +248,107 @@ name_to_encoding = {}
 encoding_to_name = {}
 batting_style_to_encoding = {}
 bowling_style_to_encoding = {}
-df_main = pd.DataFrame()
-
-try:
-    df_batsman_map = pd.read_csv(BATSMAN_MAP_PATH)
-    df_bowler_map = pd.read_csv(BOWLER_MAP_PATH)
-    df_venue_map = pd.read_csv(VENUE_MAP_PATH)
-    df_batting_hand_map = pd.read_csv(BATTING_HAND_MAP_PATH)
-    df_bowling_style_map = pd.read_csv(BOWLING_STYLE_MAP_PATH)
-
-    name_to_encoding['batsman'] = dict(zip(df_batsman_map['Original_Value'], df_batsman_map['Encoded_Value']))
-    name_to_encoding['bowler'] = dict(zip(df_bowler_map['Original_Value'], df_bowler_map['Encoded_Value']))
-    name_to_encoding['venue'] = dict(zip(df_venue_map['Original_Value'], df_venue_map['Encoded_Value']))
-    
-    batting_style_to_encoding = dict(zip(df_batting_hand_map['Original_Value'], df_batting_hand_map['Encoded_Value']))
-    bowling_style_to_encoding = dict(zip(df_bowling_style_map['Original_Value'], df_bowling_style_map['Encoded_Value']))
-
-    encoding_to_name['batsman'] = dict(zip(df_batsman_map['Encoded_Value'], df_batsman_map['Original_Value']))
-    encoding_to_name['bowler'] = dict(zip(df_bowler_map['Encoded_Value'], df_bowler_map['Original_Value']))
-    encoding_to_name['venue'] = dict(zip(df_venue_map['Encoded_Value'], df_venue_map['Original_Value']))
-
-    df_main = pd.read_csv(DATA_PATH)
-    batsman_list = sorted(df_batsman_map['Original_Value'].unique().tolist())
-    bowler_list = sorted(df_bowler_map['Original_Value'].unique().tolist())
-    all_players_list = sorted(list(set(batsman_list + bowler_list)))
-    
-    grouped = df_main.groupby(['batsman', 'bowler'])['venue'].unique().apply(list).reset_index()
+df_main = None  # only read from the CSV; None when the data comes from the feature store
+player_stats_index = {}
+venue_stats_index = {}
+
+
+def load_data():
+    """Loads the maps, `matchups` and the player/venue stats (from the feature store if it is up to date), then the reference responses."""
+    if feature_store is not None:
+        with startup_phase("read_feature_store"):
+            load_data_from_feature_store(feature_store)
+    else:
+        load_data_from_sources()
+
+    with startup_phase("reference_responses"):
+        prepare_matchup_responses()
+        prepare_venue_responses()
+
+
+def load_data_from_sources():
+    """Reads the encoding maps and the dataset, then builds `matchups` and the derived indexes."""
+    global batsman_list, all_players_list, batting_style_to_encoding, bowling_style_to_encoding
+    global df_main, player_stats_index, venue_stats_index
+    try:
+        with startup_phase("import_pandas"):
+            import pandas as pd
+
+        with startup_phase("read_maps"):
+            df_batsman_map = pd.read_csv(BATSMAN_MAP_PATH)
+            df_bowler_map = pd.read_csv(BOWLER_MAP_PATH)
+            df_venue_map = pd.read_csv(VENUE_MAP_PATH)
+            df_batting_hand_map = pd.read_csv(BATTING_HAND_MAP_PATH)
+            df_bowling_style_map = pd.read_csv(BOWLING_STYLE_MAP_PATH)
+
+            name_to_encoding['batsman'] = dict(zip(df_batsman_map['Original_Value'], df_batsman_map['Encoded_Value']))
+            name_to_encoding['bowler'] = dict(zip(df_bowler_map['Original_Value'], df_bowler_map['Encoded_Value']))
+            name_to_encoding['venue'] = dict(zip(df_venue_map['Original_Value'], df_venue_map['Encoded_Value']))
+            
+            batting_style_to_encoding = dict(zip(df_batting_hand_map['Original_Value'], df_batting_hand_map['Encoded_Value']))
+            bowling_style_to_encoding = dict(zip(df_bowling_style_map['Original_Value'], df_bowling_style_map['Encoded_Value']))
+
+            encoding_to_name['batsman'] = dict(zip(df_batsman_map['Encoded_Value'], df_batsman_map['Original_Value']))
+            encoding_to_name['bowler'] = dict(zip(df_bowler_map['Encoded_Value'], df_bowler_map['Original_Value']))
+            encoding_to_name['venue'] = dict(zip(df_venue_map['Encoded_Value'], df_venue_map['Original_Value']))
+
+        with startup_phase("read_dataset"):
+            df_main = pd.read_csv(DATA_PATH)
+            batsman_list = sorted(df_batsman_map['Original_Value'].unique().tolist())
+            bowler_list = sorted(df_bowler_map['Original_Value'].unique().tolist())
+            all_players_list = sorted(list(set(batsman_list + bowler_list)))
+
+        with startup_phase("build_matchups"):
+            matchups.update(build_matchups(df_main))
+
+        logging.info("✅ Successfully created all data mappings.")
+
+    except Exception as e:
+        logging.error(f"An error occurred during data loading: {e}", exc_info=True)
+
+    try:
+        with startup_phase("player_stats_index"):
+            player_stats_index = build_player_stats_index(df_main)
+        logging.info(f"✅ Precomputed stats for {len(player_stats_index)} players.")
+    except Exception as e:
+        logging.error(f"An error occurred while building the player stats index: {e}", exc_info=True)
+
+    try:
+        with startup_phase("venue_stats_index"):
+            venue_stats_index = build_venue_stats_index(df_main, read_deliveries(match_files(MATCHES_DIR)))
+        logging.info(f"✅ Precomputed stats for {len(venue_stats_index)} venues.")
+    except Exception as e:
+        logging.error(f"An error occurred while building the venue stats index: {e}", exc_info=True)
+
+
+def load_data_from_feature_store(store):
+    """
+    Same as load_data_from_sources, from the compiled arrays instead of pandas and the CSVs.
+    The store doesn't hold the dataset rows, so `df_main` stays None.
+    """
+    global batsman_list, all_players_list, batting_style_to_encoding, bowling_style_to_encoding
+    global player_stats_index, venue_stats_index
+    map_rows = {kind: store.map_rows(kind) for kind in ('batsman', 'bowler', 'venue', 'batting_hand', 'bowling_style')}
+    for kind in ('batsman', 'bowler', 'venue'):
+        names, codes = map_rows[kind]
+        name_to_encoding[kind] = dict(zip(names, codes))
+        encoding_to_name[kind] = dict(zip(codes, names))
+    batting_style_to_encoding = dict(zip(*map_rows['batting_hand']))
+    bowling_style_to_encoding = dict(zip(*map_rows['bowling_style']))
+
+    batsman_list = sorted(set(map_rows['batsman'][0]))
+    all_players_list = sorted(set(batsman_list) | set(map_rows['bowler'][0]))
+    matchups.update(store.matchups())
+    player_stats_index = store.player_stats
+    venue_stats_index = store.venue_stats
+    logging.info(f"✅ Loaded mappings, {len(matchups)} batsmen's matchups and stats for {len(player_stats_index)} players "
+                 f"and {len(venue_stats_index)} venues from the feature store.")
+
+
+def build_matchups(df):
+    """{batsman name: {bowler name: sorted venue names}} for every pair that has faced each other in `df`."""
+    result = {}
+    grouped = df.groupby(['batsman', 'bowler'])['venue'].unique().apply(list).reset_index()
     grouped['batsman_name'] = grouped['batsman'].map(encoding_to_name['batsman'])
     grouped['bowler_name'] = grouped['bowler'].map(encoding_to_name['bowler'])
     grouped['venue_names'] = grouped['venue'].apply(lambda venues: sorted([encoding_to_name['venue'].get(v) for v in venues if v is not None]))
@@ -70,23 +356,109 @@ try:
     for record in grouped.to_dict('records'):
         batsman, bowler, venues = record['batsman_name'], record['bowler_name'], record['venue_names']
         if batsman and bowler:
-            if batsman not in matchups: matchups[batsman] = {}
-            matchups[batsman][bowler] = venues
-    
-    logging.info("✅ Successfully created all data mappings.")
+            if batsman not in result: result[batsman] = {}
+            result[batsman][bowler] = venues
+    return result
+
+
+# ---------------------------------------------------
+# Precompute Per-Player Stats Index
+# ---------------------------------------------------
+def build_player_stats_index(df):
+    """
+    Computes the /get_player_stats payload for every player in one grouped pass over
+    `df`, so the endpoint becomes a dict lookup. Returns {player_name: stats}.
+    """
+    index = {}
+    if df is None or df.empty:
+        return index
+    inv_bowling_map = {v: k for k, v in bowling_style_to_encoding.items()}
+    inv_batting_map = {v: k for k, v in batting_style_to_encoding.items()}
+
+    # Batting Stats
+    batting_totals = df.groupby('batsman')[['total_runs', 'total_balls', 'dismissals']].sum()
+    perf_vs_bowling = df.groupby(['batsman', 'bowling_style']).agg(runs=('total_runs', 'sum')).reset_index()
+    perf_vs_bowling['bowling_style_str'] = perf_vs_bowling['bowling_style'].map(inv_bowling_map)
+    perf_vs_bowling_by_batsman = {
+        batsman_encoded: group.drop(columns='batsman').to_dict('records')
+        for batsman_encoded, group in perf_vs_bowling.groupby('batsman')
+    }
+    for batsman_encoded, row in batting_totals.iterrows():
+        player_name = encoding_to_name['batsman'].get(batsman_encoded)
+        if player_name is None:
+            continue
+        total_runs = int(row['total_runs'])
+        total_balls_faced = int(row['total_balls'])
+        total_dismissals = int(row['dismissals'])
+        index.setdefault(player_name, {})['batting'] = {
+            "total_runs": total_runs, "total_balls_faced": total_balls_faced,
+            "total_dismissals": total_dismissals,
+            "strike_rate": round((total_runs / total_balls_faced) * 100, 2) if total_balls_faced > 0 else 0,
+            "average": round(total_runs / total_dismissals, 2) if total_dismissals > 0 else float(total_runs),
+            "perf_vs_bowling_style": perf_vs_bowling_by_batsman.get(batsman_encoded, [])
+        }
+
+    # Bowling Stats
+    bowling_totals = df.groupby('bowler')[['total_runs', 'total_balls', 'dismissals']].sum()
+    perf_vs_batting = df.groupby(['bowler', 'batting_hand']).agg(wickets=('dismissals', 'sum')).reset_index()
+    perf_vs_batting['batting_hand_str'] = perf_vs_batting['batting_hand'].map(inv_batting_map)
+    perf_vs_batting_by_bowler = {
+        bowler_encoded: group.drop(columns='bowler').to_dict('records')
+        for bowler_encoded, group in perf_vs_batting.groupby('bowler')
+    }
+    for bowler_encoded, row in bowling_totals.iterrows():
+        player_name = encoding_to_name['bowler'].get(bowler_encoded)
+        if player_name is None:
+            continue
+        total_runs_conceded = int(row['total_runs'])
+        total_balls_bowled = int(row['total_balls'])
+        total_wickets = int(row['dismissals'])
+        index.setdefault(player_name, {})['bowling'] = {
+            "total_runs_conceded": total_runs_conceded, "total_balls_bowled": total_balls_bowled,
+            "total_wickets": total_wickets,
+            "economy_rate": round((total_runs_conceded / total_balls_bowled) * 6, 2) if total_balls_bowled > 0 else 0,
+            "bowling_average": round(total_runs_conceded / total_wickets, 2) if total_wickets > 0 else float(total_runs_conceded),
+            "perf_vs_batting_hand": perf_vs_batting_by_bowler.get(bowler_encoded, [])
+        }
 
-except Exception as e:
-    logging.error(f"An error occurred during data loading: {e}", exc_info=True)
+    return index
 
 
 # ---------------------------------------------------
-# Load Models
+# Precompute Per-Venue Stats Index (see venue_stats.py)
 # ---------------------------------------------------
-models = {
-    'runs': {},
-    'dismissals': {},
-    'ball_outcome': {}
-}
+def build_venue_stats_index(df, deliveries):
+    """
+    Computes the /venue_stats payload for every venue from the ball-by-ball `deliveries`
+    (see venue_stats.read_deliveries), split by the batting hand and bowling style the
+    dataset records for each player.
+    """
+    if df is None or df.empty:
+        return {}
+    inv_bowling_map = {v: k for k, v in bowling_style_to_encoding.items()}
+    inv_batting_map = {v: k for k, v in batting_style_to_encoding.items()}
+    batting_hands = {
+        encoding_to_name['batsman'].get(batsman): inv_batting_map.get(hand)
+        for batsman, hand in df.groupby('batsman')['batting_hand'].first().items()
+    }
+    bowling_styles = {
+        encoding_to_name['bowler'].get(bowler): inv_bowling_map.get(style)
+        for bowler, style in df.groupby('bowler')['bowling_style'].first().items()
+    }
+    matchup_counts = {encoding_to_name['venue'].get(venue): count for venue, count in df.groupby('venue').size().items()}
+    return build_venue_stats(deliveries, batting_hands, bowling_styles, matchup_counts)
+
+
+# ---------------------------------------------------
+# Load Models (versioned bundles, see model_registry.py)
+# ---------------------------------------------------
+# The models and the encoding maps they were trained with form one ModelBundle.
+# Requests run on the bundle they pinned when they started (current_bundle()), so
+# a hot reload never changes models in the middle of a request.
+app.config['MODEL_RELOAD_INTERVAL'] = float(os.environ.get("MODEL_RELOAD_INTERVAL", 0))  # seconds, 0 = don't watch
+app.config['ADMIN_TOKEN'] = os.environ.get("ADMIN_TOKEN")  # enables POST /admin/reload_models
+app.config['MODEL_THREADS'] = int(os.environ.get("MODEL_THREADS", 0))  # n_jobs per model, 0 = library default
+
 model_files = {
     'runs': {
         'xgb': 'xgb_model_total_runs.joblib',
@@ -101,33 +473,791 @@ model_files = {
         'encoder': 'outcome_encoder.joblib'
     }
 }
-for model_type, type_files in model_files.items():
-    for algo, filename in type_files.items():
-        path = os.path.join(MODELS_DIR, filename)
+map_files = {
+    'batsman': BATSMAN_MAP_PATH,
+    'bowler': BOWLER_MAP_PATH,
+    'venue': VENUE_MAP_PATH,
+    'batting_hand': BATTING_HAND_MAP_PATH,
+    'bowling_style': BOWLING_STYLE_MAP_PATH
+}
+prediction_cache = PredictionCache(
+    max_size=app.config['PREDICTION_CACHE_SIZE'],
+    ttl=app.config['PREDICTION_CACHE_TTL']
+)
+
+
+def model_paths():
+    """Paths of every configured model file, loaded or not."""
+    return [os.path.join(MODELS_DIR, f) for type_files in model_files.values() for f in type_files.values()]
+
+
+def bundle_paths():
+    """Files that make up a model bundle: the model files and the encoding maps."""
+    return model_paths() + list(map_files.values())
+
+
+def outcome_tensor_sources():
+    """Files the ball outcome tensor is built from: the ball outcome model and the maps that size its grid."""
+    return ([os.path.join(MODELS_DIR, f) for f in model_files['ball_outcome'].values()]
+            + [map_files[feature] for feature in ('batsman', 'bowler', 'venue')])
+
+
+def load_model_bundle(bundle):
+    """Fills a ModelBundle: models, their native copies, encoding maps, prediction table and outcome tensor."""
+    import joblib
+    import pandas as pd
+
+    for model_type, type_files in model_files.items():
+        bundle.models[model_type] = {}
+        for algo, filename in type_files.items():
+            path = os.path.join(MODELS_DIR, filename)
+            try:
+                model = joblib.load(path)
+                logging.info(f"Loaded model: {path}")
+            except FileNotFoundError:
+                logging.warning(f"Model file not found: {path}")
+                model = None
+            if model is not None and app.config['MODEL_THREADS'] and hasattr(model, "n_jobs"):
+                model.set_params(n_jobs=app.config['MODEL_THREADS'])
+            bundle.models[model_type][algo] = model
+
+    for feature, path in map_files.items():
+        df_map = pd.read_csv(path)
+        bundle.encodings[feature] = dict(zip(df_map['Original_Value'], df_map['Encoded_Value']))
+
+    compile_native_models(bundle)
+    bundle.prediction_table = load_prediction_table(model_paths())
+    bundle.outcome_tensor = load_outcome_tensor(outcome_tensor_sources())
+
+
+def validate_model_bundle(bundle, rows=8):
+    """
+    Runs synthetic matchups through every model of a new bundle before it goes live:
+    checks output shapes and ranges, checks native copies against the reference
+    models, and warms up the single-row path used by live requests.
+    """
+    for model_type in ('runs', 'dismissals'):
+        if not any(bundle.models[model_type].values()):
+            raise ModelBundleError(f"No {model_type} model in bundle {bundle.version}")
+    encoder = bundle.models['ball_outcome'].get('encoder')
+    if bundle.models['ball_outcome'].get('xgb') is not None and encoder is None:
+        raise ModelBundleError("Ball outcome model without its outcome encoder")
+
+    encoding_values = [sorted(set(bundle.encodings.get(f, {}).values())) or [0] for f in
+                       ('batsman', 'bowler', 'batting_hand', 'bowling_style', 'venue')]
+    base = np.array([[values[i % len(values)] for values in encoding_values] for i in range(rows)], dtype=np.float32)
+    inputs = {
+        'runs': np.hstack([base, np.linspace(1, 120, rows, dtype=np.float32).reshape(-1, 1)]),
+        'dismissals': base,
+        'ball_outcome': base[:, [0, 1, 4]]
+    }
+    for model_type, type_models in bundle.models.items():
+        for algo, model in type_models.items():
+            if model is None or algo == 'encoder':
+                continue
+            try:
+                reference = np.asarray(MODEL_OUTPUTS[model_type](model, inputs[model_type]), dtype=np.float64)
+                native = bundle.compiled_models[model_type].get(algo)
+                if native is not None and not np.allclose(MODEL_OUTPUTS[model_type](native, inputs[model_type]), reference, atol=1e-5):
+                    raise ModelBundleError(f"Native {model_type}/{algo} model disagrees with the reference model")
+                for row in inputs[model_type]:
+                    MODEL_OUTPUTS[model_type](live_model(bundle, model_type, algo), row.reshape(1, -1))
+            except ModelBundleError:
+                raise
+            except Exception as e:
+                raise ModelBundleError(f"{model_type}/{algo} model failed on synthetic input: {e}") from e
+            if not np.all(np.isfinite(reference)):
+                raise ModelBundleError(f"{model_type}/{algo} model returned non-finite values")
+            if model_type != 'runs' and (reference.min() < 0 or reference.max() > 1):
+                raise ModelBundleError(f"{model_type}/{algo} model returned probabilities outside [0, 1]")
+            if model_type == 'ball_outcome' and reference.shape != (rows, len(encoder.classes_)):
+                raise ModelBundleError(f"Ball outcome model returns {reference.shape[1]} classes, encoder has {len(encoder.classes_)}")
+
+
+def activate_model_bundle(bundle):
+    prediction_cache.clear()  # entries are keyed by version; this just frees the old ones
+
+
+def retire_model_bundle(bundle):
+    close_micro_batchers(bundle)
+
+
+model_registry = ModelRegistry(
+    MODELS_DIR, bundle_paths,
+    loader=load_model_bundle,
+    validator=validate_model_bundle,
+    on_activate=activate_model_bundle,
+    on_retire=retire_model_bundle
+)
+
+
+def load_models():
+    """Loads the initial model bundle and, if configured, starts watching for new versions."""
+    with startup_phase("load_models"):
+        model_registry.load()
+    model_registry.watch(app.config['MODEL_RELOAD_INTERVAL'])
+
+
+def current_bundle():
+    """The model bundle this request runs on; pinned on first use and released at teardown."""
+    if 'model_bundle' not in g:
+        g.model_bundle = model_registry.acquire()
+    return g.model_bundle
+
+
+@app.teardown_request
+def release_model_bundle(exc):
+    bundle = g.pop('model_bundle', None)
+    if bundle is not None:
+        model_registry.release(bundle)
+
+
+@app.after_request
+def add_model_version_header(response):
+    bundle = g.get('model_bundle')
+    if bundle is not None:
+        response.headers['X-Model-Version'] = bundle.version
+    return response
+
+
+# ---------------------------------------------------
+# Live Inference (optionally micro-batched, see micro_batcher.py)
+# ---------------------------------------------------
+# Output of one model call per model type: predicted runs, dismissal probability,
+# or the ball outcome class probabilities.
+MODEL_OUTPUTS = {
+    'runs': lambda model, features: model.predict(features),
+    'dismissals': lambda model, features: model.predict_proba(features)[:, 1],
+    'ball_outcome': lambda model, features: model.predict_proba(features)
+}
+micro_batchers = {}  # {(bundle, model_type, algo): MicroBatcher}
+micro_batchers_lock = threading.Lock()
+
+
+def inference_engine(model_type):
+    """The configured live inference engine ("reference" or "native") for a model type."""
+    setting = app.config['INFERENCE_ENGINE'].strip()
+    if "=" not in setting:
+        return setting or "reference"
+    engines = dict(part.strip().split("=", 1) for part in setting.split(",") if "=" in part)
+    return engines.get(model_type, "reference").strip()
+
+
+def compile_native_models(bundle):
+    """
+    Builds the native engine copy of each model in the bundle whose type is configured
+    for it. Models the engine can't handle keep using the reference implementation.
+    """
+    for model_type, type_models in bundle.models.items():
+        bundle.compiled_models[model_type] = {}
+        if inference_engine(model_type) != "native":
+            continue
+        for algo, model in type_models.items():
+            if model is None or algo == 'encoder':
+                continue
+            try:
+                bundle.compiled_models[model_type][algo] = compile_model(model)
+                logging.info(f"Compiled {model_type}/{algo} model for native inference")
+            except ValueError as e:
+                logging.warning(f"Native inference unavailable for {model_type}/{algo}, using the reference model: {e}")
+
+
+def live_model(bundle, model_type, algo):
+    """The model live inference runs on: the native copy if there is one, else the loaded model."""
+    return bundle.compiled_models[model_type].get(algo) or bundle.models[model_type][algo]
+
+
+def run_model(bundle, model_type, algo, features):
+    """Scores a feature matrix with live_model(bundle, model_type, algo), counting the call in /metrics."""
+    engine = "native" if bundle.compiled_models[model_type].get(algo) is not None else "reference"
+    INFERENCE_CALLS.labels(model_type, algo, engine).inc()
+    INFERENCE_ROWS.labels(model_type, algo, engine).inc(len(features))
+    return MODEL_OUTPUTS[model_type](live_model(bundle, model_type, algo), features)
+
+
+def get_micro_batcher(bundle, model_type, algo):
+    """Returns the batcher for live_model(bundle, model_type, algo), starting it on first use."""
+    key = (bundle, model_type, algo)
+    batcher = micro_batchers.get(key)
+    if batcher is None:
+        with micro_batchers_lock:
+            batcher = micro_batchers.get(key)
+            if batcher is None:
+                batcher = MicroBatcher(
+                    functools.partial(run_model, bundle, model_type, algo),
+                    max_batch_size=app.config['MICRO_BATCH_MAX_SIZE'],
+                    max_wait_ms=app.config['MICRO_BATCH_MAX_WAIT_MS'],
+                    name=f"batcher-{model_type}-{algo}"
+                )
+                micro_batchers[key] = batcher
+    return batcher
+
+
+def close_micro_batchers(bundle):
+    """Flushes and stops the batchers of a retired bundle."""
+    with micro_batchers_lock:
+        keys = [key for key in micro_batchers if key[0] is bundle]
+        batchers = [micro_batchers.pop(key) for key in keys]
+    for batcher in batchers:
+        batcher.close()
+
+
+def infer(bundle, model_type, algo, row):
+    """Runs one feature row through live_model(bundle, model_type, algo) (see MODEL_OUTPUTS)."""
+    if app.config['MICRO_BATCHING']:
         try:
-            models[model_type][algo] = joblib.load(path)
-            logging.info(f"Loaded model: {path}")
-        except FileNotFoundError:
-            logging.warning(f"Model file not found: {path}")
-            models[model_type][algo] = None
+            return get_micro_batcher(bundle, model_type, algo).predict(row)
+        except BatcherClosed:
+            pass  # the bundle was retired by a reload after this request picked up its batcher; score the row directly
+    return run_model(bundle, model_type, algo, np.array([row], dtype=np.float32))[0]
 
 
 # ---------------------------------------------------
-# Helper Function to Get Player Details from DB
+# Player Directory (players.db loaded into memory, see player_directory.py)
 # ---------------------------------------------------
+player_directory = PlayerDirectory(DB_FILE)
+feature_store = None
+if app.config['FEATURE_STORE']:
+    with startup_phase("open_feature_store"):
+        feature_store = load_feature_store(FEATURE_STORE_SOURCES, FEATURE_STORE_DIR)
+with startup_phase("player_directory"):
+    if feature_store is not None:
+        player_directory.load_records(feature_store.player_records())
+    else:
+        player_directory.load()
+
+
 def get_player_details_from_db(player_name):
-    """Fetches a player's details from the SQLite database."""
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT batting_hand, bowling_style FROM players WHERE player_name = ?", (player_name,))
-        player_data = cursor.fetchone()
-        conn.close()
-        return dict(player_data) if player_data else {}
-    except Exception as e:
-        logging.error(f"DB Error for {player_name}: {e}")
+    """Returns a player's batting hand and bowling style from the player directory."""
+    player = player_directory.get(player_name)
+    if player is None:
         return {}
+    return {"batting_hand": player.batting_hand, "bowling_style": player.bowling_style}
+
+
+def get_players_details_from_db(player_names):
+    """Same as get_player_details_from_db for many players, keyed by player name."""
+    details = {}
+    for name in set(player_names):
+        player_details = get_player_details_from_db(name)
+        if player_details:
+            details[name] = player_details
+    return details
+
+
+# ---------------------------------------------------
+# Pre-Serialized Reference Data (see prepared_responses.py)
+# ---------------------------------------------------
+# ETags are tied to a content hash of the dataset/map files (matchup graph, bowler
+# and venue lists) or of the player directory (roles and cards). The bowler and
+# venue lists are slices of the compiled matchup graph (matchup_graph.py), serialized
+# the first time they are requested.
+DATASET_FILES = [DATA_PATH, BATSMAN_MAP_PATH, BOWLER_MAP_PATH, VENUE_MAP_PATH, BATTING_HAND_MAP_PATH, BOWLING_STYLE_MAP_PATH]
+dataset_version = None
+matchup_graph = MatchupGraph.from_matchups({})
+matchup_responses = {'graph': None, 'bowlers': {}, 'venues': {}, 'empty': None}
+venue_responses = {'all': None, 'venues': {}}
+
+player_responses = {'version': None, 'roles': None, 'cards': {}}
+
+
+def prepare_matchup_responses():
+    """Compiles `matchups` into the matchup graph and serializes the whole graph for /matchup_graph."""
+    global dataset_version, matchup_graph, matchup_responses
+    dataset_version = hashlib.sha256(json.dumps(fingerprint_files(DATASET_FILES), sort_keys=True).encode()).hexdigest()[:16]
+    matchup_graph = MatchupGraph.from_matchups(matchups)
+    matchup_responses = {
+        'graph': prepare_json(matchup_graph.to_dict(dataset_version), dataset_version),
+        'bowlers': {},
+        'venues': {},
+        'empty': prepare_json([], dataset_version)
+    }
+
+
+def prepare_venue_responses():
+    """Serializes the venue stats, all venues in one response and each venue on its own."""
+    global venue_responses
+    venue_responses = {
+        'all': prepare_json(venue_stats_index, dataset_version),
+        'venues': {venue: prepare_json(stats, dataset_version) for venue, stats in venue_stats_index.items()}
+    }
+
+
+def prepared_slice(kind, key, names):
+    """The prepared response for a bowler/venue list, serialized on first use."""
+    prepared = matchup_responses[kind].get(key)
+    if prepared is None:
+        prepared = matchup_responses[kind][key] = prepare_json(names, dataset_version) if names else matchup_responses['empty']
+    return prepared
+
+
+def get_player_responses():
+    """Prepared roles/card responses, rebuilt whenever the player directory has reloaded."""
+    global player_responses
+    player_directory.refresh()
+    if player_responses['version'] != player_directory.version:
+        version = player_directory.version
+        player_responses = {
+            'version': version,
+            'roles': prepare_json(player_directory.roles(), version),
+            'cards': {
+                name: prepare_json(player.to_dict(), version)
+                for name, player in player_directory.players().items()
+            }
+        }
+    return player_responses
+
+
+# ---------------------------------------------------
+# Run the Load Stages (eagerly, or deferred in lazy mode)
+# ---------------------------------------------------
+LOAD_STAGES = {'data': load_data, 'models': load_models}
+
+
+def warm_up():
+    ensure_loaded('data', 'models')
+
+
+if not app.config['LAZY_LOADING']:
+    warm_up()
+elif app.config['BACKGROUND_WARMUP']:
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
+# ---------------------------------------------------
+# Helper Functions for Feature Preparation
+# ---------------------------------------------------
+MAX_BATCH_SIZE = 5000
+MAX_TOTAL_BALLS = int(BALLS_GRID[-1])  # a full T20 innings, the prediction table's grid
+
+def parse_total_balls(value):
+    """total_balls as an int between 1 and MAX_TOTAL_BALLS, or None if it isn't one."""
+    try:
+        balls_faced = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return balls_faced if 1 <= balls_faced <= MAX_TOTAL_BALLS else None
+
+
+def check_model_types(bundle, runs_model_type, dismissals_model_type):
+    """
+    The error response for model types the bundle can't score with (400 if they
+    aren't names, 500 if they aren't loaded), or None if both are usable.
+    """
+    if not isinstance(runs_model_type, str) or not isinstance(dismissals_model_type, str):
+        return prediction_error("invalid_input", "runs_model_type and dismissals_model_type must be model names.", 400)
+    if not bundle.models['runs'].get(runs_model_type) or not bundle.models['dismissals'].get(dismissals_model_type):
+        return prediction_error("model_not_loaded", f"Model type '{runs_model_type}' or '{dismissals_model_type}' not loaded.", 500)
+    return None
+
+def format_matchup_prediction(predicted_runs, dismissal_prob_value, balls_faced):
+    """Turns raw model outputs into the JSON payload shared by the predict endpoints."""
+    predicted_strike_rate = (predicted_runs / balls_faced) * 100 if balls_faced > 0 else 0
+    return {
+        "predicted_runs": round(float(max(0, predicted_runs))),
+        "strike_rate": round(float(max(0, predicted_strike_rate)), 2),
+        "dismissal_prob": "Yes" if dismissal_prob_value > 0.5 else "No",
+        "dismissal_rate": round(float(dismissal_prob_value), 2)
+    }
+
+
+def encode_matchup_batch(bundle, rows):
+    """
+    Encodes a list of {batsman, bowler, venue, total_balls} dicts in one pass with the
+    bundle's encoding maps.
+    Returns the runs feature matrix for the valid rows, their positions in `rows`
+    and a {position: error message} dict for the rows that could not be encoded.
+    The dismissals features are the first five columns of the runs features.
+    """
+    errors = {}
+    names = [r.get("batsman") for r in rows if isinstance(r, dict)] + [r.get("bowler") for r in rows if isinstance(r, dict)]
+    with predict_stage("player_lookup"):
+        player_details = get_players_details_from_db([n for n in names if n and isinstance(n, str)])
+
+    features = []
+    valid_indices = []
+    with predict_stage("encode"):
+        for i, row in enumerate(rows):
+            if not isinstance(row, dict):
+                errors[i] = "Each matchup must be an object."
+                count_prediction_error("invalid_row")
+                continue
+
+            batsman, bowler, venue = row.get("batsman"), row.get("bowler"), row.get("venue")
+            balls_faced = parse_total_balls(row.get("total_balls"))
+            if not all([batsman, bowler, venue]) or row.get("total_balls") is None:
+                errors[i] = "Invalid input. Please fill all fields."
+                count_prediction_error("invalid_input")
+                continue
+            if balls_faced is None:
+                errors[i] = f"Invalid input. total_balls must be between 1 and {MAX_TOTAL_BALLS}."
+                count_prediction_error("invalid_input")
+                continue
+            if not all(isinstance(v, str) for v in (batsman, bowler, venue)):
+                errors[i] = "Invalid input. batsman, bowler and venue must be names."
+                count_prediction_error("invalid_input")
+                continue
+
+            batting_hand_str = player_details.get(batsman, {}).get('batting_hand', 'N/A')
+            bowling_style_str = player_details.get(bowler, {}).get('bowling_style', 'N/A')
+            encoded = {
+                'batsman': bundle.encodings['batsman'].get(batsman),
+                'bowler': bundle.encodings['bowler'].get(bowler),
+                'venue': bundle.encodings['venue'].get(venue),
+                'batting_hand': bundle.encodings['batting_hand'].get(batting_hand_str),
+                'bowling_style': bundle.encodings['bowling_style'].get(bowling_style_str)
+            }
+            missing = [k for k, v in encoded.items() if v is None]
+            if missing:
+                errors[i] = f"Could not find encoded values for: {', '.join(missing)}"
+                count_prediction_error("missing_encoding")
+                continue
+
+            features.append([
+                encoded['batsman'],
+                encoded['bowler'],
+                encoded['batting_hand'],
+                encoded['bowling_style'],
+                encoded['venue'],
+                balls_faced
+            ])
+            valid_indices.append(i)
+
+        runs_features = np.array(features, dtype=np.float32).reshape(-1, 6)
+    return runs_features, valid_indices, errors
+
+
+def observed_matchup_features(bundle):
+    """Dismissals-model features (N x 5) for every (batsman, bowler, venue) in `matchups`."""
+    rows = [
+        {"batsman": batsman, "bowler": bowler, "venue": venue, "total_balls": 1}
+        for batsman, bowlers in matchups.items()
+        for bowler, venues in bowlers.items()
+        for venue in venues
+    ]
+    runs_features, _, _ = encode_matchup_batch(bundle, rows)
+    return runs_features[:, :5]
+
+
+def encode_matchup(bundle, batsman, bowler, venue, with_styles=True):
+    """
+    Encodes one matchup with the bundle's maps. Returns {feature: encoded value or None};
+    the batting hand and bowling style (looked up in the DB) are only included when
+    `with_styles` is set.
+    """
+    if with_styles:
+        with predict_stage("player_lookup"):
+            batsman_details = get_player_details_from_db(batsman)
+            bowler_details = get_player_details_from_db(bowler)
+    with predict_stage("encode"):
+        encoded = {
+            'batsman': bundle.encodings['batsman'].get(batsman),
+            'bowler': bundle.encodings['bowler'].get(bowler),
+            'venue': bundle.encodings['venue'].get(venue)
+        }
+        if with_styles:
+            encoded['batting_hand'] = bundle.encodings['batting_hand'].get(batsman_details.get('batting_hand', 'N/A'))
+            encoded['bowling_style'] = bundle.encodings['bowling_style'].get(bowler_details.get('bowling_style', 'N/A'))
+    return encoded
+
+
+def score_matchup(bundle, encoded, balls_faced, runs_model_type, dismissals_model_type):
+    """
+    Runs, strike rate and dismissal payload for an encoded matchup. Served from the
+    prediction cache, then the bundle's materialized table, then live inference.
+    """
+    prediction_table = bundle.prediction_table
+    table_key = (encoded['batsman'], encoded['bowler'], encoded['batting_hand'], encoded['bowling_style'], encoded['venue'])
+    cache_key = ('predict', bundle.version, runs_model_type, dismissals_model_type, table_key, balls_faced)
+    with predict_stage("cache_lookup"):
+        cached = prediction_cache.get(cache_key)
+    if cached is not None:
+        PREDICTION_SOURCE.labels("matchup", "cache").inc()
+        return cached
+
+    with predict_stage("table_lookup"):
+        predicted_runs = prediction_table.lookup_runs(runs_model_type, table_key, balls_faced) if prediction_table else None
+        dismissal_prob_value = prediction_table.lookup_dismissal(dismissals_model_type, table_key) if prediction_table else None
+    if predicted_runs is not None and dismissal_prob_value is not None:
+        PREDICTION_SOURCE.labels("matchup", "table").inc()
+    else:
+        PREDICTION_SOURCE.labels("matchup", "model").inc()
+        with predict_stage("inference"):
+            if predicted_runs is None:
+                predicted_runs = infer(bundle, 'runs', runs_model_type, [*table_key, balls_faced])
+            if dismissal_prob_value is None:
+                dismissal_prob_value = infer(bundle, 'dismissals', dismissals_model_type, table_key)
+
+    result = format_matchup_prediction(predicted_runs, dismissal_prob_value, balls_faced)
+    prediction_cache.put(cache_key, result)
+    return result
+
+
+def ball_outcome_probs(bundle, table_keys, kind):
+    """
+    Ball outcome class probabilities (one row per (batsman, bowler, venue) code key).
+    They are read from the bundle's outcome tensor (see outcome_tensor.py) when it is
+    built. Keys it doesn't cover come from the prediction cache, where each pair's
+    distribution is cached on its own so /predict_next_ball and the innings simulator
+    share them, then from the materialized table, then from one model call for the
+    rest. Sources are counted per key under `kind`.
+    """
+    probs = [None] * len(table_keys)
+    outcome_tensor = bundle.outcome_tensor
+    if outcome_tensor is not None:
+        with predict_stage("tensor_lookup"):
+            if len(table_keys) == 1:
+                probs[0] = outcome_tensor.lookup(table_keys[0])
+            else:
+                rows, found = outcome_tensor.lookup_many(table_keys)
+                probs = [row if ok else None for row, ok in zip(rows, found.tolist())]
+        PREDICTION_SOURCE.labels(kind, "tensor").inc(sum(p is not None for p in probs))
+    pending = [i for i, p in enumerate(probs) if p is None]
+    if not pending:
+        return probs
+
+    prediction_table = bundle.prediction_table
+    cache_keys = {i: ('ball_outcome', bundle.version, 'xgb', table_keys[i]) for i in pending}
+    with predict_stage("cache_lookup"):
+        for i in pending:
+            probs[i] = prediction_cache.get(cache_keys[i])
+    PREDICTION_SOURCE.labels(kind, "cache").inc(sum(probs[i] is not None for i in pending))
+
+    missing = [i for i in pending if probs[i] is None]
+    if missing:
+        with predict_stage("table_lookup"):
+            for i in missing:
+                probs[i] = prediction_table.lookup_ball_outcome('xgb', table_keys[i]) if prediction_table else None
+        PREDICTION_SOURCE.labels(kind, "table").inc(sum(probs[i] is not None for i in missing))
+        uncovered = [i for i in missing if probs[i] is None]
+        if uncovered:
+            PREDICTION_SOURCE.labels(kind, "model").inc(len(uncovered))
+            with predict_stage("inference"):
+                if len(uncovered) == 1:
+                    probs[uncovered[0]] = infer(bundle, 'ball_outcome', 'xgb', table_keys[uncovered[0]])
+                else:
+                    features = np.array([table_keys[i] for i in uncovered], dtype=np.float32)
+                    for i, row in zip(uncovered, run_model(bundle, 'ball_outcome', 'xgb', features)):
+                        probs[i] = row
+        for i in missing:
+            prediction_cache.put(cache_keys[i], probs[i])
+    return probs
+
+
+def score_next_ball(bundle, encoded):
+    """Next-ball outcome distribution (percent per class) for an encoded matchup."""
+    table_key = (encoded['batsman'], encoded['bowler'], encoded['venue'])
+    probs = ball_outcome_probs(bundle, [table_key], "next_ball")[0]
+
+    # Map to Labels
+    class_labels = bundle.models['ball_outcome']['encoder'].classes_
+    return {str(label): round(float(prob) * 100, 1) for label, prob in zip(class_labels, probs)}
+
+
+# ---------------------------------------------------
+# Innings Simulation (see innings_simulator.py)
+# ---------------------------------------------------
+# A batting order against a bowling plan (one bowler per over) at a venue, played out
+# ball by ball many times. The distribution of every batsman/bowler pair in the
+# innings comes from ball_outcome_probs, so all of an innings' pairs are scored in
+# at most one model call and repeated simulations reuse the cached distributions.
+MAX_BATTING_ORDER = 11
+MAX_INNINGS_OVERS = 20
+DEFAULT_SIMULATIONS = 10000
+MAX_SIMULATIONS = 200000
+
+
+def encode_innings(bundle, batting_order, bowlers, venue):
+    """
+    Ball outcome keys of every batsman in `batting_order` against every bowler in
+    `bowlers` (batsman-major), or raises ValueError naming what can't be encoded.
+    """
+    with predict_stage("encode"):
+        batsman_codes = [bundle.encodings['batsman'].get(name) for name in batting_order]
+        bowler_codes = [bundle.encodings['bowler'].get(name) for name in bowlers]
+        venue_code = bundle.encodings['venue'].get(venue)
+        missing = [f"batsman {name}" for name, code in zip(batting_order, batsman_codes) if code is None]
+        missing += [f"bowler {name}" for name, code in zip(bowlers, bowler_codes) if code is None]
+        if venue_code is None:
+            missing.append('venue')
+        if missing:
+            raise ValueError(missing_encodings_message(missing))
+    return [(batsman, bowler, venue_code) for batsman in batsman_codes for bowler in bowler_codes]
+
+
+def run_innings_simulation(bundle, batting_order, bowling_plan, venue, simulations, seed):
+    """Summary of `simulations` innings (see innings_simulator.summarize_innings)."""
+    bowlers = list(dict.fromkeys(bowling_plan))
+    table_keys = encode_innings(bundle, batting_order, bowlers, venue)
+    pair_probs = np.array(ball_outcome_probs(bundle, table_keys, "simulation"), dtype=np.float64)
+    bowler_ids = {name: j for j, name in enumerate(bowlers)}
+    pair_index = (np.arange(len(batting_order))[:, None] * len(bowlers)
+                  + np.array([bowler_ids[name] for name in bowling_plan])[None, :])
+
+    with predict_stage("simulate"):
+        runs_per_outcome, wicket_outcome = innings_simulator.outcome_values(bundle.models['ball_outcome']['encoder'].classes_)
+        runs, wickets, balls = innings_simulator.simulate_innings(
+            pair_probs, pair_index, runs_per_outcome, wicket_outcome, simulations, np.random.default_rng(seed))
+        return innings_simulator.summarize_innings(runs, wickets, balls, len(batting_order) - 1)
+
+
+# ---------------------------------------------------
+# Matchup Grids: Rankings & Team Matrices
+# ---------------------------------------------------
+# Many batsmen against many bowlers at one venue: players are encoded once per side
+# and the feature matrix is their cross product, scored with one call per model.
+# /matchup_matrix crosses two player lists; /rank_matchups crosses one opponent with
+# a list of candidates and sorts them. For rankings "best" is from the ranked side's
+# point of view: a bowler ranks higher with a higher dismissal rate
+# and fewer runs, a batsman with more runs and a lower dismissal rate. Every candidate
+# faces the same number of balls, so ranking by strike rate would equal ranking by runs.
+RANKING_ROLES = {'bowlers': ('batsman', 'bowler'), 'batsmen': ('bowler', 'batsman')}  # ranking -> (opponent, candidate)
+RANKING_OBJECTIVES = ('dismissal_rate', 'predicted_runs', 'runs_per_dismissal')
+DEFAULT_RANKING_OBJECTIVE = {'bowlers': 'dismissal_rate', 'batsmen': 'predicted_runs'}
+STYLE_FEATURES = {'batsman': 'batting_hand', 'bowler': 'bowling_style'}  # role -> style feature (and player DB field)
+MAX_RANKING_TOP = 100
+MAX_MATRIX_PLAYERS = 30  # per side, enough for two full squads
+
+
+def encode_players(bundle, role, names, player_details):
+    """
+    Encodes players of one role ('batsman' or 'bowler') with their batting hand / bowling
+    style from `player_details`. Returns (codes, style codes, encoded names, {name: [missing features]}).
+    """
+    feature = STYLE_FEATURES[role]
+    codes, styles, encoded, missing = [], [], [], {}
+    for name in names:
+        code = bundle.encodings[role].get(name)
+        style = bundle.encodings[feature].get(player_details.get(name, {}).get(feature, 'N/A'))
+        if code is None or style is None:
+            missing[name] = [k for k, v in ((role, code), (feature, style)) if v is None]
+            continue
+        codes.append(code)
+        styles.append(style)
+        encoded.append(name)
+    return codes, styles, encoded, missing
+
+
+def cross_features(batsmen, bowlers, venue_code, balls_faced):
+    """
+    Runs features (len(batsmen) * len(bowlers) x 6) of every batsman against every bowler,
+    batsman-major. `batsmen` and `bowlers` are (codes, style codes) from encode_players.
+    """
+    n, m = len(batsmen[0]), len(bowlers[0])
+    features = np.empty((n * m, 6), dtype=np.float32)
+    features[:, 0] = np.repeat(np.asarray(batsmen[0], dtype=np.float32), m)
+    features[:, 1] = np.tile(np.asarray(bowlers[0], dtype=np.float32), n)
+    features[:, 2] = np.repeat(np.asarray(batsmen[1], dtype=np.float32), m)
+    features[:, 3] = np.tile(np.asarray(bowlers[1], dtype=np.float32), n)
+    features[:, 4] = venue_code
+    features[:, 5] = balls_faced
+    return features
+
+
+def score_features(bundle, features, runs_model_type, dismissals_model_type):
+    """Predicted runs and dismissal probabilities of a runs feature matrix, one reference model call each."""
+    with predict_stage("inference"):
+        predicted_runs = bundle.models['runs'][runs_model_type].predict(features)
+        dismissal_probs = bundle.models['dismissals'][dismissals_model_type].predict_proba(features[:, :5])[:, 1]
+    for model_type, algo in (('runs', runs_model_type), ('dismissals', dismissals_model_type)):
+        INFERENCE_CALLS.labels(model_type, algo, "reference").inc()
+        INFERENCE_ROWS.labels(model_type, algo, "reference").inc(len(features))
+    return predicted_runs, dismissal_probs
+
+
+def missing_encodings_message(missing):
+    return f"Could not find encoded values for: {', '.join(missing)}"
+
+
+def encode_ranking_batch(bundle, ranking, opponent, venue, candidates, balls_faced):
+    """
+    Runs feature matrix (N x 6) of `opponent` at `venue` against every candidate. Returns
+    the matrix, the names of the encoded candidates (row order) and {candidate: error}
+    for the candidates that could not be encoded, or raises ValueError if the opponent
+    or the venue can't be encoded.
+    """
+    opponent_role, candidate_role = RANKING_ROLES[ranking]
+    with predict_stage("player_lookup"):
+        player_details = get_players_details_from_db([opponent, *candidates])
+
+    with predict_stage("encode"):
+        *fixed, _, missing = encode_players(bundle, opponent_role, [opponent], player_details)
+        venue_code = bundle.encodings['venue'].get(venue)
+        missing = missing.get(opponent, []) + (['venue'] if venue_code is None else [])
+        if missing:
+            raise ValueError(missing_encodings_message(missing))
+
+        *encoded, names, candidate_missing = encode_players(bundle, candidate_role, candidates, player_details)
+        skipped = {name: missing_encodings_message(missing) for name, missing in candidate_missing.items()}
+        batsmen, bowlers = (fixed, encoded) if ranking == 'bowlers' else (encoded, fixed)
+        features = cross_features(batsmen, bowlers, venue_code, balls_faced)
+    return features, names, skipped
+
+
+def score_ranking(bundle, ranking, opponent, venue, candidates, balls_faced, runs_model_type, dismissals_model_type):
+    """
+    (candidate names, predicted runs, dismissal probabilities, skipped) for every candidate,
+    with one call per model. Cached per (opponent, venue, balls, models, candidates), so
+    other objectives and top-N values of the same query are served from the cache.
+    """
+    cache_key = ('rank', bundle.version, ranking, opponent, venue, balls_faced, runs_model_type, dismissals_model_type,
+                 tuple(candidates))
+    with predict_stage("cache_lookup"):
+        cached = prediction_cache.get(cache_key)
+    if cached is not None:
+        PREDICTION_SOURCE.labels("ranking", "cache").inc()
+        return cached
+
+    features, names, skipped = encode_ranking_batch(bundle, ranking, opponent, venue, candidates, balls_faced)
+    PREDICTION_SOURCE.labels("ranking", "model").inc()
+    predicted_runs = dismissal_probs = np.empty(0, dtype=np.float32)
+    if names:
+        predicted_runs, dismissal_probs = score_features(bundle, features, runs_model_type, dismissals_model_type)
+
+    result = (names, predicted_runs, dismissal_probs, skipped)
+    prediction_cache.put(cache_key, result)
+    return result
+
+
+def score_matrix(bundle, batsmen, bowlers, venue, balls_faced, runs_model_type, dismissals_model_type):
+    """
+    Scores every batsman against every bowler. Returns predicted runs and dismissal
+    probabilities as len(batsmen) x len(bowlers) arrays (NaN where a player couldn't be
+    encoded) and {name: error} for those players, or raises ValueError for an unknown venue.
+    """
+    with predict_stage("player_lookup"):
+        player_details = get_players_details_from_db([*batsmen, *bowlers])
+
+    with predict_stage("encode"):
+        venue_code = bundle.encodings['venue'].get(venue)
+        if venue_code is None:
+            raise ValueError(missing_encodings_message(['venue']))
+        *batting, batting_names, batting_missing = encode_players(bundle, 'batsman', batsmen, player_details)
+        *bowling, bowling_names, bowling_missing = encode_players(bundle, 'bowler', bowlers, player_details)
+        features = cross_features(batting, bowling, venue_code, balls_faced)
+
+    predicted_runs = np.full((len(batsmen), len(bowlers)), np.nan)
+    dismissal_probs = np.full((len(batsmen), len(bowlers)), np.nan)
+    if len(features):
+        runs, probs = score_features(bundle, features, runs_model_type, dismissals_model_type)
+        cells = np.ix_([i for i, name in enumerate(batsmen) if name not in batting_missing],
+                       [j for j, name in enumerate(bowlers) if name not in bowling_missing])
+        predicted_runs[cells] = runs.reshape(len(batting_names), len(bowling_names))
+        dismissal_probs[cells] = probs.reshape(len(batting_names), len(bowling_names))
+
+    errors = {name: missing_encodings_message(missing) for name, missing in {**batting_missing, **bowling_missing}.items()}
+    return predicted_runs, dismissal_probs, errors
+
+
+def rank_candidates(ranking, objective, names, predicted_runs, dismissal_probs, top):
+    """Indices of the `top` best candidates for `objective`, best first (ties keep name order)."""
+    if objective == 'runs_per_dismissal':
+        values = np.maximum(predicted_runs, 0) / np.maximum(dismissal_probs, 1e-6)
+    else:
+        values = {'dismissal_rate': dismissal_probs, 'predicted_runs': predicted_runs}[objective]
+    higher_is_better = (objective == 'dismissal_rate') == (ranking == 'bowlers')
+    order = np.argsort(-values if higher_is_better else values, kind='stable')
+    return order[:top]
 
 
 # ---------------------------------------------------
@@ -138,10 +1268,13 @@ def index():
     return render_template("index.html")
 
 @app.route("/analysis")
+@requires('data')
 def analysis():
-    return render_template("analysis.html", batsman_list=batsman_list)
+    return render_template("analysis.html", batsman_list=batsman_list, dataset_version=dataset_version,
+                           venue_stats_version=venue_responses['all'].etag)
 
 @app.route("/profiles")
+@requires('data')
 def profiles():
     return render_template("profiles.html", all_players_list=all_players_list)
 
@@ -149,6 +1282,7 @@ def profiles():
 # Prediction Logic
 # ---------------------------------------------------
 @app.route("/predict", methods=["POST"])
+@requires('data', 'models')
 def predict():
     try:
         data = request.form
@@ -164,70 +1298,82 @@ def predict():
         dismissals_model_type = data.get("dismissals_model_type", "xgb")
         
         if not all([batsman, bowler, venue]) or balls_faced <= 0:
-            return jsonify({"error": "Invalid input. Please fill all fields."}), 400
-
-        runs_model = models['runs'].get(runs_model_type)
-        dismissals_model = models['dismissals'].get(dismissals_model_type)
+            return prediction_error("invalid_input", "Invalid input. Please fill all fields.", 400)
 
-        if not runs_model or not dismissals_model:
-            return jsonify({"error": f"Model type '{runs_model_type}' or '{dismissals_model_type}' not loaded."}), 500
+        bundle = current_bundle()
+        if not bundle.models['runs'].get(runs_model_type) or not bundle.models['dismissals'].get(dismissals_model_type):
+            return prediction_error("model_not_loaded", f"Model type '{runs_model_type}' or '{dismissals_model_type}' not loaded.", 500)
 
         # --- Feature Preparation ---
-        batsman_details = get_player_details_from_db(batsman)
-        bowler_details = get_player_details_from_db(bowler)
+        encoded = encode_matchup(bundle, batsman, bowler, venue)
+        missing = [k for k, v in encoded.items() if v is None]
+        if missing:
+            return prediction_error("missing_encoding", f"Could not find encoded values for: {', '.join(missing)}", 400)
 
-        batsman_encoded = name_to_encoding['batsman'].get(batsman)
-        bowler_encoded = name_to_encoding['bowler'].get(bowler)
-        venue_encoded = name_to_encoding['venue'].get(venue)
-        
-        batting_hand_str = batsman_details.get('batting_hand', 'N/A')
-        batting_hand_encoded = batting_style_to_encoding.get(batting_hand_str)
+        # --- Prediction ---
+        result = score_matchup(bundle, encoded, balls_faced, runs_model_type, dismissals_model_type)
+        with predict_stage("serialize"):
+            return jsonify(result)
 
-        bowling_style_str = bowler_details.get('bowling_style', 'N/A')
-        bowling_style_encoded = bowling_style_to_encoding.get(bowling_style_str)
+    except Exception as e:
+        logging.error(f"Prediction error: {e}", exc_info=True)
+        return prediction_error("unexpected", "An unexpected server error occurred.", 500)
 
-        if any(v is None for v in [batsman_encoded, bowler_encoded, venue_encoded, batting_hand_encoded, bowling_style_encoded]):
-            missing = [k for k,v in {'batsman':batsman_encoded, 'bowler':bowler_encoded, 'venue':venue_encoded, 'batting_hand':batting_hand_encoded, 'bowling_style':bowling_style_encoded}.items() if v is None]
-            return jsonify({"error": f"Could not find encoded values for: {', '.join(missing)}"}), 400
-        
-        runs_features = np.array([[
-            batsman_encoded,
-            bowler_encoded,
-            batting_hand_encoded,
-            bowling_style_encoded,
-            venue_encoded,
-            balls_faced
-        ]], dtype=np.float32)
-        
-        dismissals_features = np.array([[
-            batsman_encoded,
-            bowler_encoded,
-            batting_hand_encoded,
-            bowling_style_encoded,
-            venue_encoded
-        ]], dtype=np.float32)
-        
-        # --- Prediction ---
-        predicted_runs = runs_model.predict(runs_features)[0]
-        predicted_strike_rate = (predicted_runs / balls_faced) * 100 if balls_faced > 0 else 0
-        dismissal_prob_value = dismissals_model.predict_proba(dismissals_features)[0][1]
 
-        return jsonify({
-            "predicted_runs": round(float(max(0, predicted_runs))),
-            "strike_rate": round(float(max(0, predicted_strike_rate)), 2),
-            "dismissal_prob": "Yes" if dismissal_prob_value > 0.5 else "No",
-            "dismissal_rate": round(float(dismissal_prob_value), 2)
-        })
+@app.route("/predict_batch", methods=["POST"])
+@requires('data', 'models')
+def predict_batch():
+    """
+    Scores many matchups in one request. Accepts a JSON array of
+    {batsman, bowler, venue, total_balls} objects, or an object holding that
+    array under "matchups" together with optional model type overrides.
+    Results come back in input order; rows that fail carry an "error" instead.
+    """
+    try:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, list):
+            payload = {"matchups": payload}
+        if not isinstance(payload, dict) or not isinstance(payload.get("matchups"), list):
+            return prediction_error("invalid_payload", "Expected a JSON array of matchups.", 400)
+
+        rows = payload["matchups"]
+        if len(rows) > MAX_BATCH_SIZE:
+            return prediction_error("batch_too_large", f"Batch too large. Maximum is {MAX_BATCH_SIZE} matchups.", 400)
+
+        runs_model_type = payload.get("runs_model_type", "xgb")
+        dismissals_model_type = payload.get("dismissals_model_type", "xgb")
+        bundle = current_bundle()
+        model_error = check_model_types(bundle, runs_model_type, dismissals_model_type)
+        if model_error:
+            return model_error
+
+        # --- Feature Preparation (one pass for the whole batch) ---
+        runs_features, valid_indices, errors = encode_matchup_batch(bundle, rows)
+
+        # --- Prediction (one call per model) ---
+        results = [{"error": errors[i]} if i in errors else None for i in range(len(rows))]
+        if valid_indices:
+            predicted_runs, dismissal_probs = score_features(bundle, runs_features, runs_model_type, dismissals_model_type)
+            for i, runs, prob, balls in zip(valid_indices, predicted_runs, dismissal_probs, runs_features[:, 5]):
+                results[i] = format_matchup_prediction(runs, prob, balls)
+
+        with predict_stage("serialize"):
+            return jsonify({
+                "results": results,
+                "succeeded": len(valid_indices),
+                "failed": len(errors)
+            })
 
     except Exception as e:
-        logging.error(f"Prediction error: {e}", exc_info=True)
-        return jsonify({"error": "An unexpected server error occurred."}), 500
+        logging.error(f"Batch prediction error: {e}", exc_info=True)
+        return prediction_error("unexpected", "An unexpected server error occurred.", 500)
 
 
 
 
 
 @app.route("/predict_next_ball", methods=["POST"])
+@requires('data', 'models')
 def predict_next_ball():
     try:
         data = request.form
@@ -236,120 +1382,291 @@ def predict_next_ball():
         venue = data.get("venue")
 
         if not all([batsman, bowler, venue]):
-            return jsonify({"error": "Missing inputs"}), 400
-
-        # Load Model & Encoder
-        model = models.get('ball_outcome', {}).get('xgb')
-        encoder = models.get('ball_outcome', {}).get('encoder')
+            return prediction_error("invalid_input", "Missing inputs", 400)
 
-        if not model or not encoder:
-            return jsonify({"error": "Ball Outcome Model not ready."}), 500
+        bundle = current_bundle()
+        if not bundle.models['ball_outcome'].get('xgb') or not bundle.models['ball_outcome'].get('encoder'):
+            return prediction_error("model_not_loaded", "Ball Outcome Model not ready.", 500)
 
         # Encode Features
-        batsman_encoded = name_to_encoding['batsman'].get(batsman)
-        bowler_encoded = name_to_encoding['bowler'].get(bowler)
-        venue_encoded = name_to_encoding['venue'].get(venue)
+        encoded = encode_matchup(bundle, batsman, bowler, venue, with_styles=False)
+        if None in encoded.values():
+            return prediction_error("missing_encoding", "Entity not found in training map.", 400)
 
-        if None in [batsman_encoded, bowler_encoded, venue_encoded]:
-            return jsonify({"error": "Entity not found in training map."}), 400
+        result = score_next_ball(bundle, encoded)
+        with predict_stage("serialize"):
+            return jsonify(result)
 
-        # Predict Probabilities
-        features = np.array([[batsman_encoded, bowler_encoded, venue_encoded]])
-        probs = model.predict_proba(features)[0]
-        
-        # Map to Labels
-        class_labels = encoder.classes_
-        result = {str(label): round(float(prob) * 100, 1) for label, prob in zip(class_labels, probs)}
+    except Exception as e:
+        logging.error(f"Ball Prediction Error: {e}")
+        return prediction_error("unexpected", str(e), 500)
 
-        return jsonify(result)
+
+@app.route("/predict_matchup", methods=["POST"])
+@requires('data', 'models')
+def predict_matchup():
+    """
+    /predict and /predict_next_ball in one round-trip: validates and encodes the
+    matchup once and returns the runs/dismissal fields plus the next-ball
+    distribution under "next_ball" (null if the ball outcome model is unavailable).
+    """
+    try:
+        data = request.form
+        batsman = data.get("batsman")
+        bowler = data.get("bowler")
+        venue = data.get("venue")
+
+        balls_faced = int(data.get("total_balls", 0))
+
+        runs_model_type = data.get("runs_model_type", "xgb")
+        dismissals_model_type = data.get("dismissals_model_type", "xgb")
+
+        if not all([batsman, bowler, venue]) or balls_faced <= 0:
+            return prediction_error("invalid_input", "Invalid input. Please fill all fields.", 400)
+
+        bundle = current_bundle()
+        if not bundle.models['runs'].get(runs_model_type) or not bundle.models['dismissals'].get(dismissals_model_type):
+            return prediction_error("model_not_loaded", f"Model type '{runs_model_type}' or '{dismissals_model_type}' not loaded.", 500)
+
+        # --- Feature Preparation (shared by both predictions) ---
+        encoded = encode_matchup(bundle, batsman, bowler, venue)
+        missing = [k for k, v in encoded.items() if v is None]
+        if missing:
+            return prediction_error("missing_encoding", f"Could not find encoded values for: {', '.join(missing)}", 400)
+
+        # --- Prediction ---
+        result = dict(score_matchup(bundle, encoded, balls_faced, runs_model_type, dismissals_model_type))
+        ball_model_ready = bundle.models['ball_outcome'].get('xgb') and bundle.models['ball_outcome'].get('encoder')
+        result["next_ball"] = score_next_ball(bundle, encoded) if ball_model_ready else None
+
+        with predict_stage("serialize"):
+            return jsonify(result)
 
     except Exception as e:
-        logging.error(f"Ball Prediction Error: {e}")
-        return jsonify({"error": str(e)}), 500
+        logging.error(f"Matchup prediction error: {e}", exc_info=True)
+        return prediction_error("unexpected", "An unexpected server error occurred.", 500)
+
+
+@app.route("/rank_matchups", methods=["POST"])
+@requires('data', 'models')
+def rank_matchups():
+    """
+    Ranks bowlers against a batsman ({"batsman": ...}) or batsmen against a bowler
+    ({"bowler": ...}) at a venue. JSON body: venue, total_balls, optional candidates
+    (default: every player the models know in that role), objective
+    (dismissal_rate, predicted_runs or runs_per_dismissal) and top (default 10).
+    """
+    try:
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return prediction_error("invalid_payload", "Expected a JSON object.", 400)
+        if bool(payload.get("batsman")) == bool(payload.get("bowler")):
+            return prediction_error("invalid_input", "Send either a batsman (to rank bowlers) or a bowler (to rank batsmen).", 400)
+        ranking = 'bowlers' if payload.get("batsman") else 'batsmen'
+        opponent_role, candidate_role = RANKING_ROLES[ranking]
+        opponent = payload[opponent_role]
+        venue = payload.get("venue")
+        objective = payload.get("objective", DEFAULT_RANKING_OBJECTIVE[ranking])
+        runs_model_type = payload.get("runs_model_type", "xgb")
+        dismissals_model_type = payload.get("dismissals_model_type", "xgb")
+        balls_faced = parse_total_balls(payload.get("total_balls"))
+        try:
+            top = int(payload.get("top", 10))
+        except (TypeError, ValueError, OverflowError):
+            top = 0
+        candidates = payload.get("candidates")
+
+        if not isinstance(opponent, str):
+            return prediction_error("invalid_input", f"{opponent_role} must be a player name.", 400)
+        if not venue or not isinstance(venue, str) or balls_faced is None or not 0 < top <= MAX_RANKING_TOP:
+            return prediction_error("invalid_input", f"Invalid input. Send a venue, total_balls between 1 and {MAX_TOTAL_BALLS} and top between 1 and {MAX_RANKING_TOP}.", 400)
+        if objective not in RANKING_OBJECTIVES:
+            return prediction_error("invalid_input", f"Unknown objective '{objective}'. Choose from {', '.join(RANKING_OBJECTIVES)}.", 400)
+        if candidates is not None and (not isinstance(candidates, list) or not all(isinstance(c, str) for c in candidates)):
+            return prediction_error("invalid_input", "candidates must be a list of player names.", 400)
+        if candidates is not None and len(candidates) > MAX_BATCH_SIZE:
+            return prediction_error("batch_too_large", f"Too many candidates. Maximum is {MAX_BATCH_SIZE}.", 400)
+
+        bundle = current_bundle()
+        model_error = check_model_types(bundle, runs_model_type, dismissals_model_type)
+        if model_error:
+            return model_error
+        if candidates is None:
+            candidates = sorted(name for name in bundle.encodings[candidate_role] if isinstance(name, str) and name != opponent)
+        else:
+            candidates = list(dict.fromkeys(candidates))
+
+        try:
+            names, predicted_runs, dismissal_probs, skipped = score_ranking(
+                bundle, ranking, opponent, venue, candidates, balls_faced, runs_model_type, dismissals_model_type)
+        except ValueError as e:
+            return prediction_error("missing_encoding", str(e), 400)
+
+        with predict_stage("rank"):
+            best = rank_candidates(ranking, objective, names, predicted_runs, dismissal_probs, top)
+            results = [
+                {candidate_role: names[i], "rank": rank,
+                 **format_matchup_prediction(predicted_runs[i], dismissal_probs[i], balls_faced)}
+                for rank, i in enumerate(best.tolist(), start=1)
+            ]
+
+        with predict_stage("serialize"):
+            return jsonify({
+                opponent_role: opponent,
+                "venue": venue,
+                "total_balls": balls_faced,
+                "ranking": ranking,
+                "objective": objective,
+                "results": results,
+                "scored": len(names),
+                "skipped": skipped
+            })
+
+    except Exception as e:
+        logging.error(f"Ranking error: {e}", exc_info=True)
+        return prediction_error("unexpected", "An unexpected server error occurred.", 500)
+
+
+@app.route("/matchup_matrix", methods=["POST"])
+@requires('data', 'models')
+def matchup_matrix():
+    """
+    Every batsman in one list against every bowler in another at a venue. JSON body:
+    batsmen, bowlers, venue, total_balls (and optional model types). Returns grids with
+    one row per batsman and one column per bowler; cells of players that can't be
+    encoded are null and the player is listed under "errors".
+    """
+    try:
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return prediction_error("invalid_payload", "Expected a JSON object.", 400)
+        batsmen, bowlers = payload.get("batsmen"), payload.get("bowlers")
+        venue = payload.get("venue")
+        runs_model_type = payload.get("runs_model_type", "xgb")
+        dismissals_model_type = payload.get("dismissals_model_type", "xgb")
+        balls_faced = parse_total_balls(payload.get("total_balls"))
+
+        for players in (batsmen, bowlers):
+            if not isinstance(players, list) or not players or not all(isinstance(p, str) for p in players):
+                return prediction_error("invalid_input", "batsmen and bowlers must be non-empty lists of player names.", 400)
+            if len(players) > MAX_MATRIX_PLAYERS:
+                return prediction_error("batch_too_large", f"Too many players. Maximum is {MAX_MATRIX_PLAYERS} per side.", 400)
+        if not venue or not isinstance(venue, str) or balls_faced is None:
+            return prediction_error("invalid_input", f"Invalid input. Send a venue and total_balls between 1 and {MAX_TOTAL_BALLS}.", 400)
+
+        bundle = current_bundle()
+        model_error = check_model_types(bundle, runs_model_type, dismissals_model_type)
+        if model_error:
+            return model_error
+
+        batsmen, bowlers = list(dict.fromkeys(batsmen)), list(dict.fromkeys(bowlers))
+        try:
+            predicted_runs, dismissal_probs, errors = score_matrix(
+                bundle, batsmen, bowlers, venue, balls_faced, runs_model_type, dismissals_model_type)
+        except ValueError as e:
+            return prediction_error("missing_encoding", str(e), 400)
+
+        with predict_stage("serialize"):
+            grids = {"predicted_runs": [], "strike_rate": [], "dismissal_rate": []}
+            for runs_row, probs_row in zip(predicted_runs.tolist(), dismissal_probs.tolist()):
+                cells = [format_matchup_prediction(runs, prob, balls_faced) if runs == runs else None
+                         for runs, prob in zip(runs_row, probs_row)]
+                for field, grid in grids.items():
+                    grid.append([cell[field] if cell else None for cell in cells])
+            return jsonify({
+                "batsmen": batsmen,
+                "bowlers": bowlers,
+                "venue": venue,
+                "total_balls": balls_faced,
+                **grids,
+                "scored": int(np.count_nonzero(~np.isnan(predicted_runs))),
+                "errors": errors
+            })
+
+    except Exception as e:
+        logging.error(f"Matchup matrix error: {e}", exc_info=True)
+        return prediction_error("unexpected", "An unexpected server error occurred.", 500)
+
+
+@app.route("/simulate_innings", methods=["POST"])
+@requires('data', 'models')
+def simulate_innings():
+    """
+    Monte Carlo simulation of an innings. JSON body: batting_order (2 to 11 batsmen),
+    bowling_plan (the bowler of each over, up to 20), venue, optional simulations
+    (default 10000) and seed (for repeatable results). Returns the distributions of
+    total runs and wickets.
+    """
+    try:
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return prediction_error("invalid_payload", "Expected a JSON object.", 400)
+        batting_order, bowling_plan = payload.get("batting_order"), payload.get("bowling_plan")
+        venue = payload.get("venue")
+        seed = payload.get("seed")
+        try:
+            simulations = int(payload.get("simulations", DEFAULT_SIMULATIONS))
+        except (TypeError, ValueError):
+            simulations = 0
+
+        if (not isinstance(batting_order, list) or not 2 <= len(batting_order) <= MAX_BATTING_ORDER
+                or not all(isinstance(p, str) for p in batting_order) or len(set(batting_order)) != len(batting_order)):
+            return prediction_error("invalid_input", f"batting_order must list 2 to {MAX_BATTING_ORDER} different batsmen.", 400)
+        if (not isinstance(bowling_plan, list) or not 1 <= len(bowling_plan) <= MAX_INNINGS_OVERS
+                or not all(isinstance(p, str) for p in bowling_plan)):
+            return prediction_error("invalid_input", f"bowling_plan must list the bowler of each over (1 to {MAX_INNINGS_OVERS} overs).", 400)
+        if not venue or not isinstance(venue, str) or not 0 < simulations <= MAX_SIMULATIONS:
+            return prediction_error("invalid_input", f"Invalid input. Send a venue and simulations between 1 and {MAX_SIMULATIONS}.", 400)
+        if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+            return prediction_error("invalid_input", "seed must be a non-negative integer.", 400)
+
+        bundle = current_bundle()
+        if not bundle.models['ball_outcome'].get('xgb') or not bundle.models['ball_outcome'].get('encoder'):
+            return prediction_error("model_not_loaded", "Ball Outcome Model not ready.", 500)
+
+        try:
+            summary = run_innings_simulation(bundle, batting_order, bowling_plan, venue, simulations, seed)
+        except ValueError as e:
+            return prediction_error("missing_encoding", str(e), 400)
+
+        with predict_stage("serialize"):
+            return jsonify({
+                "batting_order": batting_order,
+                "bowling_plan": bowling_plan,
+                "venue": venue,
+                "simulations": simulations,
+                "seed": seed,
+                **summary
+            })
+
+    except Exception as e:
+        logging.error(f"Innings simulation error: {e}", exc_info=True)
+        return prediction_error("unexpected", "An unexpected server error occurred.", 500)
 
 
 # --- API ENDPOINTS ---
 @app.route("/get_all_player_roles")
 def get_all_player_roles():
-    """ ✅ NEW: Fetches all players and their roles from the DB for frontend filtering. """
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT player_name, role FROM players")
-        players = cursor.fetchall()
-        conn.close()
-        # Convert list of rows to a dictionary of {name: role}
-        player_roles = {p['player_name']: p['role'] for p in players}
-        return jsonify(player_roles)
-    except Exception as e:
-        logging.error(f"Database error in get_all_player_roles: {e}")
+    """ ✅ NEW: Returns all players and their roles for frontend filtering. """
+    if not player_directory.loaded:
         return jsonify({"error": "Database error"}), 500
+    return serve_prepared(get_player_responses()['roles'], request, app.config['REFERENCE_DATA_MAX_AGE'])
 
 @app.route("/get_player_card/<player_name>")
 def get_player_card(player_name):
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM players WHERE player_name = ?", (player_name,))
-        player_data = cursor.fetchone()
-        conn.close()
-        if player_data:
-            return jsonify(dict(player_data))
-        return jsonify({"error": "Player not found"}), 404
-    except Exception as e:
-        logging.error(f"Database error for player {player_name}: {e}")
+    if not player_directory.loaded:
         return jsonify({"error": "Database error"}), 500
+    prepared = get_player_responses()['cards'].get(player_name)
+    if prepared:
+        return serve_prepared(prepared, request, app.config['REFERENCE_DATA_MAX_AGE'])
+    return jsonify({"error": "Player not found"}), 404
 
 @app.route("/get_player_stats/<player_name>")
+@requires('data')
 def get_player_stats(player_name):
-    """Calculates and returns overall statistics for a given player."""
+    """Returns overall statistics for a given player from the precomputed index."""
     try:
-        stats = {}
-        
-        # Batting Stats
-        batsman_encoded = name_to_encoding['batsman'].get(player_name)
-        if batsman_encoded is not None:
-            batting_df = df_main[df_main['batsman'] == batsman_encoded]
-            if not batting_df.empty:
-                total_runs = int(batting_df['total_runs'].sum())
-                total_balls_faced = int(batting_df['total_balls'].sum())
-                total_dismissals = int(batting_df['dismissals'].sum())
-                stats['batting'] = {
-                    "total_runs": total_runs, "total_balls_faced": total_balls_faced,
-                    "total_dismissals": total_dismissals,
-                    "strike_rate": round((total_runs / total_balls_faced) * 100, 2) if total_balls_faced > 0 else 0,
-                    "average": round(total_runs / total_dismissals, 2) if total_dismissals > 0 else float(total_runs)
-                }
-                
-                # ✅ FIX: Correctly map encoded styles back to names for chart data
-                perf_vs_bowling = batting_df.groupby('bowling_style').agg(runs=('total_runs', 'sum')).reset_index()
-                inv_bowling_map = {v: k for k, v in bowling_style_to_encoding.items()}
-                perf_vs_bowling['bowling_style_str'] = perf_vs_bowling['bowling_style'].map(inv_bowling_map)
-                stats['batting']['perf_vs_bowling_style'] = perf_vs_bowling.to_dict('records')
-
-        # Bowling Stats
-        bowler_encoded = name_to_encoding['bowler'].get(player_name)
-        if bowler_encoded is not None:
-            bowling_df = df_main[df_main['bowler'] == bowler_encoded]
-            if not bowling_df.empty:
-                total_runs_conceded = int(bowling_df['total_runs'].sum())
-                total_balls_bowled = int(bowling_df['total_balls'].sum())
-                total_wickets = int(bowling_df['dismissals'].sum())
-                stats['bowling'] = {
-                    "total_runs_conceded": total_runs_conceded, "total_balls_bowled": total_balls_bowled,
-                    "total_wickets": total_wickets,
-                    "economy_rate": round((total_runs_conceded / total_balls_bowled) * 6, 2) if total_balls_bowled > 0 else 0,
-                    "bowling_average": round(total_runs_conceded / total_wickets, 2) if total_wickets > 0 else float(total_runs_conceded)
-                }
-                
-                # ✅ FIX: Correctly map encoded styles back to names for chart data
-                perf_vs_batting = bowling_df.groupby('batting_hand').agg(wickets=('dismissals', 'sum')).reset_index()
-                inv_batting_map = {v: k for k, v in batting_style_to_encoding.items()}
-                perf_vs_batting['batting_hand_str'] = perf_vs_batting['batting_hand'].map(inv_batting_map)
-                stats['bowling']['perf_vs_batting_hand'] = perf_vs_batting.to_dict('records')
-
+        stats = player_stats_index.get(player_name)
         if not stats:
             return jsonify({"error": "Player has no stats in this dataset."}), 404
         return jsonify(stats)
@@ -359,13 +1676,134 @@ def get_player_stats(player_name):
         return jsonify({"error": "Could not calculate player stats."}), 500
 
 
+@app.route("/healthz")
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({"status": "ok"})
+
+
+@app.route("/readyz")
+def readyz():
+    """Readiness: data and models are loaded (always true unless LAZY_LOADING is set)."""
+    ready = all(stage in loaded_stages for stage in LOAD_STAGES)
+    return jsonify({
+        "ready": ready,
+        "loaded_stages": sorted(loaded_stages),
+        "model_version": model_registry.active.version if model_registry.active else None,
+        "startup_timings": startup_timings
+    }), 200 if ready else 503
+
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus metrics of this process: request/stage latencies, inference and error counts, memory."""
+    return app.response_class(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+@app.route("/cache_stats")
+def cache_stats():
+    """Hit/miss/eviction counters of the in-process prediction cache."""
+    return jsonify(prediction_cache.stats())
+
+
+@app.route("/batcher_stats")
+def batcher_stats():
+    """Batch counts and sizes of the live micro-batchers (empty unless MICRO_BATCHING=1)."""
+    return jsonify({
+        "enabled": app.config['MICRO_BATCHING'],
+        "batchers": {f"{bundle.version}/{model_type}/{algo}": b.stats() for (bundle, model_type, algo), b in list(micro_batchers.items())}
+    })
+
+
+@app.route("/model_version")
+def model_version():
+    """Active model bundle (version, file hashes, loaded models), reload state and recent versions."""
+    return jsonify(model_registry.status())
+
+
+def check_admin_token():
+    """Error response unless ADMIN_TOKEN is configured and sent in the X-Admin-Token header."""
+    token = app.config['ADMIN_TOKEN']
+    if not token:
+        return jsonify({"error": "Admin endpoints are disabled."}), 404
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token):
+        return jsonify({"error": "Forbidden"}), 403
+    return None
+
+
+@app.route("/admin/reload_models", methods=["POST"])
+def admin_reload_models():
+    """
+    Loads, validates and warms up the model bundle on disk in the background, then swaps
+    it in. Needs ADMIN_TOKEN to be configured and sent in the X-Admin-Token header.
+    """
+    denied = check_admin_token()
+    if denied:
+        return denied
+    force = request.args.get("force") == "1"
+    started = model_registry.reload_async(force=force)
+    return jsonify({"started": started, **model_registry.status()}), 202 if started else 409
+
+
+@app.route("/admin/profiles")
+def admin_profiles():
+    """Saved request profiles of this process, newest first (route, arguments, status, duration)."""
+    denied = check_admin_token()
+    if denied:
+        return denied
+    return jsonify(request_profiler.list_profiles())
+
+
+@app.route("/admin/profiles/<path:filename>")
+def admin_profile_file(filename):
+    """Downloads one profile file (<name>.prof, .collapsed or .json)."""
+    denied = check_admin_token()
+    if denied:
+        return denied
+    if not filename.endswith((".prof", ".collapsed", ".json")):
+        return jsonify({"error": "Unknown profile file."}), 404
+    return send_from_directory(os.path.abspath(app.config['PROFILE_DIR']), filename, as_attachment=True)
+
+
+@app.route("/matchup_graph")
+@requires('data')
+def get_matchup_graph():
+    """The whole batsman -> bowler -> venue graph by id (see matchup_graph.py), for client-side dropdowns."""
+    max_age = VERSIONED_MAX_AGE if request.args.get("v") == dataset_version else app.config['REFERENCE_DATA_MAX_AGE']
+    return serve_prepared(matchup_responses['graph'], request, max_age)
+
+@app.route("/venue_stats")
+@requires('data')
+def get_venue_stats():
+    """Stats of every venue, {venue: stats}. Requested with ?v=<ETag of this response, without a content-coding suffix>, it may be cached for a year."""
+    prepared = venue_responses['all']
+    max_age = VERSIONED_MAX_AGE if request.args.get("v") == prepared.etag else app.config['REFERENCE_DATA_MAX_AGE']
+    return serve_prepared(prepared, request, max_age)
+
+@app.route("/venue_stats/<venue_name>")
+@requires('data')
+def get_venue(venue_name):
+    prepared = venue_responses['venues'].get(venue_name)
+    if prepared is None:
+        return jsonify({"error": "Venue has no stats in this dataset."}), 404
+    return serve_prepared(prepared, request, app.config['REFERENCE_DATA_MAX_AGE'])
+
 @app.route("/get_bowlers/<batsman_name>")
+@requires('data')
 def get_bowlers(batsman_name):
-    return jsonify(sorted(list(matchups.get(batsman_name, {}).keys())))
+    if batsman_name not in matchup_graph.batsman_ids:
+        return serve_prepared(matchup_responses['empty'], request, app.config['REFERENCE_DATA_MAX_AGE'])
+    prepared = prepared_slice('bowlers', batsman_name, matchup_graph.bowlers_of(batsman_name))
+    return serve_prepared(prepared, request, app.config['REFERENCE_DATA_MAX_AGE'])
 
 @app.route("/get_venues/<batsman_name>/<bowler_name>")
+@requires('data')
 def get_venues(batsman_name, bowler_name):
-    return jsonify(matchups.get(batsman_name, {}).get(bowler_name, []))
+    pair = matchup_graph.pair_index(batsman_name, bowler_name)
+    if pair is None:
+        return serve_prepared(matchup_responses['empty'], request, app.config['REFERENCE_DATA_MAX_AGE'])
+    prepared = prepared_slice('venues', pair, matchup_graph.venues_of(batsman_name, bowler_name))
+    return serve_prepared(prepared, request, app.config['REFERENCE_DATA_MAX_AGE'])
 
 # ---------------------------------------------------
 # Run App
@@ -0,0 +1,160 @@
+import random
+
+import pytest
+
+# ---------------------------------------------------
+# Feature Preparation & Data Loading Benchmarks
+# ---------------------------------------------------
+# The request-side work around the models: encoding a matchup as predict() does,
+# the whole /predict request with the prediction cache off, batch encoding for
+# /predict_batch, building `matchups` from the dataset (the CSV path of the data
+# stage), opening the compiled feature store (its default path), compiling and
+# querying the matchup graph behind /matchup_graph, /get_bowlers and /get_venues,
+# aggregating the ball-by-ball deliveries into the /venue_stats payloads, a
+# /rank_matchups request (every bowler against one batsman) without the cache, an
+# 11 x 11 /matchup_matrix request, the Monte Carlo innings simulator, which must
+# also keep to at least SIMULATED_INNINGS_PER_SECOND on one core, and reading an
+# innings' pair distributions from the dense ball outcome tensor.
+
+SIMULATED_INNINGS = 20000
+SIMULATED_INNINGS_PER_SECOND = 100000
+
+FORM = {"batsman": "V Kohli", "bowler": "JJ Bumrah", "venue": "Wankhede Stadium, Mumbai", "total_balls": "20"}
+
+
+@pytest.fixture(scope="module")
+def batch_rows(matchup_app):
+    """1000 observed matchups as /predict_batch items."""
+    triples = [(b, bo, v) for b, bowlers in matchup_app.matchups.items() for bo, venues in bowlers.items() for v in venues]
+    rng = random.Random(0)
+    return [{"batsman": b, "bowler": bo, "venue": v, "total_balls": rng.randint(1, 60)}
+            for b, bo, v in rng.choices(triples, k=1000)]
+
+
+def test_encode_matchup(bench, matchup_app):
+    bundle = matchup_app.model_registry.active
+    encoded = bench(matchup_app.encode_matchup, bundle, FORM["batsman"], FORM["bowler"], FORM["venue"])
+    assert encoded is not None
+
+
+def test_predict_request(bench, matchup_app, monkeypatch):
+    """/predict end to end (form parsing, encoding, table or model, JSON) without the prediction cache."""
+    monkeypatch.setattr(matchup_app, "prediction_cache", matchup_app.PredictionCache(max_size=0))
+    client = matchup_app.app.test_client()
+
+    def predict():
+        response = client.post("/predict", data=FORM)
+        assert response.status_code == 200
+
+    bench(predict)
+
+
+def test_encode_matchup_batch(bench, matchup_app, batch_rows):
+    bundle = matchup_app.model_registry.active
+    bench(matchup_app.encode_matchup_batch, bundle, batch_rows)
+
+
+@pytest.fixture(scope="module")
+def dataset(matchup_app):
+    import pandas as pd
+    return pd.read_csv(matchup_app.DATA_PATH)
+
+
+def test_build_matchups(bench, matchup_app, dataset):
+    bench(matchup_app.build_matchups, dataset)
+
+
+def test_load_feature_store(bench, matchup_app):
+    """Opening the store and rebuilding the data-stage state from it, as load_data() does."""
+    from feature_store import load_feature_store
+    if load_feature_store(matchup_app.FEATURE_STORE_SOURCES, matchup_app.FEATURE_STORE_DIR) is None:
+        pytest.skip("no current feature store; build it with 'python feature_store.py'")
+
+    def load():
+        store = load_feature_store(matchup_app.FEATURE_STORE_SOURCES, matchup_app.FEATURE_STORE_DIR)
+        store.matchups()
+        store.player_records()
+        for kind in ('batsman', 'bowler', 'venue'):
+            store.map_rows(kind)
+
+    bench(load)
+
+
+def test_build_matchup_graph(bench, matchup_app):
+    bench(matchup_app.MatchupGraph.from_matchups, matchup_app.matchups)
+
+
+def test_matchup_graph_lookups(bench, matchup_app, batch_rows):
+    """The bowler and venue lists of 1000 observed pairs."""
+    graph = matchup_app.matchup_graph
+    pairs = [(row["batsman"], row["bowler"]) for row in batch_rows]
+
+    def lookups():
+        for batsman, bowler in pairs:
+            graph.bowlers_of(batsman)
+            graph.venues_of(batsman, bowler)
+
+    bench(lookups)
+
+
+def test_build_venue_stats(bench, matchup_app, dataset):
+    """The aggregation pass; reading the match files (I/O and JSON parsing) is not included."""
+    from venue_stats import match_files, read_deliveries
+    deliveries = read_deliveries(match_files(matchup_app.MATCHES_DIR))
+    bench(matchup_app.build_venue_stats_index, dataset, deliveries)
+
+
+def test_rank_matchups_request(bench, matchup_app, monkeypatch):
+    monkeypatch.setattr(matchup_app, "prediction_cache", matchup_app.PredictionCache(max_size=0))
+    client = matchup_app.app.test_client()
+    query = {"batsman": FORM["batsman"], "venue": FORM["venue"], "total_balls": 20, "top": 10}
+
+    def rank():
+        response = client.post("/rank_matchups", json=query)
+        assert response.status_code == 200
+
+    bench(rank)
+
+
+def test_matchup_matrix_request(bench, matchup_app):
+    client = matchup_app.app.test_client()
+    batsmen = list(matchup_app.matchups)[:11]
+    bowlers = sorted({bowler for bowler_venues in matchup_app.matchups.values() for bowler in bowler_venues})[:11]
+    query = {"batsmen": batsmen, "bowlers": bowlers, "venue": FORM["venue"], "total_balls": 20}
+
+    def matrix():
+        response = client.post("/matchup_matrix", json=query)
+        assert response.status_code == 200
+
+    bench(matrix)
+
+
+def test_simulate_innings(bench, matchup_app):
+    """11 batsmen against a 5-bowler, 20-over plan; the per-pair distributions are scored up front."""
+    import numpy as np
+    import innings_simulator
+    bundle = matchup_app.model_registry.active
+    batsmen = list(matchup_app.matchups)[:11]
+    bowlers = sorted({bowler for bowler_venues in matchup_app.matchups.values() for bowler in bowler_venues})[:5]
+    keys = [(bundle.encodings['batsman'][b], bundle.encodings['bowler'][bo], bundle.encodings['venue'][FORM["venue"]])
+            for b in batsmen for bo in bowlers]
+    pair_probs = bundle.models['ball_outcome']['xgb'].predict_proba(np.array(keys, dtype=np.float32))
+    pair_index = np.arange(len(batsmen))[:, None] * len(bowlers) + (np.arange(20) % len(bowlers))[None, :]
+    runs_per_outcome, wicket_outcome = innings_simulator.outcome_values(bundle.models['ball_outcome']['encoder'].classes_)
+    rng = np.random.default_rng(0)
+
+    result = bench(innings_simulator.simulate_innings, pair_probs, pair_index, runs_per_outcome, wicket_outcome,
+                   SIMULATED_INNINGS, rng)
+    assert SIMULATED_INNINGS / result["min_s"] >= SIMULATED_INNINGS_PER_SECOND
+
+
+def test_outcome_tensor_lookup(bench, matchup_app):
+    """The 55 pair distributions of an 11-batsman, 5-bowler innings, as the simulator fetches them."""
+    bundle = matchup_app.model_registry.active
+    if bundle.outcome_tensor is None:
+        pytest.skip("no current ball outcome tensor; build it with 'python outcome_tensor.py'")
+    batsmen = list(matchup_app.matchups)[:11]
+    bowlers = sorted({bowler for bowler_venues in matchup_app.matchups.values() for bowler in bowler_venues})[:5]
+    keys = [(bundle.encodings['batsman'][b], bundle.encodings['bowler'][bo], bundle.encodings['venue'][FORM["venue"]])
+            for b in batsmen for bo in bowlers]
+    bench(matchup_app.ball_outcome_probs, bundle, keys, "simulation")
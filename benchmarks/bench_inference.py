@@ -0,0 +1,93 @@
+import os
+import glob
+import functools
+
+import numpy as np
+import pytest
+
+from conftest import REPO_DIR
+
+# ---------------------------------------------------
+# Model Artifact Benchmarks
+# ---------------------------------------------------
+# Single-row and 1k-row latency (plus peak memory per call) of every artifact in
+# models/, called the way the app calls them (see MODEL_OUTPUTS in app.py). Tree
+# models are also benchmarked on the native engine (tree_engine.py). The rows are
+# real encoded matchups from the dataset.
+
+BATCH_SIZE = 1000
+ARTIFACTS = sorted(os.path.basename(p) for p in glob.glob(os.path.join(REPO_DIR, "models", "*.joblib")))
+
+
+@pytest.fixture(scope="module")
+def matchup_rows(matchup_app):
+    """Runs-model feature rows (N x 6) for every observed matchup, 1-60 balls faced."""
+    bundle = matchup_app.model_registry.active
+    features = matchup_app.observed_matchup_features(bundle)
+    balls = np.random.default_rng(0).integers(1, 61, size=(len(features), 1)).astype(np.float32)
+    return np.hstack([features, balls])
+
+
+@functools.lru_cache(maxsize=None)
+def load_artifact(filename):
+    import joblib
+    model = joblib.load(os.path.join(REPO_DIR, "models", filename))
+    if hasattr(model, "n_jobs"):
+        model.set_params(n_jobs=int(os.environ["MODEL_THREADS"]))
+    return model
+
+
+@functools.lru_cache(maxsize=None)
+def compile_artifact(filename):
+    from tree_engine import compile_model
+    return compile_model(load_artifact(filename))
+
+
+def model_inputs(model, rows, size):
+    """`size` feature rows in the layout the model was trained on (runs: 6, dismissals: 5, ball outcome: 3 columns)."""
+    columns = {6: [0, 1, 2, 3, 4, 5], 5: [0, 1, 2, 3, 4], 3: [0, 1, 4]}[model.n_features_in_]
+    picks = np.random.default_rng(1).integers(0, len(rows), size=size)
+    return np.ascontiguousarray(rows[picks][:, columns])
+
+
+def call_for(filename, model):
+    """The prediction the app makes with this artifact: class probabilities for classifiers, values for regressors."""
+    return model.predict_proba if hasattr(load_artifact(filename), "predict_proba") else model.predict
+
+
+def engine_model(filename, engine):
+    model = load_artifact(filename)
+    if is_label_encoder(model):
+        if engine == "native":
+            pytest.skip("label encoders have no native engine")
+        return model
+    if engine == "native":
+        try:
+            return compile_artifact(filename)
+        except ValueError as e:
+            pytest.skip(f"{filename} can't be compiled natively: {e}")
+    return model
+
+
+def is_label_encoder(model):
+    return hasattr(model, "classes_") and not hasattr(model, "n_features_in_")
+
+
+@pytest.mark.parametrize("engine", ["reference", "native"])
+@pytest.mark.parametrize("filename", ARTIFACTS)
+def test_single_row_latency(bench, matchup_rows, filename, engine):
+    model = engine_model(filename, engine)
+    if is_label_encoder(model):
+        bench(model.inverse_transform, np.array([0]))
+    else:
+        bench(call_for(filename, model), model_inputs(model, matchup_rows, 1))
+
+
+@pytest.mark.parametrize("engine", ["reference", "native"])
+@pytest.mark.parametrize("filename", ARTIFACTS)
+def test_batch_latency(bench, matchup_rows, filename, engine):
+    model = engine_model(filename, engine)
+    if is_label_encoder(model):
+        bench(model.inverse_transform, np.random.default_rng(2).integers(0, len(model.classes_), size=BATCH_SIZE))
+    else:
+        bench(call_for(filename, model), model_inputs(model, matchup_rows, BATCH_SIZE))
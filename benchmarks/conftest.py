@@ -0,0 +1,194 @@
+import gc
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import tracemalloc
+
+import pytest
+
+# ---------------------------------------------------
+# Micro-Benchmark Harness & Regression Gate
+# ---------------------------------------------------
+# `bench(fn, *args)` times a hot path: the loop count is calibrated so one round
+# takes at least MIN_ROUND_SECONDS, then ROUNDS rounds are run. The fastest round
+# (least disturbed by other processes) is compared against the recorded baseline in
+# baselines.json. A test fails when it is slower than baseline x (1 + tolerance), and
+# by more than the minimum margin, which keeps scheduler jitter on microsecond
+# paths from failing them. A path over the limit is measured again (MEASURE_ATTEMPTS
+# in total, keeping the fastest) and only fails if it stays over, so a slow phase of
+# the machine doesn't fail the run. Baselines are the median of BASELINE_ATTEMPTS
+# measurements, i.e. a typical run rather than the luckiest one. The Python heap
+# peak of one call (tracemalloc) is recorded alongside. Models run single-threaded,
+# as in serve.py's default, so timings don't depend on the core count.
+#
+#     pytest benchmarks                                # run and gate (default tolerance 25%)
+#     pytest benchmarks --bench-tolerance 0.5          # or BENCH_TOLERANCE=0.5
+#     pytest benchmarks --bench-min-margin 5e-6        # or BENCH_MIN_MARGIN (seconds, default 3us)
+#     pytest benchmarks --bench-update-baseline        # record new baselines
+#     pytest benchmarks --bench-json results.json      # also save this run
+#
+# Baselines are only comparable on the machine they were recorded on; re-record
+# them (and commit baselines.json) from a quiet run when the benchmark machine changes.
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+BASELINES_PATH = os.path.join(BENCH_DIR, "baselines.json")
+ROUNDS = 10
+MIN_ROUND_SECONDS = 0.1
+MEASURE_ATTEMPTS = 5
+BASELINE_ATTEMPTS = 3
+
+sys.path.insert(0, REPO_DIR)
+# Must be set before xgboost/sklearn initialise OpenMP (see serve.py).
+for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "MODEL_THREADS"):
+    os.environ.setdefault(var, "1")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption("--bench-tolerance", type=float, default=float(os.environ.get("BENCH_TOLERANCE", 0.25)),
+                    help="Allowed slowdown against the baseline before a benchmark fails (0.25 = 25%%).")
+    group.addoption("--bench-min-margin", type=float, default=float(os.environ.get("BENCH_MIN_MARGIN", 3e-6)),
+                    help="Slowdown in seconds per call that never fails a benchmark, whatever the tolerance.")
+    group.addoption("--bench-update-baseline", action="store_true",
+                    help="Record the measured timings as the new baselines instead of gating.")
+    group.addoption("--bench-json", help="Save the measurements of this run to this JSON file.")
+
+
+def machine_info():
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine(), "cpu_count": os.cpu_count()}
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {"machine": None, "benchmarks": {}}
+    with open(BASELINES_PATH) as f:
+        return json.load(f)
+
+
+def measure(fn, *args):
+    """Seconds per call (fastest and median round) and the Python heap peak of one call in bytes."""
+    fn(*args)  # warm-up
+    gc.collect()
+    gc.disable()  # like timeit: collections triggered by earlier work would land in random rounds
+    try:
+        loops = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn(*args)
+            elapsed = time.perf_counter() - start
+            if elapsed >= MIN_ROUND_SECONDS:
+                break
+            loops = max(loops * 2, int(loops * MIN_ROUND_SECONDS * 1.2 / elapsed)) if elapsed > 0 else loops * 10
+        rounds = [elapsed / loops]
+        for _ in range(ROUNDS - 1):
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn(*args)
+            rounds.append((time.perf_counter() - start) / loops)
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline_bytes = tracemalloc.get_traced_memory()[0]
+        fn(*args)
+        peak_bytes = tracemalloc.get_traced_memory()[1] - baseline_bytes
+    finally:
+        tracemalloc.stop()
+    return {"min_s": min(rounds), "median_s": statistics.median(rounds), "loops": loops, "peak_bytes": peak_bytes}
+
+
+class BenchSession:
+    def __init__(self, config):
+        self.tolerance = config.getoption("--bench-tolerance")
+        self.min_margin = config.getoption("--bench-min-margin")
+        self.update = config.getoption("--bench-update-baseline")
+        self.json_path = config.getoption("--bench-json")
+        self.baselines = load_baselines()
+        self.results = {}
+
+
+def pytest_configure(config):
+    config._bench_session = BenchSession(config)
+
+
+@pytest.fixture(scope="session")
+def matchup_app():
+    """app.py with its data and models loaded (paths in app.py are relative to the repo root)."""
+    os.chdir(REPO_DIR)
+    import app
+    app.ensure_loaded(*app.LOAD_STAGES)
+    return app
+
+
+@pytest.fixture
+def bench(request):
+    """Times `fn(*args)`, records it under the test id and fails if it regressed against its baseline."""
+    session = request.config._bench_session
+    name = request.node.name
+
+    def run(fn, *args):
+        baseline = session.baselines["benchmarks"].get(name)
+        gate = baseline is not None and not session.update
+        limit = max(baseline["min_s"] * (1 + session.tolerance), baseline["min_s"] + session.min_margin) if gate else None
+        if session.update:
+            attempts = sorted((measure(fn, *args) for _ in range(BASELINE_ATTEMPTS)), key=lambda r: r["min_s"])
+            result = attempts[len(attempts) // 2]
+        else:
+            result = None
+            for _ in range(MEASURE_ATTEMPTS if gate else 1):
+                attempt = measure(fn, *args)
+                if result is None or attempt["min_s"] < result["min_s"]:
+                    result = attempt
+                if not gate or result["min_s"] <= limit:
+                    break
+        session.results[name] = result
+        result["baseline_s"] = baseline["min_s"] if baseline else None
+        if gate:
+            if result["min_s"] > limit:
+                pytest.fail(f"{name}: {result['min_s'] * 1e6:.1f}us per call, baseline {baseline['min_s'] * 1e6:.1f}us "
+                            f"(+{(result['min_s'] / baseline['min_s'] - 1) * 100:.0f}%, tolerance {session.tolerance * 100:.0f}%)",
+                            pytrace=False)
+        return result
+
+    return run
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    session = config._bench_session
+    if not session.results:
+        return
+    terminalreporter.section("benchmarks")
+    if session.baselines.get("machine") and session.baselines["machine"] != machine_info():
+        terminalreporter.write_line(f"note: baselines were recorded on {session.baselines['machine']}")
+    terminalreporter.write_line(f"{'benchmark':<72} {'per call':>12} {'baseline':>12} {'change':>8} {'peak mem':>10}")
+    for name, r in sorted(session.results.items()):
+        baseline = r["baseline_s"]
+        change = f"{(r['min_s'] / baseline - 1) * 100:+.0f}%" if baseline else "new"
+        baseline_text = f"{baseline * 1e6:.1f}us" if baseline else "-"
+        terminalreporter.write_line(f"{name:<72} {r['min_s'] * 1e6:>10.1f}us {baseline_text:>12} {change:>8} "
+                                    f"{r['peak_bytes'] / 1024:>8.1f}KB")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    bench_session = session.config._bench_session
+    if not bench_session.results:
+        return
+    measurements = {name: {k: v for k, v in r.items() if k != "baseline_s"} for name, r in bench_session.results.items()}
+    if bench_session.update:
+        baselines = load_baselines()
+        baselines["machine"] = machine_info()
+        baselines["benchmarks"].update(measurements)
+        with open(BASELINES_PATH, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if bench_session.json_path:
+        with open(bench_session.json_path, "w") as f:
+            json.dump({"machine": machine_info(), "benchmarks": measurements}, f, indent=2, sort_keys=True)
@@ -0,0 +1,472 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import shlex
+import argparse
+import platform
+import threading
+import subprocess
+import http.client
+from html import unescape
+from collections import defaultdict
+from urllib.parse import urlsplit, urlencode, quote
+
+# ---------------------------------------------------
+# End-to-End HTTP Load Test
+# ---------------------------------------------------
+# Replays the request sequences of the two front-end pages against a running app:
+#
+#   analysis  (analysis.js)  GET /matchup_graph once per user (the browser caches it) and the
+#                            dropdowns from it, or with --no-graph GET /get_bowlers/<batsman> and
+#                            /get_venues/<batsman>/<bowler>; POST /predict_matchup, then
+#                            GET /get_player_card for both players
+#   profiles  (profiles.js)  GET /get_all_player_roles, GET /get_player_card for the avatar
+#                            previews, then GET /get_player_stats + /get_player_card per player
+#
+# Every virtual user runs one page session after another on its own keep-alive
+# connection. Players are picked with a Zipf-like popularity skew (a few stars get
+# most of the traffic). Requests a browser sends in parallel (Promise.all) are sent
+# one after the other. Latency percentiles and throughput per route are printed and
+# saved as JSON, so runs can be compared between commits:
+#
+#     python benchmarks/loadtest.py --url http://127.0.0.1:8000 --users 16 --duration 30
+#     python benchmarks/loadtest.py --server-cmd "python serve.py --workers 4 --port 8000" --url http://127.0.0.1:8000
+#     python benchmarks/loadtest.py --compare benchmarks/results/old.json benchmarks/results/new.json
+#
+# Only the standard library is used, so it runs wherever the app's Python does.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+OPTION_PATTERN = re.compile(r'<option value="([^"]+)"')
+GRAPH_URL_PATTERN = re.compile(r'data-graph-url="([^"]+)"')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP load test replaying the analysis and profiles page flows.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="Base URL of the running app.")
+    parser.add_argument("--users", type=int, default=8, help="Concurrent virtual users (threads).")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to measure.")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of unrecorded load before measuring.")
+    parser.add_argument("--mix", default="analysis=0.7,profiles=0.3", help="Share of sessions per page flow.")
+    parser.add_argument("--zipf", type=float, default=1.1,
+                        help="Popularity skew: the player at rank r is picked with weight 1/r^s (0 = uniform).")
+    parser.add_argument("--think-ms", type=float, default=0,
+                        help="Mean pause between a user's requests (exponentially distributed, 0 = none).")
+    parser.add_argument("--split-predict", action="store_true",
+                        help="Send /predict + /predict_next_ball instead of /predict_matchup (the flow before they were merged).")
+    parser.add_argument("--no-graph", action="store_true",
+                        help="Fill the analysis dropdowns with /get_bowlers + /get_venues instead of /matchup_graph.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds.")
+    parser.add_argument("--server-cmd", help="Start this command (from the repo root) before the run and stop it afterwards.")
+    parser.add_argument("--server-timeout", type=float, default=180, help="Seconds to wait for /readyz of --server-cmd.")
+    parser.add_argument("--label", default="", help="Free-form label stored with the results.")
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/loadtest-<commit>-<time>.json).")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two result files and exit.")
+    return parser.parse_args(argv)
+
+
+# ---------------------------------------------------
+# HTTP Client
+# ---------------------------------------------------
+class Client:
+    """One keep-alive connection; records every request into `stats` under its route template."""
+
+    def __init__(self, base_url, stats, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.prefix = parts.path.rstrip("/")
+        self.stats = stats
+        self.timeout = timeout
+        self.conn = None
+        self.cache = {}  # path -> parsed JSON, for responses a browser keeps in its HTTP cache
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.conn = cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, route, method, path, form=None):
+        """Returns (status, body) or (None, None) on a connection error."""
+        body, headers = None, {}
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        for attempt in range(2):  # the server may have closed an idle keep-alive connection
+            if self.conn is None:
+                self._connect()
+            start = time.perf_counter()
+            try:
+                self.conn.request(method, self.prefix + path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                if attempt == 0 and isinstance(e, (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)):
+                    continue
+                self.stats.record(route, time.perf_counter() - start, None)
+                return None, None
+            self.stats.record(route, time.perf_counter() - start, response.status)
+            if response.getheader("Connection", "").lower() == "close":
+                self.close()
+            return response.status, data
+        return None, None
+
+    def get_json(self, route, path):
+        status, data = self.request(route, "GET", path)
+        if status != 200:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def cached_json(self, route, path):
+        if path not in self.cache:
+            self.cache[path] = self.get_json(route, path)
+        return self.cache[path]
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def url_path(*segments):
+    """Path segments escaped the way the browser escapes the template literals in the JS."""
+    return "/" + "/".join(quote(segment) for segment in segments)
+
+
+def graph_bowlers(graph, batsman):
+    """The bowler dropdown from a /matchup_graph payload, as analysis.js fills it."""
+    if batsman not in graph["batsmen"]:
+        return []
+    b = graph["batsmen"].index(batsman)
+    return [graph["bowlers"][i] for i in graph["pair_bowlers"][graph["bowler_offsets"][b]:graph["bowler_offsets"][b + 1]]]
+
+
+def graph_venues(graph, batsman, bowler):
+    b = graph["batsmen"].index(batsman)
+    bowler_id = graph["bowlers"].index(bowler)
+    pairs = range(graph["bowler_offsets"][b], graph["bowler_offsets"][b + 1])
+    p = next(p for p in pairs if graph["pair_bowlers"][p] == bowler_id)
+    return [graph["venues"][i] for i in graph["pair_venues"][graph["venue_offsets"][p]:graph["venue_offsets"][p + 1]]]
+
+
+# ---------------------------------------------------
+# Recording & Percentiles
+# ---------------------------------------------------
+def percentile(sorted_values, q):
+    """Linear-interpolated percentile (0-100) of an already sorted list."""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * q / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+class Stats:
+    def __init__(self):
+        self.recording = False
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)  # {route: [seconds]}
+        self.statuses = defaultdict(lambda: defaultdict(int))  # {route: {status: count}}
+        self.sessions = defaultdict(list)  # {flow: [seconds]}
+
+    def record(self, route, seconds, status):
+        if not self.recording:
+            return
+        with self._lock:
+            self.latencies[route].append(seconds)
+            self.statuses[route]["error" if status is None else str(status)] += 1
+
+    def record_session(self, flow, seconds):
+        if not self.recording:
+            return
+        with self._lock:
+            self.sessions[flow].append(seconds)
+
+
+def summarize(values, duration):
+    values = sorted(values)
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        "count": len(values),
+        "throughput_rps": round(len(values) / duration, 2),
+        "mean_ms": ms(sum(values) / len(values)) if values else None,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else None
+    }
+
+
+def summarize_run(stats, duration):
+    routes = {}
+    for route in sorted(stats.latencies):
+        statuses = dict(stats.statuses[route])
+        ok = sum(count for status, count in statuses.items() if status.startswith(("2", "3")))
+        routes[route] = {**summarize(stats.latencies[route], duration), "errors": sum(statuses.values()) - ok, "status": statuses}
+    total = sum(len(v) for v in stats.latencies.values())
+    errors = sum(r["errors"] for r in routes.values())
+    return {
+        "summary": {"duration_s": round(duration, 3), "requests": total, "errors": errors,
+                    "throughput_rps": round(total / duration, 2)},
+        "routes": routes,
+        "flows": {flow: summarize(values, duration) for flow, values in sorted(stats.sessions.items())}
+    }
+
+
+# ---------------------------------------------------
+# Page Flows
+# ---------------------------------------------------
+class Popularity:
+    """Zipf-like weights over a fixed, seeded ranking of names; unknown names get the lowest weight."""
+
+    def __init__(self, names, exponent, rng):
+        ranked = sorted(names)
+        rng.shuffle(ranked)
+        self.weights = {name: 1.0 / (rank + 1) ** exponent for rank, name in enumerate(ranked)}
+        self.floor = 1.0 / (len(ranked) + 1) ** exponent
+
+    def choose(self, rng, names):
+        names = list(names)
+        if not names:
+            return None
+        return rng.choices(names, weights=[self.weights.get(n, self.floor) for n in names])[0]
+
+
+class Workload:
+    def __init__(self, args, batsmen, roles, graph_path):
+        self.args = args
+        self.batsmen = batsmen
+        self.graph_path = graph_path
+        self.roles = roles  # {player: role}
+        self.popularity = Popularity(roles.keys() | set(batsmen), args.zipf, random.Random(args.seed))
+        flows = dict(item.split("=") for item in args.mix.split(","))
+        self.flows = [(name, float(share)) for name, share in flows.items() if float(share) > 0]
+        unknown = [name for name, _ in self.flows if name not in FLOWS]
+        if unknown:
+            raise SystemExit(f"Unknown flow(s) in --mix: {', '.join(unknown)} (choose from {', '.join(FLOWS)})")
+
+    def think(self, rng):
+        if self.args.think_ms > 0:
+            time.sleep(rng.expovariate(1000 / self.args.think_ms))
+
+    def analysis_session(self, client, rng):
+        graph = None if self.args.no_graph else client.cached_json("GET /matchup_graph", self.graph_path)
+        batsman = self.popularity.choose(rng, self.batsmen)
+        if graph is not None:
+            bowlers = graph_bowlers(graph, batsman)
+        else:
+            bowlers = client.get_json("GET /get_bowlers/<batsman>", url_path("get_bowlers", batsman))
+        self.think(rng)
+        bowler = self.popularity.choose(rng, bowlers or [])
+        if bowler is None:
+            return
+        if graph is not None:
+            venues = graph_venues(graph, batsman, bowler)
+        else:
+            venues = client.get_json("GET /get_venues/<batsman>/<bowler>", url_path("get_venues", batsman, bowler))
+        self.think(rng)
+        if not venues:
+            return
+        form = {"batsman": batsman, "bowler": bowler, "venue": rng.choice(venues), "total_balls": rng.randint(6, 60)}
+        if self.args.split_predict:
+            client.request("POST /predict", "POST", "/predict", form)
+            client.request("POST /predict_next_ball", "POST", "/predict_next_ball", form)
+        else:
+            client.request("POST /predict_matchup", "POST", "/predict_matchup", form)
+        for player in (batsman, bowler):
+            client.request("GET /get_player_card/<name>", "GET", url_path("get_player_card", player))
+        self.think(rng)
+
+    def profiles_session(self, client, rng):
+        client.request("GET /get_all_player_roles", "GET", "/get_all_player_roles")
+        self.think(rng)
+        player1 = self.popularity.choose(rng, self.roles)
+        client.request("GET /get_player_card/<name>", "GET", url_path("get_player_card", player1))
+        players = [player1]
+        if rng.random() < 0.7:  # most visitors compare two players
+            role = self.roles[player1]
+            eligible = {"Batsman": ("Batsman", "All-Rounder"), "Bowler": ("Bowler", "All-Rounder")}.get(
+                role, ("Batsman", "Bowler", "All-Rounder"))
+            player2 = self.popularity.choose(rng, [p for p, r in self.roles.items() if p != player1 and r in eligible])
+            if player2 is not None:
+                client.request("GET /get_player_card/<name>", "GET", url_path("get_player_card", player2))
+                players.append(player2)
+        self.think(rng)
+        for player in players:
+            client.request("GET /get_player_stats/<name>", "GET", url_path("get_player_stats", player))
+            client.request("GET /get_player_card/<name>", "GET", url_path("get_player_card", player))
+        self.think(rng)
+
+
+FLOWS = {"analysis": Workload.analysis_session, "profiles": Workload.profiles_session}
+
+
+def discover(base_url, timeout):
+    """The batsman dropdown and matchup graph URL of the analysis page and the player roles used by the profiles page."""
+    client = Client(base_url, Stats(), timeout)
+    status, html = client.request("GET /analysis", "GET", "/analysis")
+    if status != 200:
+        raise SystemExit(f"GET /analysis returned {status}; is the app running at {base_url}?")
+    html = html.decode("utf-8")
+    batsmen = [unescape(name) for name in OPTION_PATTERN.findall(html)]
+    graph_url = GRAPH_URL_PATTERN.search(html)
+    roles = client.get_json("GET /get_all_player_roles", "/get_all_player_roles") or {}
+    client.close()
+    if not batsmen or not roles:
+        raise SystemExit("The app returned no players; is the dataset loaded?")
+    return batsmen, roles, unescape(graph_url.group(1)) if graph_url else "/matchup_graph"
+
+
+def run_load(args, workload, stats):
+    stop_at = time.perf_counter() + args.warmup + args.duration
+
+    def user(index):
+        rng = random.Random(args.seed * 1000 + index)
+        client = Client(args.url, stats, args.timeout)
+        names, shares = zip(*workload.flows)
+        while time.perf_counter() < stop_at:
+            flow = rng.choices(names, weights=shares)[0]
+            start = time.perf_counter()
+            FLOWS[flow](workload, client, rng)
+            if time.perf_counter() < stop_at:  # sessions cut off by the end of the run are not counted
+                stats.record_session(flow, time.perf_counter() - start)
+        client.close()
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(args.users)]
+    for t in threads:
+        t.start()
+    time.sleep(args.warmup)
+    stats.recording = True
+    measure_start = time.perf_counter()
+    for t in threads:
+        t.join()
+    stats.recording = False
+    return time.perf_counter() - measure_start
+
+
+# ---------------------------------------------------
+# Server Process & Metadata
+# ---------------------------------------------------
+def start_server(args):
+    print(f"Starting: {args.server_cmd}")
+    process = subprocess.Popen(shlex.split(args.server_cmd), cwd=REPO_DIR)
+    client = Client(args.url, Stats(), timeout=2)
+    deadline = time.time() + args.server_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with status {process.returncode}")
+        status, _ = client.request("GET /readyz", "GET", "/readyz")
+        if status == 200:
+            client.close()
+            return process
+        time.sleep(0.5)
+    stop_server(process)
+    raise SystemExit(f"Server was not ready after {args.server_timeout}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(result):
+    summary = result["summary"]
+    print(f"\n{summary['requests']} requests in {summary['duration_s']}s: "
+          f"{summary['throughput_rps']} req/s, {summary['errors']} errors")
+    header = f"{'route':<40} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>6}"
+    print(header)
+    print("-" * len(header))
+    for name, rows in (("route", result["routes"]), ("flow", result["flows"])):
+        for route, r in rows.items():
+            label = route if name == "route" else f"session: {route}"
+            print(f"{label:<40} {r['count']:>7} {r['throughput_rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+                  f"{r['p99_ms']:>8} {r['max_ms']:>8} {r.get('errors', ''):>6}")
+
+
+def compare(base_path, new_path):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"base: {base['meta']['commit']} {base['meta'].get('label', '')}  new: {new['meta']['commit']} {new['meta'].get('label', '')}")
+    change = lambda a, b: f"{(b - a) / a * 100:+.1f}%" if a and b is not None else "n/a"
+    a, b = base["summary"]["throughput_rps"], new["summary"]["throughput_rps"]
+    print(f"throughput: {a} -> {b} req/s ({change(a, b)})")
+    header = f"{'route':<40} {'p50 ms':>26} {'p95 ms':>26} {'p99 ms':>26}"
+    print(header)
+    print("-" * len(header))
+    for route in sorted(base["routes"].keys() | new["routes"].keys()):
+        old_r, new_r = base["routes"].get(route, {}), new["routes"].get(route, {})
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            x, y = old_r.get(key), new_r.get(key)
+            cells.append(f"{x} -> {y} ({change(x, y)})" if x is not None and y is not None else "n/a")
+        print(f"{route:<40} " + " ".join(f"{c:>26}" for c in cells))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    server = start_server(args) if args.server_cmd else None
+    try:
+        batsmen, roles, graph_path = discover(args.url, args.timeout)
+        workload = Workload(args, batsmen, roles, graph_path)
+        print(f"Load test: {args.users} users, {args.warmup}s warm-up + {args.duration}s against {args.url} "
+              f"({len(batsmen)} batsmen, {len(roles)} players, mix {args.mix}, zipf {args.zipf})")
+        stats = Stats()
+        duration = run_load(args, workload, stats)
+    finally:
+        if server is not None:
+            stop_server(server)
+
+    commit = git_commit()
+    result = {
+        "meta": {
+            "commit": commit,
+            "label": args.label,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "server_cmd": args.server_cmd
+        },
+        "config": {key: getattr(args, key) for key in ("url", "users", "duration", "warmup", "mix", "zipf", "think_ms",
+                                                       "split_predict", "no_graph", "seed")},
+        **summarize_run(stats, duration)
+    }
+    print_report(result)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"loadtest-{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nSaved {output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,10 @@
 import os
 import json
+import argparse
 import pandas as pd
 import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -9,6 +12,9 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Config
 JSON_DIR = r"d:\Batsman_bowler_matchup\data_cleaning\ipl last 5 season"
 OUTPUT_CSV = r"d:\Batsman_bowler_matchup\training\ball_by_ball_dataset.csv"
+FILES_PER_CHUNK = 32  # match files parsed per task; one task's deliveries are one output chunk
+CHUNKS_IN_FLIGHT = 2  # per worker: chunks parsed ahead of the writer, which bounds peak memory
+OUTCOMES = ['0', '1', '2', '3', '4', '5', '6', 'W']
 
 def get_outcome(delivery):
     """
@@ -49,49 +55,98 @@ def get_outcome(delivery):
     
     return '0' # Default fallback
 
-def process_json_files():
-    data = []
-    
-    if not os.path.exists(JSON_DIR):
-        logging.error(f"Directory not found: {JSON_DIR}")
-        return
-
-    files = [f for f in os.listdir(JSON_DIR) if f.endswith('.json')]
-    logging.info(f"Found {len(files)} JSON files.")
-
-    for filename in files:
-        filepath = os.path.join(JSON_DIR, filename)
+def extract_deliveries(filepaths):
+    """
+    Parses a chunk of match files into one DataFrame with a row per delivery
+    (batsman, bowler, venue, outcome). The columns are categoricals, so the chunk is
+    small to send back from a worker process and to hold until it is written.
+    """
+    batsmen, bowlers, venues, outcomes = [], [], [], []
+    for filepath in filepaths:
+        start = len(batsmen)
         try:
-            with open(filepath, 'r') as f:
+            with open(filepath, 'rb') as f:
                 match = json.load(f)
-                
+
             venue = match['info'].get('venue', 'Unknown')
-            
+
             for innings in match.get('innings', []):
                 for over in innings.get('overs', []):
                     for delivery in over.get('deliveries', []):
-                        batsman = delivery['batter']
-                        bowler = delivery['bowler']
-                        outcome = get_outcome(delivery)
-                        
-                        data.append({
-                            'batsman': batsman,
-                            'bowler': bowler,
-                            'venue': venue,
-                            'outcome': outcome
-                        })
-                        
+                        batsmen.append(delivery['batter'])
+                        bowlers.append(delivery['bowler'])
+                        outcomes.append(get_outcome(delivery))
+            venues.extend([venue] * (len(batsmen) - len(venues)))
+
         except Exception as e:
-            logging.warning(f"Failed to process {filename}: {e}")
+            # Drop the deliveries already read from a file that failed half-way.
+            for column in (batsmen, bowlers, venues, outcomes):
+                del column[start:]
+            logging.warning(f"Failed to process {os.path.basename(filepath)}: {e}")
 
-    # Create DataFrame
-    df = pd.DataFrame(data)
-    logging.info(f"Extracted {len(df)} ball-by-ball records.")
-    
-    # Save to CSV
-    os.makedirs(os.path.dirname(OUTPUT_CSV), exist_ok=True)
-    df.to_csv(OUTPUT_CSV, index=False)
-    logging.info(f"Saved dataset to {OUTPUT_CSV}")
+    return pd.DataFrame({
+        'batsman': pd.Categorical(batsmen),
+        'bowler': pd.Categorical(bowlers),
+        'venue': pd.Categorical(venues),
+        'outcome': pd.Categorical(outcomes, categories=OUTCOMES)
+    })
+
+
+def parallel_ordered(fn, tasks, workers):
+    """
+    Yields fn(task) for every task, in order. With more than one worker the tasks run
+    in a process pool, with at most CHUNKS_IN_FLIGHT results per worker waiting to be
+    consumed, so results are never all held at once.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield fn(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(fn, task))
+            if len(pending) >= workers * CHUNKS_IN_FLIGHT:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def extracted_chunks(filepaths, workers):
+    """Yields extract_deliveries() chunks of FILES_PER_CHUNK files each, in file order."""
+    batches = [filepaths[i:i + FILES_PER_CHUNK] for i in range(0, len(filepaths), FILES_PER_CHUNK)]
+    return parallel_ordered(extract_deliveries, batches, workers)
+
+
+def process_json_files(json_dir=JSON_DIR, output_csv=OUTPUT_CSV, workers=None):
+    if not os.path.exists(json_dir):
+        logging.error(f"Directory not found: {json_dir}")
+        return
+
+    files = sorted(f for f in os.listdir(json_dir) if f.endswith('.json'))
+    workers = workers or os.cpu_count() or 1
+    logging.info(f"Found {len(files)} JSON files; parsing with {workers} worker(s).")
+
+    # Write each chunk as it arrives, to a partial file that replaces the output when complete.
+    os.makedirs(os.path.dirname(output_csv) or '.', exist_ok=True)
+    partial_csv = f"{output_csv}.partial"
+    records = 0
+    header_written = False
+    with open(partial_csv, 'w', newline='') as f:
+        for chunk in extracted_chunks([os.path.join(json_dir, name) for name in files], workers):
+            chunk.to_csv(f, header=not header_written, index=False)
+            header_written = True
+            records += len(chunk)
+    os.replace(partial_csv, output_csv)
+
+    logging.info(f"Extracted {records} ball-by-ball records.")
+    logging.info(f"Saved dataset to {output_csv}")
 
 if __name__ == "__main__":
-    process_json_files()
+    parser = argparse.ArgumentParser(description="Extract ball-by-ball outcomes from Cricsheet JSON match files.")
+    parser.add_argument("--json-dir", default=JSON_DIR, help="directory of match files")
+    parser.add_argument("--output", default=OUTPUT_CSV, help="CSV file to write")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: one per core)")
+    args = parser.parse_args()
+    process_json_files(args.json_dir, args.output, args.workers)
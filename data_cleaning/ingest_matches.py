@@ -0,0 +1,252 @@
+import os
+import json
+import hashlib
+import argparse
+import logging
+import pandas as pd
+
+from extract_ball_data import JSON_DIR, OUTPUT_CSV, get_outcome, parallel_ordered
+
+# Incremental ingestion of the Cricsheet match files.
+#
+# Instead of re-reading every JSON file (extract_ball_data.py, venue.py), the
+# ingester keeps a store of what it has already processed:
+#   manifest.json              one entry per match: file size/mtime, sha256, its part file
+#   deliveries/<id>-<sha>.csv  the match's deliveries (the ball-level store, one part per match)
+#   aggregates-<gen>.csv       runs/balls/dismissals per (batsman, bowler, venue), all deliveries
+# A run only parses match files whose size or mtime changed and whose hash differs
+# from the manifest (new or changed matches). Their deliveries are written as new
+# parts, and the aggregates only change for the keys those matches touch: their
+# sums are added, and the sums of a changed or removed match's old part are taken
+# away. Every CHECKPOINT_MATCHES matches the aggregates go to a new generation file
+# and the manifest is replaced (atomically) to point at it, so an interrupted run
+# resumes from the last checkpoint and never counts a match twice.
+#
+# The outputs are then rebuilt from the store without touching the JSON files:
+# the ball-by-ball CSV of extract_ball_data.py and the matchup CSV of venue.py.
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Config
+STORE_DIR = r"d:\Batsman_bowler_matchup\data_cleaning\ball_store"
+MATCHUP_CSV = r"d:\Batsman_bowler_matchup\data_cleaning\final\Final_dataset_cleaned.csv"
+MANIFEST_FILE = "manifest.json"
+PARTS_DIR = "deliveries"
+CHECKPOINT_MATCHES = 64
+MIN_PAIR_BALLS = 20  # venue.py keeps (batsman, bowler) pairs with at least this many balls
+KEY = ['batsman', 'bowler', 'venue']
+PART_COLUMNS = ['batsman', 'bowler', 'venue', 'outcome', 'runs_off_bat', 'is_wicket']
+BALL_COLUMNS = ['batsman', 'bowler', 'venue', 'outcome']
+SUMS = ['total_runs', 'total_balls', 'dismissals']
+
+
+def read_match(task):
+    """
+    Hashes and parses one match file (runs in a worker). Returns (task, sha256, deliveries, error);
+    deliveries is None when the file still has the hash the manifest knows.
+    """
+    match_id, filepath, known_digest, size, mtime_ns = task
+    try:
+        with open(filepath, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        if digest == known_digest:
+            return task, digest, None, None
+
+        match = json.loads(content)
+        venue = match['info'].get('venue', 'Unknown')
+        rows = {column: [] for column in PART_COLUMNS}
+        for innings in match.get('innings', []):
+            for over in innings.get('overs', []):
+                for delivery in over.get('deliveries', []):
+                    rows['batsman'].append(delivery['batter'])
+                    rows['bowler'].append(delivery['bowler'])
+                    rows['venue'].append(venue)
+                    rows['outcome'].append(get_outcome(delivery))
+                    rows['runs_off_bat'].append(delivery['runs']['batter'])
+                    rows['is_wicket'].append(1 if 'wickets' in delivery else 0)
+        return task, digest, pd.DataFrame(rows, columns=PART_COLUMNS), None
+
+    except Exception as e:
+        return task, None, None, str(e)
+
+
+def read_store_csv(path, **kwargs):
+    # Names are kept as written (pandas would read a player called "NA" as missing).
+    return pd.read_csv(path, dtype={column: str for column in KEY + ['outcome']}, keep_default_na=False, **kwargs)
+
+
+def match_sums(deliveries):
+    """(batsman, bowler, venue)-indexed runs, balls and dismissals of a match's deliveries."""
+    return deliveries.groupby(KEY).agg(
+        total_runs=('runs_off_bat', 'sum'),
+        total_balls=('runs_off_bat', 'count'),
+        dismissals=('is_wicket', 'sum')
+    )
+
+
+def part_path(store_dir, entry):
+    return os.path.join(store_dir, PARTS_DIR, entry['part'])
+
+
+def load_manifest(store_dir):
+    path = os.path.join(store_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"generation": 0, "aggregates": None, "matches": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_aggregates(store_dir, manifest):
+    if manifest['aggregates'] is None:
+        return pd.DataFrame({column: pd.Series(dtype='int64') for column in KEY + SUMS}).set_index(KEY)
+    return read_store_csv(os.path.join(store_dir, manifest['aggregates'])).set_index(KEY)
+
+
+def apply_deltas(aggregates, deltas):
+    """Adds the (signed) match sums in `deltas` to the aggregates; keys left with no balls are dropped."""
+    if not deltas:
+        return aggregates
+    delta = pd.concat(deltas).groupby(level=KEY).sum()
+    aggregates = aggregates.add(delta, fill_value=0)
+    return aggregates[aggregates['total_balls'] > 0].astype('int64')
+
+
+def save_checkpoint(store_dir, manifest, aggregates):
+    """
+    Writes the aggregates as the next generation, then swaps in a manifest that points
+    at it. Old aggregate generations and parts no match refers to any more are removed.
+    """
+    generation = manifest['generation'] + 1
+    name = f"aggregates-{generation:06d}.csv"
+    aggregates.sort_index().to_csv(os.path.join(store_dir, name))
+    manifest.update(generation=generation, aggregates=name)
+
+    path = os.path.join(store_dir, MANIFEST_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(f"{path}.tmp", path)
+
+    for filename in os.listdir(store_dir):
+        if filename.startswith('aggregates-') and filename != name:
+            os.remove(os.path.join(store_dir, filename))
+    parts = {entry['part'] for entry in manifest['matches'].values()}
+    for filename in os.listdir(os.path.join(store_dir, PARTS_DIR)):
+        if filename not in parts:
+            os.remove(os.path.join(store_dir, PARTS_DIR, filename))
+
+
+def ingest(json_dir=JSON_DIR, store_dir=STORE_DIR, workers=None):
+    """
+    Brings the store up to date with the match files in `json_dir`. Returns
+    (manifest, aggregates, counts of new/changed/removed/unchanged/failed matches).
+    """
+    os.makedirs(os.path.join(store_dir, PARTS_DIR), exist_ok=True)
+    manifest = load_manifest(store_dir)
+    aggregates = load_aggregates(store_dir, manifest)
+    matches = manifest['matches']
+    files = {os.path.splitext(name)[0]: name for name in sorted(os.listdir(json_dir)) if name.endswith('.json')}
+    counts = dict.fromkeys(('new', 'changed', 'removed', 'unchanged', 'failed'), 0)
+
+    tasks = []
+    for match_id, filename in files.items():
+        filepath = os.path.join(json_dir, filename)
+        stat = os.stat(filepath)
+        entry = matches.get(match_id)
+        if entry is not None and (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            counts['unchanged'] += 1
+            continue
+        tasks.append((match_id, filepath, entry['sha256'] if entry else None, stat.st_size, stat.st_mtime_ns))
+
+    deltas, dirty = [], 0
+    for match_id in [m for m in matches if m not in files]:
+        deltas.append(-match_sums(read_store_csv(part_path(store_dir, matches.pop(match_id)))))
+        counts['removed'] += 1
+        dirty += 1
+
+    workers = workers or os.cpu_count() or 1
+    logging.info(f"{len(files)} match files: {len(tasks)} to check, {counts['removed']} removed; parsing with {workers} worker(s).")
+    for (match_id, filepath, _, size, mtime_ns), digest, deliveries, error in parallel_ordered(read_match, tasks, workers):
+        if error is not None:
+            logging.warning(f"Failed to process {os.path.basename(filepath)}: {error}")
+            counts['failed'] += 1
+            continue
+        entry = matches.get(match_id)
+        if deliveries is None:
+            # Touched but not changed: only remember the new size/mtime.
+            entry.update(size=size, mtime_ns=mtime_ns)
+            counts['unchanged'] += 1
+        else:
+            if entry is not None:
+                deltas.append(-match_sums(read_store_csv(part_path(store_dir, entry))))
+            part = f"{match_id}-{digest[:12]}.csv"
+            deliveries.to_csv(os.path.join(store_dir, PARTS_DIR, part), index=False)
+            deltas.append(match_sums(deliveries))
+            matches[match_id] = {
+                "file": os.path.basename(filepath), "size": size, "mtime_ns": mtime_ns,
+                "sha256": digest, "part": part, "deliveries": len(deliveries)
+            }
+            counts['changed' if entry is not None else 'new'] += 1
+        dirty += 1
+        if dirty >= CHECKPOINT_MATCHES:
+            aggregates = apply_deltas(aggregates, deltas)
+            save_checkpoint(store_dir, manifest, aggregates)
+            deltas, dirty = [], 0
+
+    if dirty or manifest['aggregates'] is None:
+        aggregates = apply_deltas(aggregates, deltas)
+        save_checkpoint(store_dir, manifest, aggregates)
+    return manifest, aggregates, counts
+
+
+def write_matchup_csv(aggregates, output_file=MATCHUP_CSV):
+    """venue.py's output: per-venue sums and rates of the pairs with at least MIN_PAIR_BALLS balls."""
+    matchup = aggregates.sort_index().reset_index()
+    pair_balls = matchup.groupby(['batsman', 'bowler'])['total_balls'].transform('sum')
+    matchup = matchup[pair_balls >= MIN_PAIR_BALLS].reset_index(drop=True)
+    matchup["strike_rate"] = (matchup["total_runs"] / matchup["total_balls"]) * 100
+    matchup["dismissal_rate"] = (matchup["dismissals"] / matchup["total_balls"]) * 100
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    matchup.to_csv(output_file, index=False, encoding="utf-8-sig")
+    return len(matchup)
+
+
+def write_ball_by_ball_csv(store_dir, manifest, output_csv=OUTPUT_CSV):
+    """extract_ball_data.py's output, concatenated from the parts in match file order."""
+    os.makedirs(os.path.dirname(output_csv) or '.', exist_ok=True)
+    partial_csv = f"{output_csv}.partial"
+    records = 0
+    header_written = False
+    with open(partial_csv, 'w', newline='') as f:
+        for entry in sorted(manifest['matches'].values(), key=lambda e: e['file']):
+            deliveries = read_store_csv(part_path(store_dir, entry), usecols=BALL_COLUMNS)
+            deliveries.to_csv(f, header=not header_written, index=False)
+            header_written = True
+            records += len(deliveries)
+    os.replace(partial_csv, output_csv)
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally ingest Cricsheet JSON match files.")
+    parser.add_argument("--json-dir", default=JSON_DIR, help="directory of match files")
+    parser.add_argument("--store", default=STORE_DIR, help="ingestion store (manifest, deliveries, aggregates)")
+    parser.add_argument("--ball-csv", default=OUTPUT_CSV, help="ball-by-ball CSV to write (extract_ball_data.py's output)")
+    parser.add_argument("--matchup-csv", default=MATCHUP_CSV, help="matchup CSV to write (venue.py's output)")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: one per core)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.json_dir):
+        logging.error(f"Directory not found: {args.json_dir}")
+        raise SystemExit(1)
+    manifest, aggregates, counts = ingest(args.json_dir, args.store, args.workers)
+    logging.info(", ".join(f"{count} {kind}" for kind, count in counts.items()) + " matches.")
+
+    if counts['new'] or counts['changed'] or counts['removed'] or not all(map(os.path.exists, (args.ball_csv, args.matchup_csv))):
+        records = write_ball_by_ball_csv(args.store, manifest, args.ball_csv)
+        logging.info(f"Saved {records} ball-by-ball records to {args.ball_csv}")
+        pairs = write_matchup_csv(aggregates, args.matchup_csv)
+        logging.info(f"Saved {pairs} matchup rows to {args.matchup_csv}")
+    else:
+        logging.info("No new or changed matches; outputs are up to date.")
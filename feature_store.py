@@ -0,0 +1,267 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import numpy as np
+
+from prediction_table import fingerprint_files, fingerprint_key
+
+# ---------------------------------------------------
+# Memory-Mapped Feature Store
+# ---------------------------------------------------
+# Everything the "data" load stage derives from the encoding-map CSVs, the dataset
+# and players.db, compiled into one directory of .npy arrays:
+#   - the encoding maps (in CSV row order, so the dicts rebuilt from them are identical),
+#   - `matchups` as offset arrays (batsman -> bowlers -> venues),
+#   - the player records and the precomputed /get_player_stats and /venue_stats payloads,
+#   - one string table that every name above points into.
+# The app memory-maps the arrays read-only, so it skips pandas, the CSV parsing and the match files,
+# and every worker process maps the same page-cache pages. The dataset itself is not
+# stored: nothing is served from its rows once `matchups` and the stats are built, so
+# the app runs without `df_main` when it loads from the store. The store records the
+# hashes of its source files and is ignored (the CSVs are read instead) once any of
+# them changes. It also records their sizes and mtimes: while those still match, the
+# files (hundreds of match files among them) are not hashed again on startup.
+#
+# Build (or rebuild after updating the dataset, the maps, the match files or players.db) with:
+#     python feature_store.py
+
+STORE_DIR = "feature_store"
+FORMAT_VERSION = 3
+MANIFEST_FILE = "manifest.json"
+PLAYER_STATS_FILE = "player_stats.json"
+VENUE_STATS_FILE = "venue_stats.json"
+MAP_KINDS = ('batsman', 'bowler', 'venue', 'batting_hand', 'bowling_style')
+PLAYER_STRING_FIELDS = ('player_name', 'role', 'batting_hand', 'bowling_style', 'profile_image_url')
+
+
+NONE_INDEX = -1
+NAN_INDEX = -2  # pandas reads a literal "nan" cell (there is one in the venue map) as float NaN
+
+
+class StringTable:
+    """Interns strings while building the store; None and NaN get the reserved indices above."""
+
+    def __init__(self):
+        self.index = {}
+        self.strings = []
+
+    def add(self, value):
+        if value is None:
+            return NONE_INDEX
+        if isinstance(value, float) and value != value:
+            return NAN_INDEX
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return i
+
+    def add_all(self, values):
+        return np.array([self.add(v) for v in values], dtype=np.int32)
+
+    def arrays(self):
+        """(UTF-8 blob, offsets): string i is blob[offsets[i]:offsets[i + 1]]."""
+        encoded = [s.encode("utf-8") for s in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+class FeatureStore:
+    """A read-only, memory-mapped view of a built store directory."""
+
+    def __init__(self, path, manifest, arrays, strings, player_stats, venue_stats):
+        self.path = path
+        self.manifest = manifest
+        self.fingerprint = manifest["fingerprint"]
+        self.arrays = arrays
+        self.strings = strings
+        self.player_stats = player_stats
+        self.venue_stats = venue_stats
+
+    def _names(self, indices):
+        strings = self.strings
+        return [strings[i] if i >= 0 else (None if i == NONE_INDEX else float("nan")) for i in indices.tolist()]
+
+    def map_rows(self, kind):
+        """(names, codes) of an encoding map, in the row order of its CSV."""
+        return self._names(self.arrays[f"map_{kind}_names"]), self.arrays[f"map_{kind}_codes"].tolist()
+
+    def matchups(self):
+        """{batsman: {bowler: [venues]}} in the order it was built."""
+        a = self.arrays
+        batsmen = self._names(a["matchup_batsmen"])
+        bowlers = self._names(a["matchup_bowlers"])
+        venues = self._names(a["matchup_venues"])
+        bowler_offsets = a["matchup_bowler_offsets"].tolist()
+        venue_offsets = a["matchup_venue_offsets"].tolist()
+        result = {}
+        for i, batsman in enumerate(batsmen):
+            result[batsman] = {
+                bowlers[j]: venues[venue_offsets[j]:venue_offsets[j + 1]]
+                for j in range(bowler_offsets[i], bowler_offsets[i + 1])
+            }
+        return result
+
+    def player_records(self):
+        """(id, player_name, role, batting_hand, bowling_style, profile_image_url) tuples in DB order."""
+        fields = [self._names(self.arrays[f"player_{field}"]) for field in PLAYER_STRING_FIELDS]
+        return list(zip(self.arrays["player_id"].tolist(), *fields))
+
+    @classmethod
+    def open(cls, path=STORE_DIR):
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"format version {manifest.get('format_version')}, expected {FORMAT_VERSION}")
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+                  for name in manifest["arrays"]}
+        blob = arrays.pop("strings").tobytes()
+        offsets = arrays.pop("string_offsets").tolist()
+        strings = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+        with open(os.path.join(path, PLAYER_STATS_FILE)) as f:
+            player_stats = json.load(f)
+        with open(os.path.join(path, VENUE_STATS_FILE)) as f:
+            venue_stats = json.load(f)
+        return cls(path, manifest, arrays, strings, player_stats, venue_stats)
+
+
+def file_stats(paths):
+    """Returns {path: [size, mtime_ns]} for the files that exist (the keys of fingerprint_files)."""
+    stats = {}
+    for path in sorted(paths):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            stats[fingerprint_key(path)] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def refresh_stats(path, manifest, stats):
+    """
+    Records the current sizes/mtimes of sources whose content is unchanged (after a
+    checkout or a touch), so the next start doesn't hash them again.
+    """
+    manifest["stats"] = stats
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    try:
+        with open(f"{manifest_path}.tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+    except OSError as e:
+        logging.info(f"Could not update the source stats of feature store {path}: {e}")
+
+
+def load_feature_store(source_paths, path=STORE_DIR):
+    """Opens the store if it exists and was built from the current source files, else None."""
+    if not os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        logging.info(f"No feature store at {path}; reading the CSV files.")
+        return None
+    try:
+        store = FeatureStore.open(path)
+    except Exception as e:
+        logging.warning(f"Could not read feature store {path}: {e}")
+        return None
+    stats = file_stats(source_paths)
+    if store.manifest.get("stats") != stats:
+        if store.fingerprint != fingerprint_files(source_paths):
+            logging.warning(f"Feature store {path} was built from different data files; ignoring it. Rebuild with 'python feature_store.py'.")
+            return None
+        refresh_stats(path, store.manifest, stats)
+    logging.info(f"Loaded feature store: {path} (version {store.manifest['version']})")
+    return store
+
+
+def fingerprint_digest(fingerprint):
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def write_feature_store(source_paths, map_rows, matchups, players, player_stats, venue_stats, path=STORE_DIR):
+    """
+    Writes a store directory next to `path` and swaps it in. `map_rows` is {kind: (names, codes)},
+    `players` an iterable of PlayerRecord-like tuples.
+    """
+    strings = StringTable()
+    arrays = {}
+    for kind in MAP_KINDS:
+        names, codes = map_rows[kind]
+        arrays[f"map_{kind}_names"] = strings.add_all(names)
+        arrays[f"map_{kind}_codes"] = np.asarray(codes, dtype=np.int32)
+
+    bowler_offsets, venue_offsets, bowlers, venues = [0], [0], [], []
+    for bowler_venues in matchups.values():
+        for bowler, bowler_venue_list in bowler_venues.items():
+            bowlers.append(bowler)
+            venues.extend(bowler_venue_list)
+            venue_offsets.append(len(venues))
+        bowler_offsets.append(len(bowlers))
+    arrays["matchup_batsmen"] = strings.add_all(matchups.keys())
+    arrays["matchup_bowlers"] = strings.add_all(bowlers)
+    arrays["matchup_venues"] = strings.add_all(venues)
+    arrays["matchup_bowler_offsets"] = np.asarray(bowler_offsets, dtype=np.int32)
+    arrays["matchup_venue_offsets"] = np.asarray(venue_offsets, dtype=np.int32)
+
+    players = list(players)
+    arrays["player_id"] = np.asarray([p[0] for p in players], dtype=np.int64)
+    for i, field in enumerate(PLAYER_STRING_FIELDS, start=1):
+        arrays[f"player_{field}"] = strings.add_all(p[i] for p in players)
+
+    arrays["strings"], arrays["string_offsets"] = strings.arrays()
+
+    stats = file_stats(source_paths)
+    fingerprint = fingerprint_files(source_paths)
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": fingerprint_digest(fingerprint),
+        "fingerprint": fingerprint,
+        "stats": stats,
+        "arrays": sorted(arrays),
+        "dtypes": {name: str(a.dtype) for name, a in sorted(arrays.items())}
+    }
+
+    # Build next to the target and swap directories, so readers never see a half-written store.
+    build_path = f"{path}.build-{os.getpid()}"
+    shutil.rmtree(build_path, ignore_errors=True)
+    os.makedirs(build_path)
+    for name, values in arrays.items():
+        np.save(os.path.join(build_path, f"{name}.npy"), np.ascontiguousarray(values), allow_pickle=False)
+    with open(os.path.join(build_path, PLAYER_STATS_FILE), "w") as f:
+        json.dump(player_stats, f)
+    with open(os.path.join(build_path, VENUE_STATS_FILE), "w") as f:
+        json.dump(venue_stats, f)
+    with open(os.path.join(build_path, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(build_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return manifest
+
+
+if __name__ == "__main__":
+    # Load the data stage from the source files, then compile what it built.
+    os.environ["FEATURE_STORE"] = "0"
+    os.environ["LAZY_LOADING"] = "1"
+    os.environ["BACKGROUND_WARMUP"] = "0"
+    import pandas as pd
+    import app as matchup_app
+
+    matchup_app.ensure_loaded('data')
+    if matchup_app.df_main is None:
+        raise SystemExit("The dataset could not be loaded; see the log above.")
+    map_rows = {}
+    for kind, map_path in matchup_app.map_files.items():
+        df_map = pd.read_csv(map_path)
+        map_rows[kind] = (df_map['Original_Value'].tolist(), df_map['Encoded_Value'].tolist())
+    manifest = write_feature_store(
+        matchup_app.FEATURE_STORE_SOURCES,
+        map_rows,
+        matchup_app.matchups,
+        matchup_app.player_directory.players().values(),
+        matchup_app.player_stats_index,
+        matchup_app.venue_stats_index
+    )
+    size = sum(os.path.getsize(os.path.join(STORE_DIR, f)) for f in os.listdir(STORE_DIR))
+    logging.info(f"✅ Saved feature store {manifest['version']} ({len(manifest['arrays'])} arrays, {size / 1024:.0f} KiB) to {STORE_DIR}")
@@ -0,0 +1,113 @@
+import numpy as np
+
+# ---------------------------------------------------
+# Monte Carlo Innings Simulator
+# ---------------------------------------------------
+# Plays many innings at once, ball by ball, drawing each ball's outcome from the
+# ball outcome model's distribution for the batsman on strike against the bowler of
+# that over. The state (runs, wickets, who is on strike) is one array entry per
+# simulated innings, so a ball is a few NumPy operations over all innings.
+#
+# Rules, kept to what the model predicts: every ball is a legal delivery (the model
+# has no wides or no-balls), an over has 6 balls, the batsmen swap ends on odd runs
+# and at the end of an over, the next batsman in the order comes in on strike after
+# a wicket, and the innings ends when the overs run out or one batsman is left.
+
+BALLS_PER_OVER = 6
+RUN_PERCENTILES = (5, 25, 50, 75, 95)
+RUNS_HISTOGRAM_BIN = 10
+LOOKUP_BINS = 1024
+AMBIGUOUS = 255
+
+
+def outcome_values(classes):
+    """Runs and wicket flag per outcome class label ('0'..'6', 'W')."""
+    runs = np.array([int(label) if str(label).isdigit() else 0 for label in classes], dtype=np.int32)
+    wicket = np.array([str(label) == 'W' for label in classes])
+    return runs, wicket
+
+
+def outcome_lookup(cumulative):
+    """
+    Sampling table for cumulative outcome distributions (one per row): lookup[row, b] is the
+    outcome of every draw in [b / LOOKUP_BINS, (b + 1) / LOOKUP_BINS), or AMBIGUOUS if a
+    class boundary falls inside that bin. Those draws are resolved against `cumulative`,
+    so sampling stays exact while most draws cost a single table read.
+    """
+    n_classes = cumulative.shape[1]
+    edges = np.arange(LOOKUP_BINS + 1, dtype=np.float32) / LOOKUP_BINS
+    lookup = np.empty((len(cumulative), LOOKUP_BINS), dtype=np.uint8)
+    for row, bounds in enumerate(cumulative):
+        low = np.searchsorted(bounds, edges[:-1], side="right")  # outcome of a draw at the bin's start
+        high = np.searchsorted(bounds, edges[1:], side="left")   # ... and just below its end
+        lookup[row] = np.where(low == high, np.minimum(low, n_classes - 1), AMBIGUOUS)
+    return lookup
+
+
+def simulate_innings(pair_probs, pair_index, runs_per_outcome, wicket_outcome, simulations, rng):
+    """
+    `pair_probs` holds one outcome distribution per (batsman, bowler) pair and
+    `pair_index[i, o]` is the pair of batting position i against the bowler of over o.
+    Returns total runs, wickets and balls faced per simulated innings (arrays of length
+    `simulations`).
+    """
+    n_batsmen, n_overs = pair_index.shape
+    n_classes = pair_probs.shape[1]
+    cumulative = np.cumsum(pair_probs, axis=1, dtype=np.float64)
+    cumulative = (cumulative / cumulative[:, -1:]).astype(np.float32)  # model probabilities don't always sum to exactly 1
+    lookup = outcome_lookup(cumulative).ravel()
+    max_wickets = n_batsmen - 1
+
+    runs = np.zeros(simulations, dtype=np.int32)
+    wickets = np.zeros(simulations, dtype=np.int32)
+    balls = np.zeros(simulations, dtype=np.int32)
+    striker = np.zeros(simulations, dtype=np.intp)
+    non_striker = np.ones(simulations, dtype=np.intp)
+    active = np.ones(simulations, dtype=bool)
+    for over in range(n_overs):
+        over_pairs = pair_index[:, over].astype(np.intp)
+        for _ in range(BALLS_PER_OVER):
+            pairs = over_pairs[striker]
+            draws = rng.random(simulations, dtype=np.float32)
+            outcome = lookup[pairs * LOOKUP_BINS + (draws * LOOKUP_BINS).astype(np.intp)]
+            ambiguous = np.flatnonzero(outcome == AMBIGUOUS)
+            if ambiguous.size:
+                exact = (cumulative[pairs[ambiguous]] <= draws[ambiguous, None]).sum(axis=1)
+                outcome[ambiguous] = np.minimum(exact, n_classes - 1)
+            scored = runs_per_outcome[outcome] * active
+            out = wicket_outcome[outcome] & active
+            runs += scored
+            balls += active
+            wickets += out
+            striker = np.where(out, np.minimum(wickets + 1, max_wickets), striker)
+            active &= wickets < max_wickets
+            swap = (scored & 1).astype(bool)
+            striker, non_striker = np.where(swap, non_striker, striker), np.where(swap, striker, non_striker)
+        if not active.any():
+            break
+        striker, non_striker = non_striker, striker
+    return runs, wickets, balls
+
+
+def summarize_innings(runs, wickets, balls, max_wickets):
+    """Distributions of total runs and wickets over the simulated innings."""
+    histogram = np.bincount(runs // RUNS_HISTOGRAM_BIN) / len(runs)
+    return {
+        "runs": {
+            "mean": round(float(runs.mean()), 2),
+            "std": round(float(runs.std()), 2),
+            "min": int(runs.min()),
+            "max": int(runs.max()),
+            "percentiles": {f"p{q}": float(v) for q, v in zip(RUN_PERCENTILES, np.percentile(runs, RUN_PERCENTILES))},
+            # histogram[i] is the share of innings with RUNS_HISTOGRAM_BIN * i to RUNS_HISTOGRAM_BIN * (i + 1) - 1 runs
+            "histogram_bin": RUNS_HISTOGRAM_BIN,
+            "histogram": [round(float(p), 4) for p in histogram]
+        },
+        "wickets": {
+            "mean": round(float(wickets.mean()), 2),
+            # distribution[w] is the share of innings that lost w wickets
+            "distribution": [round(float(p), 4) for p in np.bincount(wickets, minlength=max_wickets + 1) / len(wickets)],
+            "all_out": round(float((wickets == max_wickets).mean()), 4)
+        },
+        "balls": {"mean": round(float(balls.mean()), 2)}
+    }
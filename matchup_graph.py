@@ -0,0 +1,93 @@
+import numpy as np
+
+# ---------------------------------------------------
+# Compiled Batsman -> Bowler -> Venue Graph
+# ---------------------------------------------------
+# `matchups` ({batsman: {bowler: [venues]}}) as integer adjacency arrays. Every
+# name gets an id in sorted-name order, so the bowler ids of a batsman are stored
+# sorted and a sorted id slice is also a name-sorted list:
+#   bowler_offsets[b] : bowler_offsets[b + 1]  -> pairs of batsman b (pair_bowlers)
+#   venue_offsets[p]  : venue_offsets[p + 1]   -> venues of pair p (pair_venues)
+# The lookups the analysis page needs are array slices (plus one binary search for
+# a pair), and `to_dict()` is the whole graph in this id form for the client.
+
+
+class MatchupGraph:
+    __slots__ = ("batsmen", "bowlers", "venues", "batsman_ids", "bowler_ids",
+                 "bowler_offsets", "pair_bowlers", "venue_offsets", "pair_venues")
+
+    def __init__(self, batsmen, bowlers, venues, bowler_offsets, pair_bowlers, venue_offsets, pair_venues):
+        self.batsmen = batsmen
+        self.bowlers = bowlers
+        self.venues = venues
+        self.batsman_ids = {name: i for i, name in enumerate(batsmen)}
+        self.bowler_ids = {name: i for i, name in enumerate(bowlers)}
+        self.bowler_offsets = bowler_offsets
+        self.pair_bowlers = pair_bowlers
+        self.venue_offsets = venue_offsets
+        self.pair_venues = pair_venues
+
+    @classmethod
+    def from_matchups(cls, matchups):
+        batsmen = sorted(matchups)
+        bowlers = sorted({bowler for bowler_venues in matchups.values() for bowler in bowler_venues})
+        # The venue map has a "nan" row that pandas reads as float NaN, so venues are keyed by their text.
+        venues_by_text = {str(venue): venue for bowler_venues in matchups.values()
+                          for venue_list in bowler_venues.values() for venue in venue_list}
+        venues = [venues_by_text[text] for text in sorted(venues_by_text)]
+        bowler_ids = {name: i for i, name in enumerate(bowlers)}
+        venue_ids = {str(name): i for i, name in enumerate(venues)}
+
+        bowler_offsets, pair_bowlers, venue_offsets, pair_venues = [0], [], [0], []
+        for batsman in batsmen:
+            for bowler in sorted(matchups[batsman]):
+                pair_bowlers.append(bowler_ids[bowler])
+                pair_venues.extend(venue_ids[str(venue)] for venue in matchups[batsman][bowler])
+                venue_offsets.append(len(pair_venues))
+            bowler_offsets.append(len(pair_bowlers))
+
+        return cls(batsmen, bowlers, venues,
+                   np.asarray(bowler_offsets, dtype=np.int32), np.asarray(pair_bowlers, dtype=np.int32),
+                   np.asarray(venue_offsets, dtype=np.int32), np.asarray(pair_venues, dtype=np.int32))
+
+    def _pair_range(self, batsman):
+        b = self.batsman_ids.get(batsman)
+        if b is None:
+            return 0, 0
+        return int(self.bowler_offsets[b]), int(self.bowler_offsets[b + 1])
+
+    def pair_index(self, batsman, bowler):
+        """Position of (batsman, bowler) in the pair arrays, or None if they haven't faced each other."""
+        start, end = self._pair_range(batsman)
+        bowler_id = self.bowler_ids.get(bowler)
+        if bowler_id is None or start == end:
+            return None
+        i = start + int(np.searchsorted(self.pair_bowlers[start:end], bowler_id))
+        return i if i < end and self.pair_bowlers[i] == bowler_id else None
+
+    def bowlers_of(self, batsman):
+        """Names of the bowlers `batsman` has faced, sorted."""
+        start, end = self._pair_range(batsman)
+        bowlers = self.bowlers
+        return [bowlers[i] for i in self.pair_bowlers[start:end].tolist()]
+
+    def venues_of(self, batsman, bowler):
+        """Venues where the pair has met, in the order of `matchups` (sorted)."""
+        p = self.pair_index(batsman, bowler)
+        if p is None:
+            return []
+        venues = self.venues
+        return [venues[i] for i in self.pair_venues[self.venue_offsets[p]:self.venue_offsets[p + 1]].tolist()]
+
+    def to_dict(self, version):
+        """The whole graph by id, as served by /matchup_graph (a NaN venue as "nan", so it stays valid JSON)."""
+        return {
+            "version": version,
+            "batsmen": self.batsmen,
+            "bowlers": self.bowlers,
+            "venues": [str(venue) for venue in self.venues],
+            "bowler_offsets": self.bowler_offsets.tolist(),
+            "pair_bowlers": self.pair_bowlers.tolist(),
+            "venue_offsets": self.venue_offsets.tolist(),
+            "pair_venues": self.pair_venues.tolist()
+        }
@@ -0,0 +1,106 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+
+# ---------------------------------------------------
+# Dynamic Micro-Batching of Inference Calls
+# ---------------------------------------------------
+# Under bursty load many request threads each make a 1-row model call, and the
+# per-call overhead of XGBoost dominates. A MicroBatcher collects the rows submitted
+# by concurrent requests and flushes them as one predict call once `max_batch_size`
+# rows are queued or the oldest row has waited `max_wait_ms`. The model runs on a
+# small worker pool and each request gets its own row of the result back.
+
+
+class BatcherClosed(RuntimeError):
+    """Raised by submit() once the batcher has been closed (e.g. its model bundle was retired)."""
+
+
+class MicroBatcher:
+    """Groups concurrently submitted feature rows into batched calls of `predict_fn`."""
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0, executor_threads=1, name="batcher"):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._pending = []  # [(row, future, enqueued_at)]
+        self._cond = threading.Condition()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=executor_threads, thread_name_prefix=f"{name}-infer")
+        self._thread = threading.Thread(target=self._dispatch_loop, name=name, daemon=True)
+        self.batches = 0
+        self.rows = 0
+        self.max_seen_batch = 0
+        self._thread.start()
+
+    def submit(self, row):
+        """Queues one feature row; returns a Future resolving to that row's prediction."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise BatcherClosed(f"{self.name} is closed")
+            self._pending.append((row, future, time.monotonic()))
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch_size:
+                self._cond.notify()
+        return future
+
+    def predict(self, row, timeout=None):
+        """Blocking helper for request threads."""
+        return self.submit(row).result(timeout=timeout)
+
+    async def predict_async(self, row):
+        """Awaitable helper for asyncio callers."""
+        return await asyncio.wrap_future(self.submit(row))
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+                # Wait for the batch to fill up, but never past the oldest row's deadline.
+                deadline = self._pending[0][2] + self.max_wait
+                while len(self._pending) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+            self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch):
+        futures = [future for _, future, _ in batch]
+        try:
+            outputs = self.predict_fn(np.asarray([row for row, _, _ in batch], dtype=np.float32))
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += len(batch)
+        self.max_seen_batch = max(self.max_seen_batch, len(batch))
+        for future, output in zip(futures, outputs):
+            future.set_result(output)
+
+    def close(self):
+        """Stops accepting rows; queued rows are still flushed."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size_seen": self.max_seen_batch,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0
+        }
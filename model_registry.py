@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from prediction_table import fingerprint_files
+
+# ---------------------------------------------------
+# Versioned Model Registry with Hot Reload
+# ---------------------------------------------------
+# A ModelBundle is one immutable generation of the models and the encoding maps
+# they were trained with. The registry builds a new bundle in the background when
+# the files under models/ or maps/ change (or when asked to), validates and warms
+# it up, and then swaps it in with a single reference assignment. A request pins
+# the bundle it started on (acquire/release), so in-flight requests finish on the
+# old version; the old bundle is retired once its last request is done.
+#
+# Versions: if models/manifest.json exists, its "version" names the bundle and its
+# optional "files" ({path: sha256}, paths relative to the project root, e.g.
+# "models/xgb_model_total_runs.joblib") must match the files on disk, so a bundle
+# is only picked up once it has been copied completely. Publish a retrained model by
+# copying the files first and writing manifest.json last. Without a manifest the
+# version is derived from the content hashes of the model and map files.
+
+MANIFEST_FILE = "manifest.json"
+
+
+class ModelBundleError(Exception):
+    """A candidate bundle failed to load or validate; the active bundle stays in place."""
+
+
+class ModelBundle:
+    """One loaded generation of models, their native copies, encoding maps, prediction table and outcome tensor."""
+
+    def __init__(self, version, fingerprint, manifest=None):
+        self.version = version
+        self.fingerprint = fingerprint  # {filename: sha256}
+        self.manifest = manifest or {}
+        self.models = {}
+        self.compiled_models = {}
+        self.encodings = {}
+        self.prediction_table = None
+        self.outcome_tensor = None
+        self.loaded_at = None
+        self.activated_at = None
+        self.in_flight = 0
+        self.retired = False
+
+    def info(self):
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "activated_at": self.activated_at,
+            "files": {name: digest[:12] for name, digest in self.fingerprint.items()},
+            "models": {t: sorted(a for a, m in type_models.items() if m is not None) for t, type_models in self.models.items()},
+            "native": {t: sorted(type_models) for t, type_models in self.compiled_models.items() if type_models},
+            "prediction_table": self.prediction_table is not None,
+            "outcome_tensor": self.outcome_tensor is not None
+        }
+
+
+class ModelRegistry:
+    """
+    Owns the active ModelBundle. `loader(bundle)` fills in a new bundle and
+    `validator(bundle)` checks and warms it up (raising ModelBundleError to reject it).
+    `on_activate(bundle)` runs after a swap and `on_retire(bundle)` once a replaced
+    bundle has no requests left.
+    """
+
+    def __init__(self, models_dir, watched_paths, loader, validator, on_activate=None, on_retire=None, history_size=10):
+        self.models_dir = models_dir
+        self.watched_paths = watched_paths  # callable returning the files that make up a bundle
+        self.loader = loader
+        self.validator = validator
+        self.on_activate = on_activate
+        self.on_retire = on_retire
+        self.history_size = history_size
+        self.active = None
+        self.history = []  # recently activated versions, newest first
+        self.state = "empty"  # empty, loading, ready, failed
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    # --- Versions ---
+    def manifest_path(self):
+        return os.path.join(self.models_dir, MANIFEST_FILE)
+
+    def read_manifest(self):
+        path = self.manifest_path()
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ModelBundleError(f"Unreadable manifest {path}: {e}")
+        if not isinstance(manifest, dict) or not manifest.get("version"):
+            raise ModelBundleError(f"Manifest {path} has no version")
+        return manifest
+
+    def inspect(self):
+        """Returns (version, fingerprint, manifest) of the files currently on disk."""
+        manifest = self.read_manifest()
+        fingerprint = fingerprint_files(self.watched_paths())
+        if manifest is not None:
+            for name, digest in manifest.get("files", {}).items():
+                if fingerprint.get(name) != digest:
+                    raise ModelBundleError(f"{name} does not match manifest version {manifest['version']} (still being copied?)")
+            return str(manifest["version"]), fingerprint, manifest
+        digest = hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()[:12]
+        return f"sha-{digest}", fingerprint, None
+
+    # --- Loading & Swapping ---
+    def load(self):
+        """Initial, synchronous load. A bundle that fails validation is still activated, as there is nothing to fall back to."""
+        try:
+            version, fingerprint, manifest = self.inspect()
+        except ModelBundleError as e:
+            logging.error(f"{e}; loading the files as they are.")
+            version, fingerprint, manifest = "unverified", fingerprint_files(self.watched_paths()), None
+        bundle = self._build(version, fingerprint, manifest)
+        try:
+            self.validator(bundle)
+        except ModelBundleError as e:
+            logging.error(f"Model bundle {version} failed validation: {e}")
+        self._activate(bundle)
+        return bundle
+
+    def reload(self, force=False):
+        """
+        Builds, validates and activates the bundle currently on disk. Returns the new
+        bundle, or None if it is already active. Raises ModelBundleError on failure.
+        """
+        with self._reload_lock:
+            self.state = "loading"
+            try:
+                version, fingerprint, manifest = self.inspect()
+                if not force and self.active is not None and (self.active.version, self.active.fingerprint) == (version, fingerprint):
+                    self.state = "ready"
+                    return None
+                bundle = self._build(version, fingerprint, manifest)
+                self.validator(bundle)
+            except Exception as e:
+                self.state = "failed"
+                self.last_error = str(e) if isinstance(e, ModelBundleError) else f"{type(e).__name__}: {e}"
+                logging.error(f"Model reload failed, keeping version {self.active.version if self.active else None}: {self.last_error}",
+                              exc_info=not isinstance(e, ModelBundleError))
+                if isinstance(e, ModelBundleError):
+                    raise
+                raise ModelBundleError(self.last_error) from e
+            self._activate(bundle)
+            return bundle
+
+    def reload_async(self, force=False):
+        """Starts reload() on a background thread; returns False if a reload is already running."""
+        if self._reload_lock.locked():
+            return False
+
+        def run():
+            try:
+                self.reload(force=force)
+            except ModelBundleError:
+                pass  # already logged and recorded in `last_error`
+
+        threading.Thread(target=run, name="model-reload", daemon=True).start()
+        return True
+
+    def _build(self, version, fingerprint, manifest):
+        bundle = ModelBundle(version, fingerprint, manifest)
+        start = time.perf_counter()
+        self.loader(bundle)
+        bundle.loaded_at = time.time()
+        logging.info(f"Loaded model bundle {version} in {time.perf_counter() - start:.2f}s")
+        return bundle
+
+    def _activate(self, bundle):
+        bundle.activated_at = time.time()
+        with self._lock:
+            previous, self.active = self.active, bundle
+            retire_now = False
+            if previous is not None:
+                previous.retired = True
+                retire_now = previous.in_flight == 0
+        self.history = ([bundle.version] + [v for v in self.history if v != bundle.version])[:self.history_size]
+        self.state = "ready"
+        self.last_error = None
+        logging.info(f"✅ Model version {bundle.version} is now active" + (f" (was {previous.version})" if previous else ""))
+        if self.on_activate:
+            self.on_activate(bundle)
+        if retire_now:
+            self._retire(previous)
+
+    def _retire(self, bundle):
+        if self.on_retire:
+            self.on_retire(bundle)
+        logging.info(f"Retired model version {bundle.version}")
+
+    # --- Request Pinning ---
+    def acquire(self):
+        """Pins the active bundle for the caller until release()."""
+        with self._lock:
+            bundle = self.active
+            if bundle is not None:
+                bundle.in_flight += 1
+        return bundle
+
+    def release(self, bundle):
+        with self._lock:
+            bundle.in_flight -= 1
+            retire_now = bundle.retired and bundle.in_flight == 0
+        if retire_now:
+            self._retire(bundle)
+
+    # --- File Watching ---
+    def _signature(self):
+        paths = list(self.watched_paths()) + [self.manifest_path()]
+        signature = []
+        for path in sorted(paths):
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append((path, None, None))
+        return signature
+
+    def watch(self, interval):
+        """Polls the bundle files every `interval` seconds and reloads once a change has settled."""
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def run():
+            seen = self._signature()
+            pending = None
+            while not self._stop.wait(interval):
+                current = self._signature()
+                if current == seen:
+                    continue
+                if current != pending:  # still changing: wait for one quiet interval
+                    pending = current
+                    continue
+                seen, pending = current, None
+                try:
+                    self.reload()
+                except ModelBundleError:
+                    pass  # keep serving the active bundle; retried on the next change
+
+        self._watcher = threading.Thread(target=run, name="model-watcher", daemon=True)
+        self._watcher.start()
+        logging.info(f"Watching {self.models_dir} for new model versions every {interval}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        return {
+            "state": self.state,
+            "active": self.active.info() if self.active else None,
+            "history": self.history,
+            "last_error": self.last_error,
+            "watching": self._watcher is not None
+        }
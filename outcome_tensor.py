@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import logging
+import argparse
+import numpy as np
+
+from prediction_table import fingerprint_files
+
+# ---------------------------------------------------
+# Dense Ball Outcome Tensor
+# ---------------------------------------------------
+# The ball outcome model only sees (batsman, bowler, venue) codes, and the codes of
+# each encoding map are 0..N-1, so its whole input space is a small grid. The tensor
+# holds the model's class probabilities for every cell:
+#     tensor[batsman, bowler, venue] -> float32[n_classes]
+# It is saved as a plain .npy file and memory-mapped read-only, so a lookup is an
+# index into the page cache and every worker process shares the same pages. A build
+# with --observed only scores the matchups in the dataset and leaves the other cells
+# NaN (a lookup there returns None, like a key missing from the prediction table).
+#
+# Build (or rebuild after retraining the ball outcome model or changing the maps) with:
+#     python outcome_tensor.py [--observed]
+# and check it against live predictions (the configured inference engine) with:
+#     python outcome_tensor.py --verify [--samples N]
+
+TENSOR_PATH = os.path.join("models", "ball_outcome_tensor.npy")
+MANIFEST_SUFFIX = ".json"
+BUILD_CHUNK_ROWS = 65536
+VERIFY_TOLERANCE = 1e-5  # the native engine's tolerance against the reference model (see validate_model_bundle)
+
+
+def manifest_path(path):
+    return os.path.splitext(path)[0] + MANIFEST_SUFFIX
+
+
+class OutcomeTensor:
+    """A read-only, memory-mapped (batsman, bowler, venue, class) probability tensor."""
+
+    def __init__(self, values, manifest):
+        self.values = values
+        self.manifest = manifest
+        self.fingerprint = manifest["fingerprint"]
+        self.outcome_classes = manifest["outcome_classes"]
+        self.shape = values.shape[:3]
+
+    def __len__(self):
+        return int(np.prod(self.shape))
+
+    def lookup(self, key):
+        """Outcome class probabilities for a (batsman, bowler, venue) key, or None outside the tensor."""
+        batsman, bowler, venue = key
+        if not (0 <= batsman < self.shape[0] and 0 <= bowler < self.shape[1] and 0 <= venue < self.shape[2]):
+            return None
+        probs = self.values[batsman, bowler, venue]
+        return None if probs[0] != probs[0] else probs
+
+    def lookup_many(self, keys):
+        """(probabilities, found) for an N x 3 array of keys; rows that aren't found are NaN."""
+        keys = np.asarray(keys, dtype=np.int64).reshape(-1, 3)
+        found = np.all((keys >= 0) & (keys < np.asarray(self.shape)), axis=1)
+        probs = np.full((len(keys), self.values.shape[3]), np.nan, dtype=np.float32)
+        if found.any():
+            probs[found] = self.values[keys[found, 0], keys[found, 1], keys[found, 2]]
+            found &= ~np.isnan(probs[:, 0])
+        return probs, found
+
+    @classmethod
+    def open(cls, path=TENSOR_PATH):
+        with open(manifest_path(path)) as f:
+            manifest = json.load(f)
+        values = np.load(path, mmap_mode="r", allow_pickle=False)
+        if list(values.shape) != manifest["shape"] or values.dtype != np.float32:
+            raise ValueError(f"tensor is {values.dtype}{list(values.shape)}, manifest says float32{manifest['shape']}")
+        return cls(values, manifest)
+
+
+def load_outcome_tensor(source_paths, path=TENSOR_PATH):
+    """Opens the tensor if it exists and was built from the current model and map files, else None."""
+    if not os.path.exists(path):
+        logging.info(f"No ball outcome tensor at {path}.")
+        return None
+    try:
+        tensor = OutcomeTensor.open(path)
+    except Exception as e:
+        logging.warning(f"Could not read ball outcome tensor {path}: {e}")
+        return None
+    if tensor.fingerprint != fingerprint_files(source_paths):
+        logging.warning(f"Ball outcome tensor {path} was built from different model or map files; ignoring it. Rebuild with 'python outcome_tensor.py'.")
+        return None
+    logging.info(f"Loaded ball outcome tensor: {path} ({'x'.join(map(str, tensor.values.shape))})")
+    return tensor
+
+
+def grid_keys(cells, shape):
+    """(batsman, bowler, venue) feature rows of flat cell indices into a grid of `shape`."""
+    return np.stack(np.unravel_index(cells, shape), axis=1).astype(np.float32)
+
+
+def build_outcome_tensor(model, outcome_classes, shape, source_paths, observed_keys=None, path=TENSOR_PATH):
+    """
+    Scores the grid (every cell, or only `observed_keys`) with `model` in chunks of
+    BUILD_CHUNK_ROWS, writing straight into a memory-mapped file that replaces `path`
+    when it is complete. Returns the manifest.
+    """
+    shape = tuple(int(n) for n in shape)
+    n_classes = len(outcome_classes)
+    if observed_keys is None:
+        cells = np.arange(int(np.prod(shape)))
+    else:
+        cells = np.unique(np.ravel_multi_index(np.asarray(observed_keys, dtype=np.int64).T, shape))
+
+    build_path = f"{path}.build-{os.getpid()}.npy"
+    values = np.lib.format.open_memmap(build_path, mode="w+", dtype=np.float32, shape=(*shape, n_classes))
+    flat = values.reshape(-1, n_classes)
+    if observed_keys is not None:
+        flat[:] = np.nan
+    for start in range(0, len(cells), BUILD_CHUNK_ROWS):
+        chunk = cells[start:start + BUILD_CHUNK_ROWS]
+        flat[chunk] = model.predict_proba(grid_keys(chunk, shape))
+    values.flush()
+    del values, flat
+
+    manifest = {
+        "shape": [*shape, n_classes],
+        "outcome_classes": [str(c) for c in outcome_classes],
+        "coverage": "full" if observed_keys is None else "observed",
+        "cells": int(len(cells)),
+        "fingerprint": fingerprint_files(source_paths)
+    }
+    # Tensor first, then its manifest: a reader that opens the new file with the old
+    # manifest sees a fingerprint mismatch (or a shape mismatch) and ignores it.
+    os.replace(build_path, path)
+    with open(manifest_path(path) + ".build", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path(path) + ".build", manifest_path(path))
+    return manifest
+
+
+def verify_outcome_tensor(tensor, predict, samples=None, seed=0):
+    """
+    Compares the tensor against `predict(features)` (live inference) on every filled
+    cell, or on `samples` random ones. Returns {"cells", "max_abs_diff", "mismatches"}.
+    """
+    n_classes = tensor.values.shape[3]
+    flat = tensor.values.reshape(-1, n_classes)
+    cells = np.flatnonzero(~np.isnan(flat[:, 0]))
+    if samples and samples < len(cells):
+        cells = np.sort(np.random.default_rng(seed).choice(cells, samples, replace=False))
+    max_diff, mismatches = 0.0, 0
+    for start in range(0, len(cells), BUILD_CHUNK_ROWS):
+        chunk = cells[start:start + BUILD_CHUNK_ROWS]
+        diff = np.abs(np.asarray(predict(grid_keys(chunk, tensor.shape)), dtype=np.float64) - flat[chunk]).max(axis=1)
+        max_diff = max(max_diff, float(diff.max()))
+        mismatches += int(np.count_nonzero(diff > VERIFY_TOLERANCE))
+    return {"cells": int(len(cells)), "max_abs_diff": max_diff, "mismatches": mismatches}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or verify the dense ball outcome tensor.")
+    parser.add_argument("--observed", action="store_true", help="only score the matchups in the dataset")
+    parser.add_argument("--verify", action="store_true", help="compare the saved tensor against live predictions")
+    parser.add_argument("--samples", type=int, default=0, help="cells to verify (default: all filled cells)")
+    args = parser.parse_args()
+
+    import app as matchup_app
+
+    matchup_app.ensure_loaded('data', 'models')
+    bundle = matchup_app.model_registry.active
+    model = bundle.models['ball_outcome'].get('xgb')
+    encoder = bundle.models['ball_outcome'].get('encoder')
+    if model is None or encoder is None:
+        raise SystemExit("The ball outcome model is not loaded; see the log above.")
+
+    if args.verify:
+        tensor = load_outcome_tensor(matchup_app.outcome_tensor_sources())
+        if tensor is None:
+            raise SystemExit(f"No up-to-date tensor at {TENSOR_PATH}; build it with 'python outcome_tensor.py'.")
+        if tensor.outcome_classes != [str(c) for c in encoder.classes_]:
+            raise SystemExit(f"Tensor classes {tensor.outcome_classes} don't match the encoder's {list(encoder.classes_)}.")
+        report = verify_outcome_tensor(
+            tensor, lambda features: matchup_app.run_model(bundle, 'ball_outcome', 'xgb', features), args.samples or None)
+        engine = "native" if bundle.compiled_models['ball_outcome'].get('xgb') is not None else "reference"
+        logging.info(f"Verified {report['cells']} cells against the {engine} engine: "
+                     f"max abs diff {report['max_abs_diff']:.2e}, {report['mismatches']} over {VERIFY_TOLERANCE:g}")
+        sys.exit(1 if report["mismatches"] else 0)
+
+    shape = [max(code for code in bundle.encodings[feature].values()) + 1 for feature in ('batsman', 'bowler', 'venue')]
+    observed = matchup_app.observed_matchup_features(bundle)[:, [0, 1, 4]] if args.observed else None
+    manifest = build_outcome_tensor(model, encoder.classes_, shape, matchup_app.outcome_tensor_sources(), observed)
+    logging.info(f"✅ Saved ball outcome tensor {'x'.join(map(str, manifest['shape']))} "
+                 f"({manifest['cells']} cells scored) to {TENSOR_PATH}")
@@ -0,0 +1,154 @@
+import os
+import time
+import hashlib
+import queue
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+
+# ---------------------------------------------------
+# In-Memory Player Directory
+# ---------------------------------------------------
+# The players table is tiny and read-only at runtime, so it is loaded once into
+# memory and served from there. The DB file is re-checked every few seconds and
+# the directory reloads itself when the file changes (e.g. after setup_database.py).
+
+
+class PlayerRecord(NamedTuple):
+    id: int
+    player_name: str
+    role: Optional[str]
+    batting_hand: Optional[str]
+    bowling_style: Optional[str]
+    profile_image_url: Optional[str]
+
+    def to_dict(self):
+        return self._asdict()
+
+
+class ReadOnlyConnectionPool:
+    """A small pool of read-only SQLite connections shared between threads."""
+
+    def __init__(self, db_file, size=4):
+        self.db_file = db_file
+        self._pool = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        uri = f"file:{os.path.abspath(self.db_file)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close_all(self):
+        """Closes the idle connections, e.g. after the DB file has been replaced."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class PlayerDirectory:
+    """Player records keyed by name, reloaded when the DB file changes."""
+
+    def __init__(self, db_file, check_interval=2.0, pool_size=4):
+        self.db_file = db_file
+        self.check_interval = check_interval
+        self.pool = ReadOnlyConnectionPool(db_file, size=pool_size)
+        self._players = {}
+        self._roles = {}
+        self._file_state = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.version = None
+
+    def _read_file_state(self):
+        try:
+            stat = os.stat(self.db_file)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def load(self):
+        """Reads the whole players table. On failure the previous records are kept."""
+        file_state = self._read_file_state()
+        try:
+            self.pool.close_all()
+            with self.pool.connection() as conn:
+                rows = conn.execute(
+                    "SELECT id, player_name, role, batting_hand, bowling_style, profile_image_url FROM players"
+                ).fetchall()
+        except Exception as e:
+            logging.error(f"Could not load players from {self.db_file}: {e}")
+            return False
+
+        self._set_players(rows, file_state)
+        logging.info(f"Loaded {len(self._players)} players from {self.db_file}")
+        return True
+
+    def load_records(self, records):
+        """
+        Uses player rows (id, player_name, role, batting_hand, bowling_style, profile_image_url)
+        read elsewhere, e.g. from the feature store, instead of querying the DB. The DB file
+        is still watched and reloaded from when it changes.
+        """
+        self._set_players(records, self._read_file_state())
+        logging.info(f"Loaded {len(self._players)} players for {self.db_file} from precompiled records")
+
+    def _set_players(self, rows, file_state):
+        players = {row[1]: PlayerRecord(*row) for row in rows}
+        self._players = players
+        self._roles = {name: p.role for name, p in players.items()}
+        self._file_state = file_state
+        self.version = hashlib.sha256(repr(sorted(players.values())).encode()).hexdigest()[:16]
+        self.loaded = True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            if self._read_file_state() != self._file_state:
+                self.load()
+
+    def refresh(self):
+        """Reloads the directory if the DB file has changed since the last check."""
+        self._maybe_reload()
+
+    def players(self):
+        """Returns {player_name: PlayerRecord} for every player."""
+        self._maybe_reload()
+        return self._players
+
+    def get(self, player_name):
+        """Returns the PlayerRecord for `player_name`, or None."""
+        self._maybe_reload()
+        return self._players.get(player_name)
+
+    def roles(self):
+        """Returns {player_name: role} for every player."""
+        self._maybe_reload()
+        return self._roles
+
+    def __len__(self):
+        return len(self._players)
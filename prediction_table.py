@@ -0,0 +1,163 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+
+# ---------------------------------------------------
+# Materialized Prediction Table
+# ---------------------------------------------------
+# Every (batsman, bowler, venue) triple the UI can ask about is scored offline
+# with each loaded model, so the predict routes can answer with an array lookup
+# and only fall back to live inference for inputs missing from the table.
+#
+# Build (or rebuild after retraining / updating players.db) with:
+#     python prediction_table.py
+
+TABLE_PATH = os.path.join("models", "prediction_table.npz")
+BALLS_GRID = np.arange(1, 121)  # 1..120 balls, a full T20 innings
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def fingerprint_key(path):
+    """A file's key in a fingerprint: its path relative to the project root, with '/' separators."""
+    return os.path.relpath(os.path.abspath(path), PROJECT_DIR).replace(os.sep, "/")
+
+
+def fingerprint_files(paths):
+    """Returns {path: sha256} for the files that exist, used to detect stale tables."""
+    fingerprint = {}
+    for path in sorted(paths):
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                fingerprint[fingerprint_key(path)] = hashlib.sha256(f.read()).hexdigest()
+    return fingerprint
+
+
+class PredictionTable:
+    """
+    Array-backed store of precomputed predictions.
+    `features` holds one row per matchup: (batsman, bowler, batting_hand, bowling_style, venue)
+    encodings, i.e. the dismissals model input. Runs arrays have one column per value in
+    `balls_grid`; ball outcome arrays have one column per outcome class.
+    """
+
+    def __init__(self, features, arrays, balls_grid, outcome_classes, fingerprint):
+        self.features = features
+        self.arrays = arrays
+        self.balls_grid = balls_grid
+        self.outcome_classes = outcome_classes
+        self.fingerprint = fingerprint
+
+        self.row_index = {tuple(row): i for i, row in enumerate(features.tolist())}
+        self.ball_row_index = {(row[0], row[1], row[4]): i for i, row in enumerate(features.tolist())}
+        self.balls_index = {int(b): i for i, b in enumerate(balls_grid)}
+
+    def __len__(self):
+        return len(self.features)
+
+    def lookup_runs(self, algo, key, balls_faced):
+        """Predicted runs for a 5-feature key, or None if not materialized."""
+        values = self.arrays.get(f"runs_{algo}")
+        row = self.row_index.get(key)
+        col = self.balls_index.get(balls_faced)
+        if values is None or row is None or col is None:
+            return None
+        return values[row, col]
+
+    def lookup_dismissal(self, algo, key):
+        """Dismissal probability for a 5-feature key, or None if not materialized."""
+        values = self.arrays.get(f"dismissals_{algo}")
+        row = self.row_index.get(key)
+        if values is None or row is None:
+            return None
+        return values[row]
+
+    def lookup_ball_outcome(self, algo, key):
+        """Outcome class probabilities for a (batsman, bowler, venue) key, or None."""
+        values = self.arrays.get(f"ball_outcome_{algo}")
+        row = self.ball_row_index.get(key)
+        if values is None or row is None:
+            return None
+        return values[row]
+
+    def save(self, path=TABLE_PATH):
+        np.savez_compressed(
+            path,
+            features=self.features,
+            balls_grid=self.balls_grid,
+            outcome_classes=np.asarray(self.outcome_classes, dtype=str),
+            fingerprint=np.array(json.dumps(self.fingerprint)),
+            **self.arrays
+        )
+
+    @classmethod
+    def load(cls, path=TABLE_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {k: data[k] for k in data.files if k.startswith(("runs_", "dismissals_", "ball_outcome_"))}
+            return cls(
+                features=data["features"],
+                arrays=arrays,
+                balls_grid=data["balls_grid"],
+                outcome_classes=data["outcome_classes"].tolist(),
+                fingerprint=json.loads(str(data["fingerprint"]))
+            )
+
+
+def load_prediction_table(model_paths, path=TABLE_PATH):
+    """Loads the table if it exists and was built from the current model files, else None."""
+    if not os.path.exists(path):
+        logging.info(f"No prediction table at {path}; using live inference only.")
+        return None
+    try:
+        table = PredictionTable.load(path)
+    except Exception as e:
+        logging.warning(f"Could not read prediction table {path}: {e}")
+        return None
+    if table.fingerprint != fingerprint_files(model_paths):
+        logging.warning(f"Prediction table {path} was built from different model files; ignoring it. Rebuild with 'python prediction_table.py'.")
+        return None
+    logging.info(f"Loaded prediction table: {path} ({len(table)} matchups)")
+    return table
+
+
+def build_prediction_table(feature_rows, models, model_paths, balls_grid=BALLS_GRID):
+    """
+    Scores every row of `feature_rows` (N x 5 dismissals features) with each loaded model.
+    Runs models are evaluated once over the N x len(balls_grid) cross product.
+    """
+    features = np.asarray(feature_rows, dtype=np.int32).reshape(-1, 5)
+    base = features.astype(np.float32)
+    arrays = {}
+
+    runs_features = np.hstack([
+        np.repeat(base, len(balls_grid), axis=0),
+        np.tile(balls_grid, len(base)).astype(np.float32).reshape(-1, 1)
+    ])
+    for algo, model in models['runs'].items():
+        if model is not None:
+            arrays[f"runs_{algo}"] = model.predict(runs_features).astype(np.float32).reshape(len(base), len(balls_grid))
+
+    for algo, model in models['dismissals'].items():
+        if model is not None:
+            arrays[f"dismissals_{algo}"] = model.predict_proba(base)[:, 1].astype(np.float32)
+
+    outcome_classes = []
+    encoder = models['ball_outcome'].get('encoder')
+    for algo, model in models['ball_outcome'].items():
+        if algo != 'encoder' and model is not None and encoder is not None:
+            arrays[f"ball_outcome_{algo}"] = model.predict_proba(base[:, [0, 1, 4]]).astype(np.float32)
+            outcome_classes = [str(c) for c in encoder.classes_]
+
+    return PredictionTable(features, arrays, np.asarray(balls_grid), outcome_classes, fingerprint_files(model_paths))
+
+
+if __name__ == "__main__":
+    import app as matchup_app
+
+    matchup_app.ensure_loaded('data', 'models')
+    bundle = matchup_app.model_registry.active
+    rows = matchup_app.observed_matchup_features(bundle)
+    table = build_prediction_table(rows, bundle.models, matchup_app.model_paths())
+    table.save()
+    logging.info(f"✅ Saved prediction table with {len(table)} matchups to {TABLE_PATH}")
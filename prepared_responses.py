@@ -0,0 +1,66 @@
+import gzip
+import json
+import hashlib
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+# ---------------------------------------------------
+# Pre-Serialized Reference Data Responses
+# ---------------------------------------------------
+# Reference data (bowler/venue lists, player roles and cards) only changes when the
+# dataset or players.db is rebuilt. Those payloads are serialized and compressed once,
+# carry a strong ETag derived from the data version, and are answered with
+# 304 Not Modified when the client already holds the current version. Each content
+# coding is its own representation with its own ETag ("<etag>", "<etag>-gz",
+# "<etag>-br"); any of them validates, since they all decode to the same body.
+
+MIN_COMPRESS_SIZE = 256  # bytes; smaller bodies are sent as-is
+ETAG_SUFFIXES = {None: "", "gzip": "-gz", "br": "-br"}  # content coding -> ETag suffix
+
+
+class PreparedResponse:
+    """A JSON body serialized once, with optional gzip/brotli variants and an ETag."""
+
+    __slots__ = ("body", "gzip_body", "br_body", "etag")
+
+    def __init__(self, body, version):
+        self.body = body
+        self.etag = hashlib.sha256(version.encode() + b":" + body).hexdigest()[:32]
+        self.gzip_body = None
+        self.br_body = None
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.br_body = brotli.compress(body)
+
+
+def prepare_json(obj, version):
+    """Serializes `obj` the way jsonify does (sorted keys, compact) into a PreparedResponse."""
+    body = json.dumps(obj, sort_keys=True, separators=(",", ":")) + "\n"
+    return PreparedResponse(body.encode("utf-8"), version)
+
+
+def serve_prepared(prepared, request, max_age=300):
+    """Builds the HTTP response for `prepared`, honouring If-None-Match and Accept-Encoding."""
+    body, encoding = prepared.body, None
+    accept_encodings = request.accept_encodings
+    if prepared.br_body is not None and accept_encodings.quality("br") > 0:
+        body, encoding = prepared.br_body, "br"
+    elif prepared.gzip_body is not None and accept_encodings.quality("gzip") > 0:
+        body, encoding = prepared.gzip_body, "gzip"
+
+    headers = {
+        "ETag": f'"{prepared.etag}{ETAG_SUFFIXES[encoding]}"',
+        "Cache-Control": f"public, max-age={max_age}",
+        "Vary": "Accept-Encoding"
+    }
+    if any(request.if_none_match.contains_weak(prepared.etag + suffix) for suffix in ETAG_SUFFIXES.values()):
+        return Response(status=304, headers=headers)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(body, status=200, mimetype="application/json", headers=headers)
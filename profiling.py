@@ -0,0 +1,156 @@
+import os
+import re
+import json
+import time
+import pstats
+import cProfile
+import logging
+import threading
+from collections import Counter
+
+# ---------------------------------------------------
+# On-Demand Request Profiling
+# ---------------------------------------------------
+# Profiles single requests on demand. Every profiled request leaves three files
+# with a shared name, `<timestamp>-<pid>-<route and arguments>`:
+#   .prof       cProfile/pstats data (`python -m pstats`, snakeviz, ...)
+#   .collapsed  call stacks with their time in microseconds, in the collapsed
+#               format read by flamegraph.pl, speedscope and inferno
+#   .json       the tags: route, method, path, arguments, status and duration
+# Only the newest `keep` profiles are kept. One request is profiled at a time per
+# process (cProfile can't nest), and concurrent requests are served unprofiled.
+
+_SLUG_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def slugify(text, max_length=80):
+    return _SLUG_UNSAFE.sub("_", text).strip("_")[:max_length] or "request"
+
+
+def _frame_label(func):
+    filename, line, name = func
+    if filename == "~":  # built-in, e.g. <method 'sort' of 'list' objects>
+        return name.replace(";", ":")
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ":")
+
+
+def collapsed_stacks(stats, max_depth=256):
+    """
+    Collapsed stacks ("frame;frame;frame microseconds" per line) from a pstats.Stats
+    call graph. cProfile records caller/callee pairs rather than full stacks, so when a
+    function is reached from several callers its time is split between them in
+    proportion to the time each caller spent in it.
+    """
+    entries = stats.stats  # {func: (primitive calls, calls, own time, cumulative time, {caller: (.., .., own, cumulative)})}
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, caller_stats in callers.items():
+            callees.setdefault(caller, []).append((func, caller_stats[3]))
+    stacks = Counter()
+
+    def walk(func, path, on_path, share):
+        own_time, total_time = entries[func][2], entries[func][3]
+        path = path + [_frame_label(func)]
+        stacks[";".join(path)] += own_time * share
+        if len(path) >= max_depth:
+            return
+        for callee, time_from_caller in callees.get(func, ()):
+            callee_total = entries[callee][3]
+            if callee in on_path or callee_total <= 0 or time_from_caller <= 0:
+                continue  # recursion, or nothing to attribute
+            sub_share = share * time_from_caller / callee_total
+            if callee_total * sub_share >= 1e-6:
+                walk(callee, path, on_path | {callee}, sub_share)
+
+    for func, (_, _, _, _, callers) in entries.items():
+        if not callers:
+            walk(func, [], {func}, 1.0)
+    return "".join(f"{stack} {round(seconds * 1e6)}\n" for stack, seconds in stacks.most_common() if seconds >= 5e-7)
+
+
+class ProfileSession:
+    """One profiled request: a cProfile profiler running on the request thread."""
+
+    def __init__(self, label, tags):
+        self.tags = tags
+        self.profiler = cProfile.Profile()
+        self.started = time.time()
+        timestamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(self.started)) + "%03d" % (self.started % 1 * 1000)
+        self.name = f"{timestamp}-{os.getpid()}-{slugify(label)}"
+        self._start = time.perf_counter()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.tags["duration_ms"] = round((time.perf_counter() - self._start) * 1000, 3)
+
+
+class RequestProfiler:
+    """Starts and saves request profiles in `directory`, keeping the newest `keep` of them."""
+
+    def __init__(self, directory, keep=100):
+        self.directory = directory
+        self.keep = keep
+        self._busy = threading.Lock()
+
+    def start(self, label, tags):
+        """
+        Starts profiling the calling thread. `label` (route and arguments) names the
+        files, `tags` are saved with them. Returns None if another request is being profiled.
+        """
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            session = ProfileSession(label, dict(tags))
+            session.start()
+        except Exception:
+            self._busy.release()
+            raise
+        return session
+
+    def finish(self, session, **tags):
+        """Stops `session`, writes its files and rotates old profiles."""
+        try:
+            session.stop()
+        finally:
+            self._busy.release()
+        session.tags.update(tags)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            base = os.path.join(self.directory, session.name)
+            stats = pstats.Stats(session.profiler)
+            stats.dump_stats(base + ".prof")
+            with open(base + ".collapsed", "w") as f:
+                f.write(collapsed_stacks(stats))
+            with open(base + ".json", "w") as f:
+                json.dump({"started": session.started, **session.tags}, f, indent=2, default=str)
+            self.rotate()
+        except OSError as e:
+            logging.error(f"Could not write request profile {session.name}: {e}")
+            return None
+        return session.name
+
+    def rotate(self):
+        names = sorted(f[:-len(".json")] for f in os.listdir(self.directory) if f.endswith(".json"))
+        for name in names[:max(0, len(names) - self.keep)]:
+            for ext in (".prof", ".collapsed", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, name + ext))
+                except FileNotFoundError:
+                    pass
+
+    def list_profiles(self):
+        """Tags of the saved profiles, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for f in sorted(os.listdir(self.directory), reverse=True):
+            if f.endswith(".json"):
+                try:
+                    with open(os.path.join(self.directory, f)) as fh:
+                        profiles.append({"name": f[:-len(".json")], **json.load(fh)})
+                except (OSError, ValueError):
+                    continue
+        return profiles
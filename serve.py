@@ -0,0 +1,166 @@
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+# ---------------------------------------------------
+# Production Prefork Server
+# ---------------------------------------------------
+# The master process loads the models, maps, `matchups` and the rest of app.py
+# once, binds the listening socket and then forks the workers. The workers share
+# those pages copy-on-write instead of each loading its own copy, so RSS no longer
+# grows with the worker count. Each worker serves requests from a bounded thread pool.
+#
+#     python serve.py --workers 4 --threads 8 --model-threads 1
+#
+# Every option can also be set through the environment (WORKERS, THREADS, MODEL_THREADS,
+# MODEL_RELOAD_INTERVAL, HOST, PORT). Keep workers x model-threads at or below the number
+# of cores. A hot-reloaded model version is loaded by each worker separately and is not
+# shared between them.
+# Requires os.fork (Linux/macOS); on Windows use `python app.py`.
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = 5  # seconds an idle keep-alive connection may hold a worker thread
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """A werkzeug WSGI server that handles connections on a fixed-size thread pool."""
+
+    multithread = True
+
+    def __init__(self, *args, threads=4, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def parse_args():
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Prefork production server for the matchup app.")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WORKERS", cpu_count)),
+                        help="Number of forked worker processes (default: CPU count).")
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("THREADS", 4)),
+                        help="Request threads per worker.")
+    parser.add_argument("--model-threads", type=int, default=int(os.environ.get("MODEL_THREADS", 1)),
+                        help="XGBoost/OpenMP threads per worker (nthread).")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--model-reload-interval", type=float, default=float(os.environ.get("MODEL_RELOAD_INTERVAL", 0)),
+                        help="Seconds between checks for a new model version in each worker (0 = off).")
+    return parser.parse_args()
+
+
+def run_worker(matchup_app, listen_socket, args):
+    """Worker process body: serve from the inherited socket until SIGTERM/SIGINT."""
+    # Threads don't survive fork(), so each worker watches for new model versions itself.
+    matchup_app.model_registry.watch(args.model_reload_interval)
+    server = PooledWSGIServer(
+        args.host, args.port, matchup_app.app,
+        handler=KeepAliveRequestHandler,
+        threads=args.threads,
+        fd=listen_socket.fileno()
+    )
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.executor.shutdown(wait=True)  # let in-flight requests finish
+        server.server_close()
+    os._exit(0)
+
+
+def main():
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs os.fork (Linux/macOS). On Windows run `python app.py` instead.")
+    args = parse_args()
+
+    # Thread pools must be sized before xgboost/sklearn initialise OpenMP.
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(args.model_threads)
+    os.environ["LAZY_LOADING"] = "0"  # everything must be loaded before forking
+    os.environ["MODEL_THREADS"] = str(args.model_threads)  # also applied to hot-reloaded models
+    os.environ["MODEL_RELOAD_INTERVAL"] = "0"  # the workers start their own watchers
+
+    import app as matchup_app
+    matchup_app.player_directory.pool.close_all()  # SQLite connections must not cross fork()
+
+    listen_socket = socket.create_server((args.host, args.port), backlog=args.backlog)
+    listen_socket.setblocking(False)  # idle workers must not block in accept()
+    listen_socket.set_inheritable(True)
+
+    # Move everything loaded so far out of the GC's reach so collections in the
+    # workers don't touch (and thereby copy) the shared pages.
+    gc.collect()
+    gc.freeze()
+
+    workers = set()
+    stopping = False
+
+    def spawn_worker():
+        pid = os.fork()
+        if pid == 0:
+            run_worker(matchup_app, listen_socket, args)
+        workers.add(pid)
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for _ in range(args.workers):
+        spawn_worker()
+    logging.info(f"🚀 Serving on http://{args.host}:{args.port} with {args.workers} workers x {args.threads} threads "
+                 f"(model threads per worker: {args.model_threads})")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            logging.warning(f"Worker {pid} exited with status {status}; starting a replacement.")
+            time.sleep(1)  # don't spin if workers keep crashing on startup
+            spawn_worker()
+
+    listen_socket.close()
+    logging.info("Server stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -123,6 +123,48 @@ document.addEventListener('DOMContentLoaded', function () {
         </div>`;
     }
 
+    // The whole batsman -> bowler -> venue graph (/matchup_graph), fetched once. Its URL
+    // carries the data version, so the browser keeps it cached until the data changes.
+    // The dropdowns are filled from it without a request; until it has loaded (or if it
+    // fails) they fall back to /get_bowlers and /get_venues.
+    let matchupGraph = null;
+    const matchupGraphReady = fetch(batsmanSelect.dataset.graphUrl)
+        .then(response => response.ok ? response.json() : null)
+        .then(data => { matchupGraph = data && compileMatchupGraph(data); })
+        .catch(() => {});
+
+    function compileMatchupGraph(data) {
+        const batsmanIds = new Map(data.batsmen.map((name, i) => [name, i]));
+        const bowlerIds = new Map(data.bowlers.map((name, i) => [name, i]));
+
+        function pairIndex(batsman, bowler) {
+            const b = batsmanIds.get(batsman);
+            const bowlerId = bowlerIds.get(bowler);
+            if (b === undefined || bowlerId === undefined) return -1;
+            const start = data.bowler_offsets[b], end = data.bowler_offsets[b + 1];
+            const p = data.pair_bowlers.indexOf(bowlerId, start);
+            return p !== -1 && p < end ? p : -1;
+        }
+
+        return {
+            bowlersOf(batsman) {
+                const b = batsmanIds.get(batsman);
+                if (b === undefined) return [];
+                return data.pair_bowlers.slice(data.bowler_offsets[b], data.bowler_offsets[b + 1]).map(id => data.bowlers[id]);
+            },
+            venuesOf(batsman, bowler) {
+                const p = pairIndex(batsman, bowler);
+                if (p === -1) return [];
+                return data.pair_venues.slice(data.venue_offsets[p], data.venue_offsets[p + 1]).map(id => data.venues[id]);
+            }
+        };
+    }
+
+    async function fetchList(url) {
+        const response = await fetch(url);
+        return response.json();
+    }
+
     batsmanSelect.addEventListener('change', async function () {
         if (!this.value) return;
 
@@ -131,8 +173,8 @@ document.addEventListener('DOMContentLoaded', function () {
         bowlerSelect.disabled = true;
         venueSelect.disabled = true;
 
-        const response = await fetch(`/get_bowlers/${this.value}`);
-        const bowlers = await response.json();
+        await matchupGraphReady;
+        const bowlers = matchupGraph ? matchupGraph.bowlersOf(this.value) : await fetchList(`/get_bowlers/${this.value}`);
 
         populateSelect(bowlerSelect, bowlers, 'Choose a bowler...');
         checkFormValidity();
@@ -144,8 +186,10 @@ document.addEventListener('DOMContentLoaded', function () {
         populateSelect(venueSelect, [], 'Loading venues...');
         venueSelect.disabled = true;
 
-        const response = await fetch(`/get_venues/${batsmanSelect.value}/${this.value}`);
-        const venues = await response.json();
+        await matchupGraphReady;
+        const venues = matchupGraph
+            ? matchupGraph.venuesOf(batsmanSelect.value, this.value)
+            : await fetchList(`/get_venues/${batsmanSelect.value}/${this.value}`);
 
         populateSelect(venueSelect, venues, 'Choose a venue...');
         checkFormValidity();
@@ -167,6 +211,26 @@ document.addEventListener('DOMContentLoaded', function () {
         "Sawai Mansingh Stadium, Jaipur": { type: "Bowling Friendly", color: "primary", icon: "bi-shield-shaded", text: "Large Boundaries, Low Scoring" }
     };
 
+    // Per-venue aggregates from the ball-by-ball data (/venue_stats), fetched once. Their URL
+    // carries the response's ETag, so the browser keeps them cached until they change.
+    let venueStats = {};
+    fetch(venueSelect.dataset.venueStatsUrl)
+        .then(response => response.ok ? response.json() : {})
+        .then(data => { venueStats = data; })
+        .catch(() => {});
+
+    function statsInsight(stats) {
+        const text = `Scoring index ${stats.scoring_index} (100 = league average)`;
+        if (stats.scoring_index >= 105) return { type: "High Scoring", color: "success", icon: "bi-graph-up-arrow", text };
+        if (stats.scoring_index <= 95) return { type: "Low Scoring", color: "primary", icon: "bi-shield-shaded", text };
+        return { type: "Balanced", color: "info", icon: "bi-scale", text };
+    }
+
+    function statsSummary(stats) {
+        return `${stats.run_rate} RPO · ${(stats.dismissal_rate * 100).toFixed(1)}% wickets/ball · ` +
+            `${stats.boundary_pct}% boundaries · ${stats.matches} matches`;
+    }
+
     function updateVenueBadge(venueName) {
         console.log("Venue changed to:", venueName); // DEBUG
 
@@ -186,6 +250,9 @@ document.addEventListener('DOMContentLoaded', function () {
             else if (lowerName.includes("mansingh")) info = venueInsights["Sawai Mansingh Stadium, Jaipur"];
         }
 
+        const stats = venueStats[venueName];
+        if (!info && stats) info = statsInsight(stats);
+
         if (!venueName || !info) {
             venueBadgeContainer.innerHTML = '';
             venueBadgeContainer.style.opacity = '0';
@@ -202,6 +269,7 @@ document.addEventListener('DOMContentLoaded', function () {
                 <div>
                     <h6 class="mb-0 fw-bold text-${info.color}" style="text-transform: uppercase; letter-spacing: 1px; font-size: 0.85rem;">${info.type}</h6>
                     <small class="text-white-50" style="font-size: 0.75rem;">${info.text}</small>
+                    ${stats ? `<small class="d-block text-white-50" style="font-size: 0.7rem;">${statsSummary(stats)}</small>` : ''}
                 </div>
             </div>
         `;
@@ -243,7 +311,8 @@ document.addEventListener('DOMContentLoaded', function () {
 
         try {
             const formData = new FormData(predictForm);
-            const response = await fetch('/predict', { method: 'POST', body: formData });
+            // One round-trip for runs, dismissal and next-ball predictions
+            const response = await fetch('/predict_matchup', { method: 'POST', body: formData });
             const data = await response.json();
             if (!response.ok) throw new Error(data.error || 'Prediction failed.');
 
@@ -282,10 +351,9 @@ document.addEventListener('DOMContentLoaded', function () {
 
             // --- NEXT BALL PREDICTION ---
             try {
-                const ballResponse = await fetch('/predict_next_ball', { method: 'POST', body: formData });
-                const ballData = await ballResponse.json();
+                const ballData = data.next_ball;
 
-                if (ballResponse.ok) {
+                if (ballData) {
                     const container = document.getElementById('outcome-bars');
                     container.innerHTML = '';
                     document.getElementById('ball-probability-section').style.display = 'block';
@@ -0,0 +1,222 @@
+import json
+import numpy as np
+
+# ---------------------------------------------------
+# Native Tree Inference Engine
+# ---------------------------------------------------
+# Scoring one row through the XGBoost sklearn wrapper builds a DMatrix and pays a
+# fixed overhead that dwarfs the tree traversal itself. compile_model() turns a fitted
+# XGBRegressor/XGBClassifier (gbtree) or sklearn RandomForest into flat NumPy node
+# arrays. Rows are then evaluated for all trees at once, one vectorized step per tree
+# level. Leaf values are accumulated in the same order and precision as the reference
+# implementations, so predictions match the original models.
+
+
+class TreeEnsemble:
+    """
+    All nodes of all trees in flat arrays (global node ids). The two children of a
+    node are stored next to each other, so the next node is `left + went_right`.
+    Leaves point to themselves with an infinite threshold, so walking `max_depth`
+    levels always ends on a leaf.
+    """
+
+    def __init__(self, feature, threshold, left, default_left, value, roots, max_depth, strict_less):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.strict_less = strict_less  # XGBoost goes left on x < t, sklearn on x <= t
+
+    def leaf_values(self, X):
+        """Returns the leaf value reached in every tree: shape (n_rows, n_trees, ...)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat_x = X.ravel()
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+        has_missing = bool(np.isnan(flat_x).any())
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots)))
+        for _ in range(self.max_depth):
+            x = flat_x[row_offsets + self.feature[node]]
+            threshold = self.threshold[node]
+            went_right = x >= threshold if self.strict_less else x > threshold
+            if has_missing:
+                went_right = np.where(np.isnan(x), ~self.default_left[node], went_right)
+            node = self.left[node] + went_right
+        return self.value[node]
+
+
+def _flatten_trees(trees, threshold_dtype, strict_less):
+    """
+    trees: list of dicts with feature/threshold/left/right/default_left/value arrays
+    (-1 children mark leaves). Nodes are renumbered breadth-first so siblings are adjacent.
+    """
+    feature, threshold, left, default_left, value, roots = [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for t in trees:
+        order, depth = [0], {0: 0}
+        new_id = {0: 0}
+        for node in order:  # order grows while we walk it
+            if t['left'][node] != -1:
+                for child in (t['left'][node], t['right'][node]):
+                    new_id[child] = len(order)
+                    depth[child] = depth[node] + 1
+                    order.append(child)
+        order = np.asarray(order)
+        is_leaf = t['left'][order] == -1
+        own_ids = np.arange(len(order)) + offset
+        left_ids = np.asarray([new_id[c] if c != -1 else -1 for c in t['left'][order]]) + offset
+        feature.append(np.where(is_leaf, 0, t['feature'][order]))
+        threshold.append(np.where(is_leaf, np.inf, t['threshold'][order]))
+        left.append(np.where(is_leaf, own_ids, left_ids))
+        default_left.append(is_leaf | t['default_left'][order].astype(bool))
+        value.append(t['value'][order])
+        roots.append(offset)
+        max_depth = max(max_depth, max(depth.values()))
+        offset += len(order)
+    return TreeEnsemble(
+        feature=np.concatenate(feature).astype(np.intp),
+        threshold=np.concatenate(threshold).astype(threshold_dtype),
+        left=np.concatenate(left).astype(np.intp),
+        default_left=np.concatenate(default_left).astype(bool),
+        value=np.concatenate(value),
+        roots=np.asarray(roots, dtype=np.intp),
+        max_depth=max_depth,
+        strict_less=strict_less
+    )
+
+
+def _expf(x):
+    return np.exp(x.astype(np.float64)).astype(np.float32)
+
+
+def _parse_float_list(text):
+    return [float(v) for v in text.strip("[]").split(",")]
+
+
+class CompiledXGBModel:
+    """Drop-in replacement for the predict/predict_proba of a fitted XGBoost sklearn model."""
+
+    def __init__(self, model):
+        booster = model.get_booster()
+        config = json.loads(booster.save_config())
+        raw = json.loads(booster.save_raw("json"))
+        gbm = raw["learner"]["gradient_booster"]
+        if gbm["name"] != "gbtree":
+            raise ValueError(f"Unsupported booster: {gbm['name']}")
+        self.objective = config["learner"]["objective"]["name"]
+        if self.objective not in ("reg:squarederror", "binary:logistic", "multi:softprob", "multi:softmax"):
+            raise ValueError(f"Unsupported objective: {self.objective}")
+
+        trees = []
+        for tree in gbm["model"]["trees"]:
+            if any(tree["split_type"]):
+                raise ValueError("Categorical splits are not supported")
+            trees.append({
+                'feature': np.asarray(tree["split_indices"]),
+                'threshold': np.asarray(tree["split_conditions"], dtype=np.float32),
+                'left': np.asarray(tree["left_children"]),
+                'right': np.asarray(tree["right_children"]),
+                'default_left': np.asarray(tree["default_left"]),
+                'value': np.asarray(tree["split_conditions"], dtype=np.float32)  # leaves store their value here
+            })
+        self.ensemble = _flatten_trees(trees, np.float32, strict_less=True)
+        self.tree_group = np.asarray(gbm["model"]["tree_info"])
+
+        params = config["learner"]["learner_model_param"]
+        self.n_groups = max(int(params["num_class"]), 1)
+        base_score = np.asarray(_parse_float_list(params["base_score"]), dtype=np.float32)
+        if self.objective == "binary:logistic":
+            base_score = -np.log(np.float32(1.0) / base_score - np.float32(1.0))  # probability -> margin
+        self.base_margin = np.broadcast_to(base_score, (self.n_groups,)).astype(np.float32)
+        self.group_columns = [np.flatnonzero(self.tree_group == g) for g in range(self.n_groups)]
+        if hasattr(model, "classes_"):
+            self.classes_ = model.classes_
+        self.n_features_in_ = booster.num_features()
+
+    def margins(self, X):
+        """Raw scores, shape (n_rows, n_groups); trees are added one at a time in float32 like XGBoost."""
+        leaves = self.ensemble.leaf_values(X)
+        out = np.empty((leaves.shape[0], self.n_groups), dtype=np.float32)
+        for g, columns in enumerate(self.group_columns):
+            running = np.concatenate([np.full((leaves.shape[0], 1), self.base_margin[g], dtype=np.float32), leaves[:, columns]], axis=1)
+            out[:, g] = np.cumsum(running, axis=1, dtype=np.float32)[:, -1]
+        return out
+
+    def predict_proba(self, X):
+        # Same float32 steps as XGBoost's Sigmoid/Softmax; exp is evaluated in float64 and
+        # rounded, which reproduces expf() up to the odd last-bit difference.
+        margin = self.margins(X)
+        if self.objective == "binary:logistic":
+            p = np.float32(1.0) / (np.float32(1.0) + _expf(-margin[:, 0]))
+            return np.column_stack([np.float32(1.0) - p, p])
+        if self.objective.startswith("multi:"):
+            e = _expf(margin - margin.max(axis=1, keepdims=True))
+            total = np.cumsum(e, axis=1, dtype=np.float64)[:, -1:].astype(np.float32)
+            return e / total
+        raise AttributeError(f"predict_proba is not available for {self.objective}")
+
+    def predict(self, X):
+        if self.objective == "reg:squarederror":
+            return self.margins(X)[:, 0]
+        proba = self.predict_proba(X)
+        if self.objective == "binary:logistic":
+            return self.classes_[(proba[:, 1] > 0.5).astype(int)] if hasattr(self, "classes_") else (proba[:, 1] > 0.5).astype(int)
+        indices = proba.argmax(axis=1)
+        return self.classes_[indices] if hasattr(self, "classes_") else indices
+
+
+class CompiledForest:
+    """Drop-in replacement for the predict/predict_proba of a fitted sklearn RandomForest."""
+
+    def __init__(self, model):
+        trees = []
+        for estimator in model.estimators_:
+            t = estimator.tree_
+            if hasattr(model, "classes_"):
+                value = t.value[:, 0, :]
+                totals = value.sum(axis=1, keepdims=True)
+                if not np.allclose(totals, 1.0):  # sklearn < 1.4 stores class counts instead of fractions
+                    value = value / totals
+            else:
+                value = t.value[:, :, 0]
+            trees.append({
+                'feature': t.feature,
+                'threshold': t.threshold,
+                'left': t.children_left,
+                'right': t.children_right,
+                'default_left': np.ones(t.node_count, dtype=bool) if getattr(t, "missing_go_to_left", None) is None else t.missing_go_to_left,
+                'value': value.astype(np.float64)
+            })
+        self.ensemble = _flatten_trees(trees, np.float64, strict_less=False)
+        self.n_trees = len(trees)
+        if hasattr(model, "classes_"):
+            self.classes_ = model.classes_
+        self.n_features_in_ = model.n_features_in_
+
+    def _mean_over_trees(self, X):
+        leaves = self.ensemble.leaf_values(X)  # (n_rows, n_trees, n_outputs)
+        return np.cumsum(leaves, axis=1)[:, -1] / self.n_trees  # summed tree by tree, like sklearn
+
+    def predict_proba(self, X):
+        if not hasattr(self, "classes_"):
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._mean_over_trees(X)
+
+    def predict(self, X):
+        out = self._mean_over_trees(X)
+        if hasattr(self, "classes_"):
+            return self.classes_[out.argmax(axis=1)]
+        return out[:, 0]
+
+
+def compile_model(model):
+    """Returns the native equivalent of `model`, or raises ValueError if it is not supported."""
+    if hasattr(model, "get_booster"):
+        return CompiledXGBModel(model)
+    if hasattr(model, "estimators_") and all(hasattr(e, "tree_") for e in model.estimators_):
+        return CompiledForest(model)
+    raise ValueError(f"Cannot compile {type(model).__name__}")
@@ -0,0 +1,117 @@
+import os
+import json
+import logging
+
+# ---------------------------------------------------
+# Venue Intelligence Aggregates
+# ---------------------------------------------------
+# final_dataset.csv holds one row per (batsman, bowler, venue) with the pair's
+# career totals repeated on every venue row, so real per-venue numbers come from
+# the ball-by-ball match files (Cricsheet JSON, one file per match). They are read
+# into one delivery-level DataFrame, and every venue aggregate (overall, by batting
+# hand, by bowling style) is a groupby over it. The hand/style of each player comes
+# from the dataset (df_main), which is what the models see.
+#
+#   balls          legal deliveries (wides and no-balls don't count)
+#   runs           all runs scored off the deliveries, extras included
+#   wickets        all dismissals, run-outs included
+
+UNKNOWN = "Unknown"
+
+
+def match_files(match_dir):
+    """The .json match files in `match_dir`, sorted by name."""
+    if not os.path.isdir(match_dir):
+        return []
+    return [os.path.join(match_dir, f) for f in sorted(os.listdir(match_dir)) if f.endswith(".json")]
+
+
+def read_deliveries(paths):
+    """One row per delivery: match, venue, batter, bowler, runs, legal, wicket, four, six."""
+    import pandas as pd
+
+    columns = {name: [] for name in ("match", "venue", "batter", "bowler", "runs", "legal", "wicket", "four", "six")}
+    for path in paths:
+        try:
+            with open(path) as f:
+                match = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Skipping match file {path}: {e}")
+            continue
+        match_id = os.path.splitext(os.path.basename(path))[0]
+        venue = match["info"].get("venue", UNKNOWN)
+        for innings in match.get("innings", []):
+            for over in innings.get("overs", []):
+                for delivery in over.get("deliveries", []):
+                    runs = delivery.get("runs", {})
+                    extras = delivery.get("extras", {})
+                    batter_runs = runs.get("batter", 0)
+                    columns["match"].append(match_id)
+                    columns["venue"].append(venue)
+                    columns["batter"].append(delivery["batter"])
+                    columns["bowler"].append(delivery["bowler"])
+                    columns["runs"].append(runs.get("total", 0))
+                    columns["legal"].append("wides" not in extras and "noballs" not in extras)
+                    columns["wicket"].append(len(delivery.get("wickets", ())))
+                    columns["four"].append(batter_runs == 4)
+                    columns["six"].append(batter_runs == 6)
+    return pd.DataFrame(columns)
+
+
+def rates(runs, balls, wickets):
+    return {
+        "runs_per_ball": round(runs / balls, 3) if balls > 0 else 0,
+        "run_rate": round(runs / balls * 6, 2) if balls > 0 else 0,
+        "dismissal_rate": round(wickets / balls, 4) if balls > 0 else 0
+    }
+
+
+def build_venue_stats(deliveries, batting_hands, bowling_styles, matchup_counts):
+    """
+    Returns {venue: stats} for the /venue_stats endpoint. `batting_hands` and `bowling_styles`
+    map player names to their hand/style, `matchup_counts` venues to the number of
+    batsman/bowler pairs the dataset has for them.
+    """
+    index = {}
+    if deliveries is None or deliveries.empty:
+        return index
+    balls = deliveries.assign(
+        balls=deliveries["legal"].astype(int),
+        dot=(deliveries["legal"] & (deliveries["runs"] == 0)).astype(int),
+        batting_hand=deliveries["batter"].map(batting_hands).fillna(UNKNOWN),
+        bowling_style=deliveries["bowler"].map(bowling_styles).fillna(UNKNOWN)
+    )
+    sums = ["balls", "runs", "wicket", "dot", "four", "six"]
+    totals = balls.groupby("venue")[sums].sum()
+    matches = balls.groupby("venue")["match"].nunique()
+    overall_runs_per_ball = totals["runs"].sum() / totals["balls"].sum()
+
+    splits = {}
+    for key in ("batting_hand", "bowling_style"):
+        grouped = balls.groupby(["venue", key])[["balls", "runs", "wicket"]].sum().reset_index()
+        for row in grouped.to_dict("records"):
+            splits.setdefault((row["venue"], key), []).append({
+                key: row[key], "balls": int(row["balls"]), "runs": int(row["runs"]), "wickets": int(row["wicket"]),
+                **rates(row["runs"], row["balls"], row["wicket"])
+            })
+
+    for venue, row in totals.iterrows():
+        venue_balls, venue_runs, wickets = int(row["balls"]), int(row["runs"]), int(row["wicket"])
+        index[venue] = {
+            "venue": venue,
+            "matches": int(matches[venue]),
+            "balls": venue_balls,
+            "runs": venue_runs,
+            "wickets": wickets,
+            **rates(venue_runs, venue_balls, wickets),
+            "dot_ball_pct": round(row["dot"] / venue_balls * 100, 1) if venue_balls > 0 else 0,
+            "boundary_pct": round((row["four"] + row["six"]) / venue_balls * 100, 1) if venue_balls > 0 else 0,
+            "fours": int(row["four"]),
+            "sixes": int(row["six"]),
+            # Runs per ball against the average of all venues (100 = average).
+            "scoring_index": round(venue_runs / venue_balls / overall_runs_per_ball * 100) if venue_balls > 0 else 0,
+            "dataset_matchups": int(matchup_counts.get(venue, 0)),
+            "by_batting_hand": splits.get((venue, "batting_hand"), []),
+            "by_bowling_style": splits.get((venue, "bowling_style"), [])
+        }
+    return index